@@ -1,13 +1,36 @@
 import os
-import streamlit as st
-import google.generativeai as genai
-import random
 import time
+import streamlit as st
 import pandas as pd
-from datetime import date
-import plotly.express as px  # 그래프 라이브러리 추가
+import hashlib
 import json
-from supabase import create_client, Client
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from stocksim.price_history import PriceHistory
+from stocksim.ticker_index import TickerIndex
+from stocksim import catalog, charts, llm, news_meanings, rng, snapshot
+from stocksim.cohort_market import CohortMarkets, CohortState
+from stocksim.llm import PromptSession, shared_usage
+from stocksim.metrics import shared_metrics
+from stocksim.news import (
+    FORMATS as NEWS_FORMATS,
+    build_news_prompt,
+    generate_structured_news,
+    json_generation_config,
+    news_key,
+    parse_news_articles,
+)
+from stocksim.orders import OrderLedger, SupabaseOrderStore
+from stocksim.news_cache import InMemoryNewsStore, SharedNewsCache, SupabaseNewsStore
+from stocksim.persistence import PARTS, DeltaPersistence, PendingWrite
+from stocksim.sectors import index_for
+from stocksim.simulation import Account, Market, new_portfolio
+from stocksim.prefetch import PrefetchJob
+from stocksim.write_behind import WriteBehindQueue
+
+_run_started = time.perf_counter()  # 이번 실행 시작 시각 (실행 시간 측정용)
 
 # --- Streamlit 설정 ---
 st.set_page_config(
@@ -41,6 +64,14 @@ body {
     margin-bottom: -1px; /* border overlap */
 }
 
+/* 메뉴 (가로 라디오 버튼) 스타일 */
+div[role="radiogroup"] > label {
+    background-color: #f0f2f6;
+    border-radius: 8px 8px 0 0;
+    padding: 0.5em 1em;
+    margin-right: 4px;
+}
+
 /* 사이드바 스타일 */
 [data-testid="stSidebar"] {
     width: 350px !important;
@@ -158,7 +189,14 @@ if "GEMINI_API_KEY" not in os.environ:
     )
     st.stop()
 
-genai.configure(api_key=os.environ["GEMINI_API_KEY"])
+# --- 실행 시간 기록 ---
+RUNTIME_STATS_RUNS = 100  # 평균을 낼 최근 실행 수
+
+
+@st.cache_resource
+def get_runtime_stats():
+    # 프로세스 전체에서 하나인 실행 시간 기록입니다.
+    return {"resources": {}, "first_run": None, "reruns": deque(maxlen=RUNTIME_STATS_RUNS)}
 
 # --- Gemini 모델 설정 ---
 generation_config = {
@@ -168,239 +206,151 @@ generation_config = {
     "max_output_tokens": 25000,
     "response_mime_type": "text/plain",
 }
-model = genai.GenerativeModel(
-    model_name="gemini-2.0-flash-exp",  # 또는 "gemini-pro"
-    generation_config=generation_config,
-)
+
+
+@st.cache_resource
+def get_model():
+    # 모델은 프로세스마다 한 번만 만들고 모든 세션이 함께 씁니다. (매 실행마다 다시 만들지 않습니다)
+    started = time.perf_counter()
+    import google.generativeai as genai  # 무거운 라이브러리라 처음 쓸 때 불러옵니다.
+
+    genai.configure(api_key=os.environ["GEMINI_API_KEY"])
+    model = genai.GenerativeModel(
+        model_name="gemini-2.0-flash-exp",  # 또는 "gemini-pro"
+        generation_config=generation_config,
+    )
+    get_runtime_stats()["resources"]["Gemini 모델"] = time.perf_counter() - started
+    return model
+
+
+# supabase 클라이언트를 초기화합니다.
+SUPABASE_URL = os.environ.get("SUPABASE_URL")  # .env 파일에서 Supabase URL을 불러옵니다.
+SUPABASE_KEY = os.environ.get("SUPABASE_KEY")    # .env 파일에서 Supabase API KEY를 불러옵니다.
+
+
+@st.cache_resource
+def get_supabase():
+    # 클라이언트를 프로세스마다 하나만 두어 HTTP 연결을 모든 세션이 함께 다시 씁니다.
+    started = time.perf_counter()
+    from supabase import create_client  # 처음 쓸 때 불러옵니다.
+
+    client = create_client(SUPABASE_URL, SUPABASE_KEY)
+    get_runtime_stats()["resources"]["Supabase 클라이언트"] = time.perf_counter() - started
+    return client
+
+
+@lru_cache(maxsize=1)
+def quota_errors():
+    # AI 할당량 초과 오류 종류입니다. retry_on=과 except에 그대로 넘깁니다.
+    # 모듈은 google.generativeai만 불러오므로 google.api_core.exceptions는 여기서 직접 불러옵니다.
+    # (라이브러리가 없으면 빈 튜플이라 아무 오류도 잡지 않습니다)
+    try:
+        from google.api_core.exceptions import ResourceExhausted
+    except ImportError:
+        return ()
+    return (ResourceExhausted,)
+
+
+@lru_cache(maxsize=1)
+def supabase_api_errors():
+    # Supabase(PostgREST) 요청 오류 종류입니다. supabase가 쓰는 postgrest 모듈에서 직접 불러옵니다.
+    try:
+        from postgrest.exceptions import APIError
+    except ImportError:
+        return ()
+    return (APIError,)
+
+
+# AI 요청 방식: "stateless"(대화 기록 없이), "rolling"(최근 기록 + 요약), "chat"(기존 방식, 기록이 계속 쌓임)
+PROMPT_MODE = os.environ.get("PROMPT_MODE", "stateless")
+if PROMPT_MODE not in llm.MODES:
+    PROMPT_MODE = "stateless"
+
+# 뉴스 해설 요청 방식: "batch"(한 번에 JSON으로), "concurrent"(동시 요청), "sequential"(기존 방식)
+# 뉴스 형식: "json"(기사와 해설·섹터·분위기를 JSON으로 한 번에), "text"(자유 문장, 해설은 따로 요청)
+NEWS_FORMAT = os.environ.get("NEWS_FORMAT", "json")
+if NEWS_FORMAT not in NEWS_FORMATS:
+    NEWS_FORMAT = "json"
+
+# 1이면 AI가 고른 뉴스 분위기(JSON 형식 뉴스)를 영향도 방향에 반영하고, 0이면 단어 점수만 씁니다.
+USE_LLM_SENTIMENT = os.environ.get("USE_LLM_SENTIMENT", "1") == "1"
+
+NEWS_MEANING_MODE = os.environ.get("NEWS_MEANING_MODE", "batch")
+if NEWS_MEANING_MODE not in news_meanings.MODES:
+    NEWS_MEANING_MODE = "batch"
+
+# 다음 날 뉴스와 해설을 백그라운드에서 미리 만들지 여부
+PREFETCH_ENABLED = os.environ.get("PREFETCH_ENABLED", "1") != "0"
+PREFETCH_WORKERS = 8  # 모든 세션이 함께 쓰는 백그라운드 작업자 수
+PREFETCH_TIMEOUT = 120  # '하루 지나기'에서 미리 준비된 결과를 기다리는 최대 시간(초)
+
+# 반 전체가 함께 쓰는 뉴스 저장소: "memory"(이 프로세스 안에서 공유) 또는 "supabase"(class_news 테이블)
+NEWS_CACHE_STORE = os.environ.get("NEWS_CACHE_STORE", "memory")
+DEFAULT_COHORT = os.environ.get("DEFAULT_COHORT", "default")  # 반 정보가 없는 사용자가 속하는 반
+
+# 시장 방식: "personal"(학생마다 시장을 따로 진행), "cohort"(반마다 시장 하나를 함께 쓰고 하루에 한 번만 진행)
+# cohort 방식에서 학생마다 저장하는 것은 포트폴리오뿐이고, 반 시장은 cohort_state, cohort_price_history 테이블에 저장합니다.
+MARKET_MODE = os.environ.get("MARKET_MODE", "personal")
+if MARKET_MODE not in ("personal", "cohort"):
+    MARKET_MODE = "personal"
+USER_PARTS = ("portfolio",) if MARKET_MODE == "cohort" else tuple(PARTS)  # 학생마다 저장하는 조각
+
+# 저장 방식: "write_behind"(대기열에 넣고 백그라운드에서 저장) 또는 "sync"(바로 저장)
+SAVE_MODE = os.environ.get("SAVE_MODE", "write_behind")
+
+# 빨리 감기를 쓸 수 있는 선생님 계정 (쉼표로 구분)
+TEACHER_ACCOUNTS = {account.strip() for account in os.environ.get("TEACHER_ACCOUNTS", "").split(",") if account.strip()}
+FAST_FORWARD_MAX_DAYS = 60  # 빨리 감기로 한 번에 진행할 수 있는 최대 날 수
+FAST_FORWARD_WORKERS = 4  # 빨리 감기에서 뉴스와 해설을 동시에 만드는 작업자 수 (미리 준비하기 풀과 따로 둡니다)
+
+# 1이면 선생님 계정이 아니어도 단계별 시간 화면을 보여 줍니다.
+METRICS_PANEL = os.environ.get("METRICS_PANEL", "0") == "1"
+
+# 로그인할 때 users 테이블에서 읽는 컬럼 (저장 데이터가 든 data 컬럼은 읽지 않습니다)
+LOGIN_COLUMNS = "account, cohort, role"
+# 컬럼이 없을 때 오는 오류 코드 (42703: PostgreSQL, PGRST204: PostgREST 스키마 캐시)
+MISSING_COLUMN_CODES = ("42703", "PGRST204")
+FIRST_LOAD_PARTS = ("portfolio", "market", "news")  # 로그인할 때 바로 읽는 조각 (지난 뉴스는 볼 때 읽습니다)
+RECENT_HISTORY_DAYS = 60  # 로그인할 때 바로 읽는 최근 주가 기록 날짜 수 (앞쪽은 백그라운드에서 읽습니다)
+
+# 저장 형식: "compact"(msgpack 또는 JSON을 zlib로 압축, 주가는 int32 배열), "json"(예전처럼 JSON 문자열)
+# 읽을 때는 형식과 상관없이 모두 읽습니다.
+SNAPSHOT_FORMAT = os.environ.get("SNAPSHOT_FORMAT", "compact")
+if SNAPSHOT_FORMAT not in snapshot.FORMATS:
+    SNAPSHOT_FORMAT = "compact"
+
+# 새 시장의 난수 씨앗. 정하면 모든 새 시장이 같은 주가로 시작하고, 같은 뉴스면 같은 주가로 움직입니다.
+# 비워 두면 시장마다 새 씨앗을 만듭니다. (씨앗은 시장과 함께 저장됩니다)
+MARKET_SEED = os.environ.get("MARKET_SEED")
+MARKET_SEED = int(MARKET_SEED) if MARKET_SEED and MARKET_SEED.isdigit() else None
+
+
+def new_market_seed():
+    return MARKET_SEED if MARKET_SEED is not None else rng.new_seed()
+
+
+VIEW_CACHE_ENTRIES = 500  # 화면 캐시에 보관하는 표의 최대 개수 (오래된 것부터 지웁니다)
+VIEW_CACHE_TTL = 60 * 60  # 화면 캐시 보관 시간(초)
 
 # --- 세션 상태 초기화 (Streamlit 앱 상태 관리) ---
-if "chat_session" not in st.session_state:
-    st.session_state["chat_session"] = model.start_chat(history=[])
+if "prompt_session" not in st.session_state:
+    st.session_state["prompt_session"] = PromptSession(get_model, PROMPT_MODE)  # 모델은 처음 요청할 때 만듭니다.
 if "portfolio" not in st.session_state:
-    st.session_state["portfolio"] = {"cash": 10000000, "stocks": {}}
-if "stocks" not in st.session_state:
-    st.session_state["stocks"] = {  # 섹터별 종목 재구성 및 설명 확장
-        "기술(Tech)": {
-            "삼성전자": {
-                "current_price": random.randint(50000, 80000),
-                "price_history": [],
-                "description": "대한민국을 대표하는 전자 제품 회사, 삼성전자! 텔레비전, 스마트폰, 냉장고, 세탁기, 컴퓨터 칩 등 우리 생활에 필요한 다양한 제품들을 만들고 있어요. 특히 갤럭시 스마트폰은 전 세계에서 아주 인기가 많고, 텔레비전은 최고 화질로 유명해요. 반도체 기술도 세계 최고 수준이라서, 컴퓨터나 스마트폰의 두뇌 역할을 하는 칩을 만들어 다른 회사들에게도 팔고 있답니다. 우리나라 경제 발전에 아주 큰 역할을 하는 회사예요.",
-            },
-            "SK하이닉스": {
-                "current_price": random.randint(80000, 120000),
-                "price_history": [],
-                "description": "컴퓨터와 스마트폰의 기억력을 책임지는 SK하이닉스!  우리가 사용하는 컴퓨터나 스마트폰이 사진, 영상, 게임 같은 정보를 저장하고 빠르게 불러올 수 있는 건 SK하이닉스 덕분이에요.  이 회사는 'DRAM'과 'NAND 플래시'라는 아주 중요한 반도체를 만드는데, 이 반도체들은 컴퓨터, 스마트폰뿐만 아니라 인공지능, 빅데이터, 자율주행차 같은 미래 기술에도 꼭 필요하답니다.  세계적으로 손꼽히는 반도체 기술력을 가진 회사예요.",
-            },
-            "LG디스플레이": {
-                "current_price": random.randint(20000, 40000),
-                "price_history": [],
-                "description": "화면을 더욱 선명하게, LG디스플레이!  우리가 매일 보는 텔레비전, 스마트폰, 노트북 화면을 만드는 회사예요.  LG디스플레이는 특히 'OLED'라는 특별한 기술로 화면을 만드는데, OLED는 색깔이 진짜처럼 선명하고, 얇고 가벼워서 미래 디스플레이 기술로 주목받고 있어요.  영화관처럼 생생한 화질의 텔레비전,  얇고 예쁜 스마트폰 화면,  자동차 계기판과 투명 디스플레이까지, LG디스플레이 기술은 우리 생활 곳곳에 사용되고 있답니다.",
-            },
-        },
-        "자동차(Auto)": {
-            "현대자동차": {
-                "current_price": random.randint(150000, 250000),
-                "price_history": [],
-                "description": "대한민국 대표 자동차 회사, 현대자동차!  우리가 타고 다니는 자동차를 만드는 회사 중 가장 유명해요.  쏘나타, 아반떼, 팰리세이드, 아이오닉 등 멋진 이름의 자동차들을 디자인하고 만들어서 우리나라뿐 아니라 전 세계에 팔고 있어요.  최근에는 전기자동차와 수소자동차 같은 친환경 자동차를 개발해서 미래 자동차 시장을 이끌고 있답니다.  자동차를 좋아하는 친구라면 누구나 한 번쯤 들어봤을 이름일 거예요.",
-            },
-            "기아": {
-                "current_price": random.randint(70000, 100000),
-                "price_history": [],
-                "description": "개성 넘치는 디자인, 기아자동차!  현대자동차와 함께 우리나라 자동차 산업을 이끌고 있어요.  K3, K5, 쏘렌토, 스포티지, EV6, EV9  등 이름만 들어도 멋진 자동차들을 만들고 있어요.  기아자동차는 특히 디자인이 예쁘기로 유명하고, 젊은 친구들에게 인기가 많아요.  최근에는 전기차 EV6와 EV9이 세계적으로 디자인 상을 많이 받아서 더욱 유명해졌답니다.  나만의 개성을 표현하고 싶은 친구들에게 딱 맞는 자동차 회사예요.",
-            },
-            "현대모비스": {
-                "current_price": random.randint(200000, 250000),
-                "price_history": [],
-                "description": "자동차를 튼튼하게, 안전하게, 현대모비스!  자동차 회사는 아니지만, 자동차를 만드는 데 꼭 필요한 부품들을 전문적으로 만드는 회사예요.  자동차의 심장인 엔진 부품부터,  안전을 지켜주는 브레이크, 에어백,  운전을 편리하게 해주는 첨단 장치까지,  자동차 30000여 개 부품을 만들어요.  현대자동차, 기아뿐 아니라 전 세계 자동차 회사에 부품을 공급하는 아주 중요한 회사랍니다.  겉으로 잘 보이지 않지만, 자동차의 안전과 성능을 책임지는 숨은 영웅 같은 회사예요.",
-            },
-        },
-        "에너지(Energy)": {
-            "LG에너지솔루션": {
-                "current_price": random.randint(300000, 500000),
-                "price_history": [],
-                "description": "미래 에너지를 만드는 LG에너지솔루션!  우리가 타고 다니는 전기자동차에 꼭 필요한 배터리를 만드는 회사 중 세계 1등이에요.  전기차 배터리뿐 아니라, 스마트폰, 노트북, 에너지 저장 장치(ESS) 등 다양한 곳에 사용되는 배터리를 만들어요.  태양광, 풍력 같은 친환경 에너지를 더욱 효율적으로 사용할 수 있도록 돕는 기술을 개발하고 있답니다.  지구를 깨끗하게 만드는 데 아주 중요한 역할을 하는 회사예요.",
-            },
-            "SK이노베이션": {
-                "current_price": random.randint(100000, 150000),
-                "price_history": [],
-                "description": "에너지와 화학의 힘, SK이노베이션!  우리가 사용하는 휘발유, 경유 같은 기름을 만들고,  플라스틱, 옷, 타이어 같은 다양한 제품의 원료가 되는 화학 제품도 만들어요.  최근에는 전기차 배터리 사업을 키워서 미래 에너지 시대를 준비하고 있답니다.  오래전부터 우리나라 에너지 산업을 이끌어온 회사이고, 지금은 친환경 에너지 회사로 변신하고 있어요.",
-            },
-            "두산에너빌리티": {
-                "current_price": random.randint(15000, 25000),
-                "price_history": [],
-                "description": "힘찬 에너지를 만드는 두산에너빌리티!  우리가 사용하는 전기를 만드는 발전소를 짓고, 발전소에 필요한 기계를 만드는 회사예요.  화력 발전소, 원자력 발전소, 수력 발전소, 풍력 발전소 등 다양한 발전소를 건설하고,  바닷물을 깨끗한 물로 바꾸는 해수담수화 설비도 만들어요.  최근에는 친환경 에너지 기술을 개발해서 지구를 위한 깨끗한 에너지를 만드는 데 힘쓰고 있답니다.  우리나라 전력 공급에 아주 중요한 역할을 하는 회사예요.",
-            },
-        },
-        "인터넷(Internet)": {
-            "네이버": {
-                "current_price": random.randint(200000, 300000),
-                "price_history": [],
-                "description": "궁금한 건 뭐든지 물어봐, 네이버!  우리나라에서 가장 유명한 인터넷 검색 엔진 '네이버'를 만드는 회사예요.  검색뿐 아니라 뉴스, 쇼핑, 블로그, 카페, 웹툰, 지도, 번역 등 다양한 인터넷 서비스를 제공하고 있어요.  우리가 매일 사용하는 카카오톡처럼,  라인(LINE)이라는 메신저 앱을 만들어서 해외에서도 인기가 많답니다.  우리나라 인터넷 세상을 만들어가는 대표적인 회사예요.",
-            },
-            "카카오": {
-                "current_price": random.randint(40000, 60000),
-                "price_history": [],
-                "description": "세상을 연결하는 즐거움, 카카오!  국민 메신저 '카카오톡'을 만든 회사예요.  카카오톡뿐 아니라 카카오택시, 카카오페이, 카카오게임, 카카오웹툰, 카카오뱅크, 카카오맵 등 우리 생활을 편리하고 즐겁게 만들어주는 다양한 서비스를 만들고 있어요.  귀여운 카카오프렌즈 캐릭터도 아주 인기가 많죠?  우리나라 사람들의 하루를 카카오 서비스로 시작해서 카카오 서비스로 끝난다고 할 정도로, 우리 생활에 아주 깊숙이 들어와 있는 회사예요.",
-            },
-            "카카오뱅크": {
-                "current_price": random.randint(20000, 30000),
-                "price_history": [],
-                "description": "내 손안의 은행, 카카오뱅크!  카카오톡을 만든 카카오에서 만든 특별한 은행이에요.  은행에 직접 가지 않아도 스마트폰 앱으로 계좌를 만들고, 돈을 보내고, 대출도 받을 수 있어요.  복잡한 서류 없이 간편하게 이용할 수 있고,  24시간 언제든지 은행 업무를 볼 수 있다는 장점이 있어요.  은행을 딱딱하고 어렵게 생각하지 않고, 쉽고 재미있게 이용할 수 있도록 도와주는 은행이에요.",
-            },
-        },
-        "소비재(Consumer Goods)": {
-            "CJ제일제당": {
-                "current_price": random.randint(300000, 400000),
-                "price_history": [],
-                "description": "맛있는 식탁을 책임지는 CJ제일제당!  우리가 먹는 맛있는 음식들을 만드는 회사예요.  햇반, 비비고, 고메, 백설, 다시다 등 유명한 식품 브랜드를 많이 가지고 있어요.  김치, 만두, 햇반 같은 간편 식품부터,  밀가루, 설탕, 식용유 같은 요리 재료까지,  우리의 식탁을 풍요롭게 만들어주는 다양한 식품들을 만들어요.  영화관에서 먹는 팝콘, 뚜레쥬르 빵, 투썸플레이스 케이크도 CJ제일제당에서 만들어요.",
-            },
-            "아모레퍼시픽": {
-                "current_price": random.randint(130000, 170000),
-                "price_history": [],
-                "description": "예뻐지는 마법, 아모레퍼시픽!  우리나라 대표 화장품 회사예요.  설화수, 라네즈, 마몽드, 이니스프리, 에뛰드하우스 등 다양한 화장품 브랜드를 만들어서,  아름다움을 꿈꾸는 사람들을 도와주고 있어요.  화장품뿐 아니라 샴푸, 치약, 바디워시 같은 생활용품도 만들고,  녹차, 건강기능식품 사업도 하고 있답니다.  우리나라 여성들의 아름다움을 책임지는 회사라고 할 수 있어요.",
-            },
-            "LG생활건강": {
-                "current_price": random.randint(600000, 800000),
-                "price_history": [],
-                "description": "깨끗하고 아름다운 생활, LG생활건강!  우리 생활에 필요한 다양한 제품들을 만드는 회사예요.  샴푸, 린스, 비누, 치약, 세제 같은 생활용품부터,  오휘, 숨37°, 빌리프, 더페이스샵 같은 화장품 브랜드까지,  우리 생활을 더욱 깨끗하고 아름답게 만들어주는 제품들을 만들어요.  코카콜라, 스프라이트, 환타 같은 음료수도 LG생활건강에서 판매하고 있답니다.  우리 생활 곳곳에서 만날 수 있는 친근한 회사예요.",
-            },
-        },
-        "금융(Finance)": {
-            "KB금융": {
-                "current_price": random.randint(50000, 60000),
-                "price_history": [],
-                "description": "든든한 금융 파트너, KB금융!  우리나라 대표 금융 회사 중 하나예요.  KB국민은행, KB증권, KB손해보험, KB국민카드 등 다양한 금융 회사를 가지고 있어서,  은행, 증권, 보험, 카드 등 다양한 금융 서비스를 제공하고 있어요.  우리나라 사람들이 가장 많이 이용하는 은행 중 하나인 KB국민은행을 운영하고 있고,  집을 살 때 돈을 빌려주는 주택담보대출도 많이 해주는 회사예요.  우리나라 경제를 튼튼하게 만드는 데 중요한 역할을 하고 있어요.",
-            },
-            "신한지주": {
-                "current_price": random.randint(30000, 40000),
-                "price_history": [],
-                "description": "금융을 새롭게, 신한지주!  KB금융과 함께 우리나라 대표 금융 회사로 손꼽혀요.  신한은행, 신한카드, 신한금융투자, 신한생명 등 다양한 금융 회사를 가지고 있어서,  은행, 카드, 증권, 보험 등 모든 금융 서비스를 제공하고 있어요.  특히 젊은 고객들을 위한 다양한 금융 상품과 서비스를 개발하고 있고,  해외 시장에도 적극적으로 진출하고 있답니다.  빠르게 변화하는 금융 시장을 이끌어가는 회사예요.",
-            },
-            "하나금융지주": {
-                "current_price": random.randint(40000, 50000),
-                "price_history": [],
-                "description": "금융으로 더 나은 미래, 하나금융지주!  우리나라 대표 금융 회사 중 하나예요.  하나은행, 하나증권, 하나카드, 하나생명 등 금융 회사를 가지고 있어서,  은행, 증권, 카드, 보험 등 금융 서비스를 제공하고 있어요.  외국 돈을 사고파는 외환 거래를 오랫동안 해왔고,  해외 투자와 관련된 금융 서비스도 잘 제공하는 회사예요.  글로벌 금융 시장에서 활약하는 회사라고 할 수 있어요.",
-            },
-        },
-        "건설(Construction)": {
-            "삼성물산": {
-                "current_price": random.randint(100000, 150000),
-                "price_history": [],
-                "description": "세계를 건설하는 힘, 삼성물산!  삼성 그룹의 뿌리이자, 건설, 상사, 패션, 리조트 등 다양한 사업을 하는 회사예요.  우리나라 랜드마크 건물인 부르즈 할리파,  페트로나스 트윈 타워 건설에 참여했고,  인천국제공항,  싱가포르 지하철 같은 큰 프로젝트들을 많이 했어요.  건설뿐 아니라 옷을 만들고 팔기도 하고 (빈폴, 갤럭시),  에버랜드, 호텔신라 같은 리조트도 운영하는 다재다능한 회사예요.",
-            },
-            "HD현대": {
-                "current_price": random.randint(40000, 60000),
-                "price_history": [],
-                "description": "바다를 개척하는 HD현대!  배를 만들고, 건설 기계를 만드는 회사예요.  울산에 있는 큰 조선소에서 아주 큰 배들을 만들고,  굴착기, 지게차 같은 건설 현장에서 볼 수 있는 노란색 기계들도 만들어요.  최근에는 로봇, 인공지능 기술을 개발해서 건설 현장을 더욱 스마트하게 만드는 기술을 개발하고 있답니다.  우리나라 조선 산업과 건설 기계 산업을 이끌어가는 회사예요.",
-            },
-            "GS건설": {
-                "current_price": random.randint(30000, 50000),
-                "price_history": [],
-                "description": "행복을 짓는 GS건설!  우리가 사는 아파트 '자이'를 만드는 회사예요.  자이 아파트는 살기 좋은 아파트로 유명하고,  우리나라 아파트 브랜드 중에서 인기가 많아요.  아파트뿐 아니라 다리, 도로, 터널 같은 사회 기반 시설도 건설하고,  해외에서도 다양한 건설 프로젝트를 하고 있답니다.  우리나라 주거 문화를 만들어가는 대표적인 건설 회사예요.",
-            },
-        },
-        "유통(Retail)": {
-            "롯데쇼핑": {
-                "current_price": random.randint(150000, 250000),
-                "price_history": [],
-                "description": "쇼핑의 즐거움, 롯데쇼핑!  우리나라 대표 유통 회사예요.  롯데백화점, 롯데마트, 롯데슈퍼, 롯데아울렛, 롯데ON 등 다양한 쇼핑 공간을 운영하고 있어요.  옷, 화장품, 식품, 가전제품 등 없는 게 없는 백화점부터,  저렴하고 신선한 식재료를 살 수 있는 마트까지,  우리의 쇼핑 생활을 책임지고 있어요.  영화관 롯데시네마, 테마파크 롯데월드도 롯데쇼핑에서 운영해요.",
-            },
-            "이마트": {
-                "current_price": random.randint(100000, 150000),
-                "price_history": [],
-                "description": "생활 필수품은 모두 다, 이마트!  우리나라 대표 대형 할인 마트예요.  집에서 사용하는 거의 모든 물건을 살 수 있다고 생각하면 돼요.  신선한 채소, 과일, 고기 같은 식품부터,  세제, 샴푸, 휴지 같은 생활용품,  옷, 장난감, 가전제품까지 정말 다양한 상품을 팔고 있어요.  이마트 자체 브랜드인 '노브랜드', '피코크' 제품들도 인기가 많고,  온라인 쇼핑몰 'SSG닷컴'도 운영하고 있답니다.  우리나라 사람들의 장보기 문화를 대표하는 곳이에요.",
-            },
-        },
-        "통신(Telecom)": {
-            "KT": {
-                "current_price": random.randint(30000, 40000),
-                "price_history": [],
-                "description": "빠르고 편리한 통신, KT!  우리나라 대표 통신 회사예요.  집에서 사용하는 인터넷,  스마트폰으로 사용하는 이동통신,  텔레비전 방송(IPTV),  기업들이 사용하는 IT 솔루션 등 다양한 통신 서비스를 제공하고 있어요.  오래전부터 우리나라 통신 산업을 이끌어왔고,  지금도 5G, 인공지능 같은 새로운 기술을 개발해서 더욱 편리한 통신 세상을 만들고 있답니다.  우리나라 정보 통신 발전에 큰 역할을 하는 회사예요.",
-            },
-            "SK텔레콤": {
-                "current_price": random.randint(50000, 70000),
-                "price_history": [],
-                "description": "무선 통신의 강자, SK텔레콤!  우리나라 대표 통신 회사이고, 특히 이동통신 서비스에서 1등이에요.  스마트폰으로 데이터를 빠르게 사용할 수 있도록 5G, LTE 같은 무선 통신 기술을 개발하고,  인공지능, 메타버스 같은 미래 기술에도 투자하고 있어요.  우리가 스마트폰으로 영상 통화를 하고, 게임을 하고, 유튜브를 볼 수 있는 건 SK텔레콤 덕분이라고 할 수 있어요.  우리나라 무선 통신 기술을 이끌어가는 회사예요.",
-            },
-        },
-        "제약/바이오(Pharma/Bio)": {
-            "삼성바이오로직스": {
-                "current_price": random.randint(700000, 900000),
-                "price_history": [],
-                "description": "생명을  소중하게, 삼성바이오로직스!  약은 약인데, 그냥 약이 아니라 아주 특별한 '바이오 의약품'을 만드는 회사예요.  우리 몸속 세포를 이용해서 만드는 바이오 의약품은 병을 치료하는 힘이 아주 세다고 해요.  삼성바이오로직스는 다른 제약 회사들을 위해 바이오 의약품을 대신 만들어주는 일을 전문으로 하고 있어요.  공장을 아주 크게 지어서,  최첨단 설비로 최고 품질의 바이오 의약품을 만들고 있답니다.  아픈 사람들을 위한 희망을 만드는 회사라고 할 수 있어요.",
-            },
-            "셀트리온": {
-                "current_price": random.randint(180000, 250000),
-                "price_history": [],
-                "description": "바이오 의약품으로 질병과 싸우는 셀트리온!  삼성바이오로직스처럼 바이오 의약품을 만드는 회사인데,  셀트리온은 직접 새로운 바이오 의약품을 개발하고, 만들어서 전 세계에 팔고 있어요.  관절염, 암, 자가면역질환 같은 무서운 병들을 치료하는 바이오 의약품을 만들고 있고,  저렴한 가격으로 바이오 의약품을 만들어서 더 많은 사람들이 치료받을 수 있도록 노력하고 있답니다.  바이오 의약품 분야에서 우리나라를 대표하는 회사예요.",
-            },
-        },
-        "화학(Chemical)": {
-            "LG화학": {
-                "current_price": random.randint(600000, 800000),
-                "price_history": [],
-                "description": "생활 속 화학, LG화학!  우리가 매일 사용하는 플라스틱, 옷, 신발, 건전지, 자동차 배터리,  화장품 원료까지 정말 다양한 화학 제품을 만드는 회사예요.  눈에 보이지 않지만 우리 생활 곳곳에 LG화학 제품들이 사용되고 있답니다.  최근에는 친환경 플라스틱,  전기차 배터리 소재 같은 미래 기술 개발에도 힘쓰고 있어요.  우리나라 화학 산업을 이끌어가는 대표적인 회사예요.",
-            },
-            "금호석유화학": {
-                "current_price": random.randint(120000, 180000),
-                "price_history": [],
-                "description": "산업의 기초 소재, 금호석유화학!  자동차 타이어,  건축 자재,  포장재,  장갑,  운동화 밑창 등 다양한 제품의 원료가 되는 합성고무를 만드는 회사예요.  합성고무는 천연고무보다 더 튼튼하고,  다양한 기능을 가질 수 있어서 산업 현장에서 아주 많이 사용된답니다.  우리나라 합성고무 산업을 처음 시작했고, 지금도 세계적인 기술력을 가지고 있어요.  산업 발전에 꼭 필요한 숨은 영웅 같은 회사예요.",
-            },
-        },
-        "철강(Steel)": {
-            "POSCO홀딩스": {
-                "current_price": random.randint(300000, 400000),
-                "price_history": [],
-                "description": "철강으로 나라를 튼튼하게, POSCO홀딩스!  우리나라 대표 철강 회사이고,  세계적으로도 아주 큰 철강 회사예요.  자동차, 배, 건물, 다리, 기차,  가전제품 등 우리 생활 곳곳에 사용되는 철강 제품을 만들어요.  철강은 튼튼하고 튼튼해서 오랫동안 사용할 수 있고,  재활용도 잘 돼서 친환경적인 소재이기도 해요.  우리나라 산업 발전에 없어서는 안 될 중요한 회사예요.",
-            },
-            "현대제철": {
-                "current_price": random.randint(50000, 70000),
-                "price_history": [],
-                "description": "자동차와 건설의 뼈대, 현대제철!  현대자동차 그룹의 철강 회사이고,  자동차와 건설에 사용되는 철강 제품을 전문적으로 만들어요.  자동차 차체를 튼튼하게 만드는 철판,  건물을 짓는 뼈대 역할을 하는 철근,  배를 만드는 데 사용하는 후판 등 다양한 철강 제품을 만들어요.  최근에는 친환경 철강 제조 기술을 개발해서 더욱 깨끗한 환경을 만드는 데 노력하고 있답니다.  현대자동차 그룹의 성장에 큰 힘이 되는 회사예요.",
-            },
-        },
-        "운송(Transportation)": {
-            "대한항공": {
-                "current_price": random.randint(20000, 30000),
-                "price_history": [],
-                "description": "하늘을 나는 꿈, 대한항공!  우리나라 대표 항공사이고,  가장 많은 비행기를 가지고 있어요.  우리나라에서 다른 나라로 여행을 가거나,  다른 나라에서 우리나라로 여행을 올 때 대한항공 비행기를 많이 이용해요.  사람뿐 아니라 소중한 물건들을 안전하고 빠르게 전 세계로 운송하는 일도 하고 있답니다.  비행기 조종사, 승무원을 꿈꾸는 친구들이라면 누구나 가고 싶어 하는 회사일 거예요.",
-            },
-            "HMM": {
-                "current_price": random.randint(20000, 30000),
-                "price_history": [],
-                "description": "바다를 누비는 HMM!  우리나라 대표 해운 회사이고,  아주 큰 배들을 많이 가지고 있어요.  우리가 사용하는 물건들은 대부분 배를 통해서 다른 나라에서 우리나라로, 우리나라에서 다른 나라로 이동한답니다.  HMM은 컨테이너선이라는 큰 배로 물건들을 실어 나르는 일을 전문으로 하고 있어요.  우리나라와 전 세계를 연결하는 중요한 역할을 하는 회사예요.",
-            },
-        },
-        "엔터테인먼트(Entertainment)": {
-            "CJ ENM": {
-                "current_price": random.randint(80000, 120000),
-                "price_history": [],
-                "description": "즐거움을 디자인하는 CJ ENM!  텔레비전 방송, 영화, 음악, 공연 등 다양한 엔터테인먼트 사업을 하는 회사예요.  tvN, Mnet, OCN 같은 유명한 텔레비전 채널을 운영하고 있고,  '기생충', '부산행', '겨울왕국 2' 같은 유명한 영화들을 만들거나 투자했어요.  마마, KCON 같은 큰 음악 행사도 만들고,  뮤지컬, 연극 공연도 제작하는 등 우리 생활에 즐거움을 주는 다양한 문화 콘텐츠를 만들고 있어요.",
-            },
-            "하이브": {
-                "current_price": random.randint(200000, 300000),
-                "price_history": [],
-                "description": "음악으로 세상을 감동시키는 하이브!  전 세계적으로 엄청난 인기를 누리고 있는 방탄소년단(BTS)을 키운 회사예요.  BTS뿐 아니라 투모로우바이투게더(TXT), 세븐틴, 르세라핌, 뉴진스 등 인기 아이돌 그룹들이 많이 소속되어 있어요.  음반 제작, 매니지먼트, 공연뿐 아니라 게임, 웹툰, 교육 사업까지 확장해서 다양한 분야에서 즐거움을 주고 있답니다.  우리나라 대중문화를 세계에 알리는 데 큰 역할을 하는 회사예요.",
-            },
-        },
-        "식품(Food)": {
-            "오리온": {
-                "current_price": random.randint(120000, 180000),
-                "price_history": [],
-                "description": "맛있는 과자, 오리온!  우리나라 대표 과자 회사이고,  초코파이, 오!감자, 포카칩, 꼬북칩, 고래밥 등 맛있고 재미있는 과자들을 많이 만들어요.  어린이부터 어른까지 누구나 좋아하는 과자들을 만들어서,  우리나라뿐 아니라 중국, 러시아, 베트남 등 해외에서도 인기가 많답니다.  과자를 좋아하는 친구라면 오리온 과자를 한 번쯤 먹어봤을 거예요.",
-            },
-            "농심": {
-                "current_price": random.randint(300000, 400000),
-                "price_history": [],
-                "description": "국민 라면, 농심!  우리나라 대표 라면 회사이고,  신라면, 안성탕면, 짜파게티, 너구리, 새우깡 등 오랜 시간 동안 사랑받는 라면과 스낵들을 많이 만들어요.  매콤한 신라면, 구수한 안성탕면,  달콤 짭짤한 짜파게티,  얼큰한 너구리,  고소한 새우깡 등 다양한 맛과 종류의 라면과 스낵을 만들어서,  우리나라 사람들의 입맛을 즐겁게 해주고 있어요.  라면을 좋아하는 친구라면 농심 라면을 꼭 먹어봤을 거예요.",
-            },
-        },
-    }
-    for sector in st.session_state["stocks"]:  # 초기 price_history 채우기 (섹터별로 순회)
-        for stock_name in st.session_state["stocks"][sector]:
-            st.session_state["stocks"][sector][stock_name]["price_history"].append(
-                st.session_state["stocks"][sector][stock_name]["current_price"]
-            )
+    st.session_state["portfolio"] = new_portfolio()
+if "ledger_version" not in st.session_state:  # 포트폴리오에 반영한 주문 장부의 마지막 순번
+    st.session_state["ledger_version"] = 0
+if "ledger_pending" not in st.session_state:  # 포트폴리오에 반영했지만 아직 순번을 확인하지 못한 주문 번호
+    st.session_state["ledger_pending"] = []
+if "market_seed" not in st.session_state:  # 이 시장의 난수 씨앗 (처음 주가와 날짜별 변동)
+    st.session_state["market_seed"] = new_market_seed()
+if "stocks" not in st.session_state:  # 회사 설명은 catalog에만 있습니다.
+    st.session_state["stocks"] = catalog.new_market_stocks(st.session_state["market_seed"])
+if "price_history" not in st.session_state:  # 초기 주가 기록 채우기 (현재 주가를 첫날로)
+    st.session_state["price_history"] = PriceHistory.from_stocks(st.session_state["stocks"])
+if "ticker_index" not in st.session_state:  # 종목 이름 -> (섹터, 위치) 색인
+    st.session_state["ticker_index"] = TickerIndex(st.session_state["stocks"])
+
+SECTOR_NAMES = list(catalog.SECTOR_NAMES)  # 뉴스 해설에서 고를 섹터 이름
 
 if "news_analysis_results" not in st.session_state:
     st.session_state["news_analysis_results"] = {}
@@ -426,301 +376,494 @@ if 'buy_confirm' not in st.session_state:
     st.session_state['buy_confirm'] = False
 if 'sell_confirm' not in st.session_state:
     st.session_state['sell_confirm'] = False
+if "figure_cache" not in st.session_state:  # 최근에 만든 주가 그래프
+    st.session_state["figure_cache"] = charts.FigureCache()
+if "market_version" not in st.session_state:  # 주가가 바뀔 때마다 올라갑니다.
+    st.session_state["market_version"] = 0
+
+
+# --- 종목 색인 함수 ---
+def get_ticker_index():
+    # 종목 구성이 바뀌었으면 색인을 다시 만듭니다.
+    ticker_index = st.session_state.get("ticker_index")
+    if ticker_index is None or not ticker_index.matches(st.session_state["stocks"]):
+        ticker_index = TickerIndex(st.session_state["stocks"])
+        st.session_state["ticker_index"] = ticker_index
+    return ticker_index
 
 
 # --- 뉴스 생성 함수 ---
-def generate_news():
-    day_count = st.session_state["day_count"]
-    prompt = f"""
-지시:
-초등학생 6학년 수준에 맞춰서, 주식 시장과 경제에 관련된 뉴스 기사 5개를 생성해주세요.
-각 기사는 12~15문장 정도로 자세하게 작성하고, 특정 회사 이름이나 주식 종목을 직접적으로 언급하지 마세요.
-학생들이 뉴스를 읽고 어떤 회사가 유망할지 또는 쇠락할지 스스로 추론할 수 있도록 일반적인 경제 상황이나 산업 동향에 대한 뉴스를 만들어주세요.
-긍정적 뉴스, 부정적 뉴스, 중립적 뉴스 다양하게 생성하세요.(긍정, 부정, 중립 이라는 말은 표시하지 마세요.)
-뉴스에 따라 주식이 상승하기도 하고 하락하기도 할 수 있습니다.
-각 뉴스 기사는 "## 뉴스 [번호]" 로 시작해주세요. (예: ## 뉴스 1, ## 뉴스 2 ...)
-
-**생성된 뉴스 기사:**
-"""
-    chat_session = st.session_state["chat_session"]
-    response = chat_session.send_message(prompt)
-    news_text = response.text.strip()
-
-    news_articles = []
-    if news_text:
-        news_articles = [
-            article.strip() for article in news_text.split("## 뉴스 ") if article.strip()
-        ]
-
-    return news_articles[:5]
+def generate_news(day_count=None):
+    # 같은 반의 같은 날 뉴스는 한 번만 만들고 모두 함께 씁니다. day_count를 주지 않으면 오늘 뉴스입니다.
+    if day_count is None:
+        day_count = st.session_state["day_count"]
+    prompt_session = st.session_state["prompt_session"]
+
+    news_cache = get_news_cache()
+    cohort = get_cohort()
+
+    def create_news():
+        with shared_metrics.span("llm.news_request", day=day_count, format=NEWS_FORMAT):
+            return create_daily_news(prompt_session.send, news_cache, cohort, day_count)
+
+    with shared_metrics.span("generate_news", day=day_count):
+        return news_cache.get_or_create(cohort, day_count, "news", create_news)
+
+
+def create_daily_news(send, news_cache, cohort, day_count):
+    # JSON 형식이면 해설, 관련 섹터, 분위기를 기사와 함께 받아 반 공용 저장소에 넣어 둡니다.
+    # (하루가 지날 때 해설을 따로 요청하지 않습니다) 한 번 다시 요청해도 기사를 못 받으면 자유 문장 형식으로 만듭니다.
+    # 백그라운드 스레드에서도 부르므로 session_state를 쓰지 않습니다.
+    if NEWS_FORMAT == "json":
+        articles, meanings = generate_structured_news(
+            partial(send, generation_config=json_generation_config(SECTOR_NAMES)), day_count, SECTOR_NAMES
+        )
+        if articles:
+            news_cache.put(cohort, day_count, meanings_kind(articles), meanings)
+            return articles
+    return parse_news_articles(send(build_news_prompt(day_count)))
+
+
+def generate_text(prompt, generation_config=None):
+    # 대화 기록 없이 한 번만 요청합니다. 여러 스레드에서 동시에 불러도 됩니다.
+    options = {"generation_config": generation_config} if generation_config else {}
+    with shared_metrics.span("llm.request"):
+        response = get_model().generate_content(prompt, **options)
+    shared_usage.record(response)
+    return response.text
+
+
+# --- 반 전체 뉴스 저장소 ---
+@st.cache_resource
+def get_news_cache():
+    # 모든 세션이 함께 쓰는 뉴스 저장소입니다.
+    if NEWS_CACHE_STORE == "supabase":
+        return SharedNewsCache(SupabaseNewsStore(get_supabase()))
+    return SharedNewsCache(InMemoryNewsStore())
+
+
+def get_cohort():
+    return st.session_state.get("cohort") or DEFAULT_COHORT
+
+
+def meanings_kind(daily_news):
+    # 해설은 어떤 뉴스에 대한 것인지까지 구별해서 저장합니다.
+    return f"meanings:{news_key(daily_news)}"
 
 
 def explain_daily_news_meanings(daily_news):
     if daily_news is None:
         return {}
 
-    meanings = {}
-    for i, news_article in enumerate(daily_news):
-        prompt = f"""
-    **신문 기사:**
-    {news_article}
+    prompt_session = st.session_state["prompt_session"]
+
+    def create_meanings():
+        return news_meanings.explain(
+            daily_news,
+            send=shared_metrics.timed("llm.meaning_request", prompt_session.send),
+            mode=NEWS_MEANING_MODE,
+            retry_on=quota_errors(),
+            sector_names=SECTOR_NAMES,
+            # 동시 요청은 대화 기록을 공유하지 않는 generate_content로 보냅니다.
+            parallel_send=generate_text,
+        )
 
-    **지시:**
-    위 신문 기사의 핵심 의미를 초등학생 6학년이 이해하기 쉽게 3문장 이내로 요약해서 "해설: " 다음에 설명해주세요.
-    그리고 이 뉴스와 관련된 주식 섹터 1~2개를 쉼표로 구분해서 "관련 섹터: " 다음에 알려주세요. 관련 섹터가 없다면 "관련 섹터: 없음" 이라고 해주세요.
+    try:
+        with shared_metrics.span("explain_meanings", day=st.session_state["day_count"], mode=NEWS_MEANING_MODE):
+            return get_news_cache().get_or_create(
+                get_cohort(), st.session_state["day_count"], meanings_kind(daily_news), create_meanings
+            )
+    except quota_errors() as e:
+        st.error(
+            f"API 할당량 초과 오류가 발생했습니다. 잠시 후 다시 시도해주세요. 오류 메시지: {e}"
+        )
+        return None
 
-    뉴스 의미 해설:
-    """
-        chat_session = st.session_state["chat_session"]
-        try:
-            response = chat_session.send_message(prompt)
-            meaning_text = response.text.strip()
 
-            explanation = ""
-            related_sectors = []
+# --- 다음 날 미리 준비하기 ---
+@st.cache_resource
+def get_prefetch_executor():
+    # 모든 세션이 함께 쓰는 작업자 풀입니다.
+    return ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
 
-            if "해설:" in meaning_text:
-                explanation_start_index = meaning_text.find("해설:") + len("해설:")
-                explanation_end_index = meaning_text.find("관련 섹터:")
-                if explanation_end_index != -1:
-                    explanation = meaning_text[explanation_start_index:explanation_end_index].strip()
-                else:
-                    explanation = meaning_text[explanation_start_index:].strip()
 
-            if "관련 섹터:" in meaning_text:
-                related_sectors_str = meaning_text.split("관련 섹터:")[1].strip()
-                if related_sectors_str.lower() != "없음":
-                    related_sectors = [sector.strip() for sector in related_sectors_str.split(',')]
-                else:
-                    related_sectors = [] # "없음" explicitly means empty list
+@st.cache_resource
+def get_fast_forward_executor():
+    # 빨리 감기 전용 작업자 풀입니다. 여러 날의 AI 요청이 미리 준비하기 풀을 차지해 다른 세션이 기다리지 않게 합니다.
+    return ThreadPoolExecutor(max_workers=FAST_FORWARD_WORKERS, thread_name_prefix="fast_forward")
 
-            meanings[str(i + 1)] = {"explanation": explanation, "sectors": related_sectors}
 
+def prefetch_explain_meanings(news_cache, cohort, day_count, daily_news):
+    # 백그라운드 스레드에서 실행되므로 session_state를 쓰지 않습니다.
+    def create_meanings():
+        return news_meanings.explain(
+            daily_news,
+            send=generate_text,
+            mode=NEWS_MEANING_MODE,
+            retry_on=quota_errors(),
+            sector_names=SECTOR_NAMES,
+            parallel_send=generate_text,
+        )
+
+    with shared_metrics.span("prefetch.explain_meanings", day=day_count):
+        return news_cache.get_or_create(
+            cohort, day_count, meanings_kind(daily_news), create_meanings
+        ) or None
+
+
+def prefetch_generate_news(news_cache, cohort, day_count):
+    def create_news():
+        return create_daily_news(generate_text, news_cache, cohort, day_count)
+
+    with shared_metrics.span("prefetch.generate_news", day=day_count):
+        return news_cache.get_or_create(cohort, day_count, "news", create_news) or None
+
+
+def ensure_prefetch():
+    # 오늘 뉴스가 보이면 해설과 다음 날 뉴스를 미리 만들기 시작합니다.
+    if not PREFETCH_ENABLED or not st.session_state.get("daily_news"):
+        return
+    job = st.session_state.get("prefetch_job")
+    if job is not None and job.matches(st.session_state["day_count"], st.session_state["daily_news"]):
+        return
+    cancel_prefetch()
+    st.session_state["prefetch_job"] = PrefetchJob(
+        get_prefetch_executor(),
+        st.session_state["day_count"],
+        st.session_state["daily_news"],
+        # 저장소는 스크립트 스레드에서 꺼내 백그라운드 작업에 넘겨줍니다.
+        partial(prefetch_explain_meanings, get_news_cache(), get_cohort(), st.session_state["day_count"]),
+        partial(prefetch_generate_news, get_news_cache(), get_cohort()),
+    )
+
+
+def take_prefetch():
+    # 미리 만든 (뉴스 해설, 다음 날 뉴스)를 꺼냅니다. 오늘 상태와 맞지 않으면 버리고 (None, None)을 돌려줍니다.
+    job = st.session_state.pop("prefetch_job", None)
+    if job is None:
+        return None, None
+    if not job.matches(st.session_state["day_count"], st.session_state["daily_news"]):
+        job.cancel()
+        return None, None
+    return job.results(timeout=PREFETCH_TIMEOUT)
+
+
+def cancel_prefetch():
+    job = st.session_state.pop("prefetch_job", None)
+    if job is not None:
+        job.cancel()
 
-        except google.api_core.exceptions.ResourceExhausted as e:
-            st.error(
-                f"API 할당량 초과 오류가 발생했습니다. 잠시 후 다시 시도해주세요. 오류 메시지: {e}"
-            )
-            return None
-        time.sleep(1)
-    return meanings
 
+# --- 시뮬레이션 상태 ---
+# 거래와 주가 변동은 stocksim.simulation에서 하고, 여기서는 세션 상태를 넘기고 결과를 화면에 보여 줍니다.
+EVENT_DISPLAY = {"success": (st.success, "✅"), "error": (st.error, "❌"), "info": (st.info, "📈")}
 
-def buy_stock(stock_name, quantity, sector):
+
+def get_market():
+    # 세션의 주가, 주가 기록, 색인을 그대로 묶습니다. (복사하지 않으므로 바뀐 내용이 세션에 바로 반영됩니다)
+    return Market(
+        st.session_state["stocks"],
+        st.session_state["price_history"],
+        get_ticker_index(),
+        st.session_state["day_count"],
+        st.session_state["market_seed"],
+    )
+
+
+def get_account():
+    return Account(st.session_state["portfolio"])
+
+
+def get_order_ledger():
+    # 세션 포트폴리오의 주문 장부입니다. 로그인했거나 포트폴리오를 복원했으면 새로 만들고,
+    # 마지막 중간 저장 뒤에(다른 탭 등에서) 체결된 주문을 반영합니다.
+    ledger = st.session_state.get("order_ledger")
+    account = st.session_state.get("user_id")
     if (
-        sector not in st.session_state["stocks"]
-        or stock_name not in st.session_state["stocks"][sector]
+        ledger is not None
+        and ledger.account.portfolio is st.session_state["portfolio"]
+        and (ledger.store is None) == (account is None)
     ):
-        st.session_state["messages"].append(
-            {"type": "error", "text": "존재하지 않는 주식 종목입니다."}
-        )
-        return
+        return ledger
+    store = SupabaseOrderStore(get_supabase(), account) if account else None
+    ledger = OrderLedger(
+        get_account(),
+        st.session_state["ledger_version"],
+        store,
+        submit=queue_order if store is not None and SAVE_MODE == "write_behind" else None,
+        pending=st.session_state["ledger_pending"],
+    )
+    st.session_state["order_ledger"] = ledger
+    try:
+        ledger.catch_up()
+    except Exception as e:
+        st.warning(f"다른 곳에서 한 거래를 불러오지 못했습니다. 거래할 때 다시 확인합니다: {str(e)}")
+    sync_ledger_version(ledger)
+    return ledger
 
-    if quantity <= 0:
-        st.session_state["messages"].append(
-            {"type": "error", "text": "매수 수량은 1주 이상이어야 합니다."}
-        )
-        return
 
-    stock_price = st.session_state["stocks"][sector][stock_name]["current_price"]
-    max_quantity = st.session_state["portfolio"]["cash"] // stock_price
-    if quantity > max_quantity:
-        st.session_state["messages"].append(
-            {
-                "type": "error",
-                "text": f"매수 가능 수량을 초과했습니다. (최대 {max_quantity}주까지 매수 가능)",
-            }
-        )
-        st.toast(
-            f"매수 가능 수량을 초과했습니다. (최대 {max_quantity}주까지 매수 가능)", icon="❌"
-        )
-        st.error(f"잔액이 부족합니다. (최대 {max_quantity}주까지 매수 가능)")
-        return
+def sync_ledger_version(ledger):
+    if ledger.version != st.session_state["ledger_version"]:
+        st.session_state["ledger_version"] = ledger.version
+    pending = sorted(ledger.pending)
+    if pending != st.session_state["ledger_pending"]:
+        st.session_state["ledger_pending"] = pending
 
-    total_price = stock_price * quantity
-
-    if st.session_state["portfolio"]["cash"] >= total_price:
-        st.session_state["portfolio"]["cash"] -= total_price
-        portfolio_stocks = st.session_state["portfolio"]["stocks"]
-        if (
-            stock_name in portfolio_stocks
-        ):
-            portfolio_stocks[stock_name]["quantity"] += quantity
-            portfolio_stocks[stock_name]["purchase_price"] = (
-                portfolio_stocks[stock_name]["purchase_price"]
-                * (portfolio_stocks[stock_name]["quantity"] - quantity)
-                + total_price
-            ) / portfolio_stocks[stock_name]["quantity"]
-        else:
-            portfolio_stocks[stock_name] = {
-                "quantity": quantity,
-                "purchase_price": total_price / quantity,
-            }
-        st.session_state["messages"].append(
-            {
-                "type": "success",
-                "text": f"{stock_name} {quantity}주 매수 완료. 총 {total_price:,.0f}원 소요.",
-            }
-        )
-        st.success(f"{stock_name} {quantity}주 매수 완료. 총 {total_price:,.0f}원 소요.")
-        st.toast(
-            f"{stock_name} {quantity}주 매수 완료. 총 {total_price:,.0f}원 소요.", icon="✅"
+
+def queue_order(order):
+    # write_behind 방식에서는 체결한 주문도 저장 대기열에 넣습니다. (거래할 때 데이터베이스를 기다리지 않습니다)
+    # 순번은 쓸 때 정하고, 다시 보내도 주문 번호로 한 번만 들어갑니다.
+    get_write_behind_queue().submit(get_user_persistence(), PendingWrite(orders=[order]))
+
+
+def execute_order(order_id, kind, stock_name, quantity, sector=None):
+    # 주문 번호가 같은 주문은 한 번만 체결하고, 체결된 거래는 주문 장부에 한 줄만 덧붙입니다. (write_behind면 대기열로)
+    # (포트폴리오 전체는 하루 지나기, 뉴스 생성, 로그아웃 때 중간 저장본으로 저장합니다)
+    ledger = get_order_ledger()
+    order_id = order_id or uuid.uuid4().hex
+    with shared_metrics.span("order", kind=kind):
+        result = ledger.execute(
+            get_market(), order_id, kind, stock_name, quantity, sector, day=st.session_state["day_count"]
         )
+    sync_ledger_version(ledger)
+    show_result(result)
+    return result
+
+
+def show_result(result):
+    for event in result.events:
+        show, icon = EVENT_DISPLAY[event.kind]
+        st.session_state["messages"].append({"type": event.kind, "text": event.text})
+        st.toast(event.text, icon=icon)
+        show(event.text)
+
+
+def order_done(result):
+    # 체결됐거나 이미 체결된 주문이면 확인 창을 닫습니다. 실패하면 열어 두어 다시 시도할 수 있습니다.
+    return bool(result) or result.data.get("duplicate", False)
+
+
+def buy_stock(stock_name, quantity, sector, order_id):
+    if order_done(execute_order(order_id, "buy", stock_name, quantity, sector)):
         st.session_state['buy_confirm'] = False
+
+
+def sell_stock(stock_name, quantity, order_id):
+    if order_done(execute_order(order_id, "sell", stock_name, quantity)):
+        st.session_state['sell_confirm'] = False
+
+
+def set_daily_news(daily_news):
+    # 반 모드에서는 반 시장에 오늘 뉴스로 넣습니다. (먼저 들어온 뉴스가 있으면 그것을 씁니다)
+    if MARKET_MODE == "cohort":
+        get_cohort_market().set_daily_news(st.session_state["day_count"], daily_news)
+        sync_cohort_market()
     else:
-        st.session_state["messages"].append(
-            {"type": "error", "text": "잔액이 부족합니다."}
-        )
-        st.toast("잔액이 부족합니다.", icon="❌")
-        st.error(f"잔액이 부족합니다. (최대 {max_quantity}주까지 매수 가능)")
-        st.session_state['buy_confirm'] = False
+        st.session_state["daily_news"] = daily_news
 
 
-def sell_stock(stock_name, quantity):
-    if stock_name not in st.session_state["portfolio"]["stocks"]:
-        st.session_state["messages"].append(
-            {"type": "error", "text": "보유하고 있지 않은 주식입니다."}
+def update_stock_prices():
+    with shared_metrics.span("update_stock_prices", tickers=len(get_ticker_index())):
+        result = get_market().pass_day(
+            st.session_state["daily_news"], st.session_state["news_meanings"], use_llm_sentiment=USE_LLM_SENTIMENT
         )
-        st.error("보유하고 있지 않은 주식입니다.")
-        st.toast("보유하고 있지 않은 주식입니다.", icon="❌")
+    if not result:
         return
+    st.session_state["market_version"] += 1
+    show_result(result)
+    st.session_state["sector_news_impact"] = result.data["sector_impacts"]
+
+
+# --- 반 공용 시장 ---
+# 반 모드에서는 주가, 주가 기록, 뉴스를 반 시장(stocksim.cohort_market)에 두고 세션은 참조만 합니다.
+# 세션에서 주가를 직접 바꾸지 않고, 진행은 반 시장의 advance()로만 합니다.
+def load_cohort_state(cohort):
+    persistence = get_cohort_persistence(cohort)
+    saved_state = persistence.load()
+    if not saved_state:
+        return None
+    # 씨앗이 없던 예전 반 시장은 새 씨앗을 정해 다음 저장 때 함께 저장합니다.
+    market_seed = saved_state.get("market_seed") or new_market_seed()
+    return CohortState(
+        saved_state.get("stocks") or catalog.new_market_stocks(market_seed),
+        saved_state.get("price_history"),
+        saved_state.get("day_count", 1),
+        saved_state.get("daily_news"),
+        saved_state.get("previous_daily_news"),
+        saved_state.get("news_meanings"),
+        market_seed=market_seed,
+    )
 
-    owned_quantity = st.session_state["portfolio"]["stocks"][stock_name]["quantity"]
 
-    if owned_quantity < quantity:
-        st.session_state["messages"].append(
-            {"type": "error", "text": "매도 수량이 보유 주식 수를 초과했습니다."}
-        )
-        st.error("매도 수량이 보유 주식 수를 초과했습니다.")
-        st.toast("매도 수량이 보유 주식 수를 초과했습니다.", icon="❌")
-        return
+def new_cohort_state():
+    market_seed = new_market_seed()
+    return CohortState(catalog.new_market_stocks(market_seed), market_seed=market_seed)
 
-    if quantity <= 0:
-        st.session_state["messages"].append(
-            {"type": "error", "text": "잘못된 매도 수량입니다."}
-        )
-        st.error("잘못된 매도 수량입니다.")
-        st.toast("잘못된 매도 수량입니다.", icon="❌")
-        return
 
-    stock_price = 0
-    stock_sector = ""
-    for sector, stocks in st.session_state["stocks"].items():
-        if stock_name in stocks:
-            stock_price = stocks[stock_name]["current_price"]
-            stock_sector = sector
-            break
-
-    if stock_price == 0:
-        st.session_state["messages"].append(
-            {"type": "error", "text": "주식 정보를 찾을 수 없습니다."}
-        )
-        return
+def save_cohort_state(cohort_market):
+    # 반 시장이 바뀔 때마다 반 시장 잠금 안에서 불립니다. 하루에 몇 번뿐이므로 바로 저장합니다.
+    state = cohort_market.state
+    try:
+        with shared_metrics.span("save_cohort_state", cohort=cohort_market.cohort, day=state.day_count):
+            get_cohort_persistence(cohort_market.cohort).save(state.saved_values(), state.price_history)
+    except Exception as e:
+        st.error(f"반 시장을 저장하는 중 오류가 발생했습니다. 다음에 바뀔 때 다시 저장합니다: {str(e)}")
 
-    sell_price = stock_price * quantity
-    st.session_state["portfolio"]["cash"] += sell_price
-    st.session_state["portfolio"]["stocks"][stock_name]["quantity"] -= quantity
-    if st.session_state["portfolio"]["stocks"][stock_name]["quantity"] == 0:
-        del st.session_state["portfolio"]["stocks"][stock_name]
 
-    st.session_state["messages"].append(
-        {
-            "type": "success",
-            "text": f"{stock_name} {quantity}주 매도 완료. 총 {sell_price:,.0f}원 획득.",
-        }
-    )
-    st.toast(
-        f"{stock_name} {quantity}주 매도 완료. 총 {sell_price:,.0f}원 획득.", icon="✅"
+@st.cache_resource
+def get_cohort_markets():
+    # 모든 세션이 함께 쓰는 반 시장 목록입니다.
+    return CohortMarkets(load_cohort_state, new_cohort_state, on_change=save_cohort_state)
+
+
+@st.cache_resource
+def get_cohort_persistence(cohort):
+    return DeltaPersistence(
+        get_supabase(),
+        cohort,
+        state_table="cohort_state",
+        history_table="cohort_price_history",
+        snapshot_format=SNAPSHOT_FORMAT,
+        key_column="cohort",
     )
-    st.success(f"{stock_name} {quantity}주 매도 완료. 총 {sell_price:,.0f}원 획득.")
-    st.session_state['sell_confirm'] = False
 
 
-def update_stock_prices():
-    if not st.session_state["daily_news"]:
-        return
+def get_cohort_market():
+    return get_cohort_markets().get(get_cohort())
 
-    sector_impacts = {sector: 0 for sector in st.session_state["stocks"]}
 
-    for i, news_article in enumerate(st.session_state["daily_news"]):
-        news_meaning = st.session_state["news_meanings"].get(str(i + 1))
-        if news_meaning:
-            related_sectors = news_meaning.get("sectors", [])
-            news_explanation = news_meaning.get("explanation", "")
+def sync_cohort_market():
+    # 반 시장이 바뀌었으면(다른 학생이 진행했거나 뉴스를 만들었으면) 세션이 새 상태를 가리키게 합니다.
+    if MARKET_MODE != "cohort":
+        return
+    state = get_cohort_market().state
+    if st.session_state.get("cohort_state") is state:
+        return
+    day_changed = st.session_state.get("cohort_state") is not None and state.day_count != st.session_state["day_count"]
+    st.session_state.update(state.session_values())
+    st.session_state["cohort_state"] = state
+    st.session_state["market_version"] += 1
+    if day_changed:
+        cancel_prefetch()
 
-            news_sentiment = 0
-            if "상승" in news_article or "성장" in news_article or "긍정적" in news_article or "유망" in news_article or "호황" in news_article:
-                news_sentiment = 1
-            elif "하락" in news_article or "감소" in news_article or "부정적" in news_article or "어려움" in news_article or "침체" in news_article or "위기" in news_article:
-                news_sentiment = -1
-            else:
-                news_sentiment = 0
-
-            for sector in related_sectors:
-                if sector in sector_impacts:
-                    sector_impacts[sector] += news_sentiment * 0.05
-
-    for sector in st.session_state["stocks"]:
-        sector_impact = sector_impacts[sector]
-        for stock_name in st.session_state["stocks"][sector]:
-            change_rate = random.uniform(-0.02, 0.02) + sector_impact
-            change_rate = max(-0.3, min(0.3, change_rate))
-            st.session_state["stocks"][sector][stock_name]["current_price"] *= (
-                1 + change_rate
-            )
-            st.session_state["stocks"][sector][stock_name]["current_price"] = max(
-                1, int(st.session_state["stocks"][sector][stock_name]["current_price"])
-            )
-            st.session_state["stocks"][sector][stock_name]["price_history"].append(
-                st.session_state["stocks"][sector][stock_name]["current_price"]
-            )
-    st.session_state["messages"].append({"type": "info", "text": "주가가 변동되었습니다."})
-    st.toast("주가가 변동되었습니다.", icon="📈")
-    st.info("주가가 변동되었습니다.")
-    st.session_state["sector_news_impact"] = sector_impacts
+
+def advance_cohort_market(start_day, daily_news_list, meanings_list, next_daily_news):
+    result = get_cohort_market().advance(
+        start_day, daily_news_list, meanings_list, next_daily_news, use_llm_sentiment=USE_LLM_SENTIMENT
+    )
+    sync_cohort_market()
+    show_result(result)
+    return result
+
+
+def pass_cohort_day():
+    # 오늘 뉴스 해설과 다음 날 뉴스는 반 공용 뉴스 저장소에서 한 번만 만들어지고, 반 시장은 하루에 한 번만 진행합니다.
+    start_day = st.session_state["day_count"]
+    daily_news = st.session_state["daily_news"]
+    meanings, next_daily_news = take_prefetch()
+    if meanings is None:
+        meanings = explain_daily_news_meanings(daily_news)
+    next_daily_news = next_daily_news or generate_news(start_day + 1)
+    advance_cohort_market(start_day, [daily_news], [meanings or {}], next_daily_news)
+
+
+# --- 빨리 감기 (여러 날 한 번에 진행) ---
+def fast_forward(days, generate_missing_news=False):
+    # 반 시장을 여러 날 한 번에 진행합니다. (반 모드에서만 씁니다. 학생마다 시장이 따로인 personal 모드에서는
+    # 선생님 세션의 시장만 움직이므로 쓰지 않습니다)
+    # 날짜별 뉴스와 해설은 반 공용 저장소에 미리 만들어 둔 것을 쓰고, generate_missing_news면 없는 날의 것을
+    # 빨리 감기 전용 작업자 풀에서 동시에 만듭니다. 뉴스가 없는 날은 무작위 변동만 있습니다.
+    # 가져오거나 만들지 못한 날은 뉴스 없는 날로 진행하고, 단계별 기록(shared_metrics)과 돌려주는 failed_days에 남깁니다.
+    start_day = st.session_state["day_count"]
+    day_numbers = list(range(start_day, start_day + days))
+    cohort = get_cohort()
+    news_cache = get_news_cache()
+    prefetched_meanings, prefetched_next_news = take_prefetch()
+    # 작업자 스레드에서는 session_state를 읽을 수 없으므로 오늘 뉴스는 미리 꺼내 둡니다.
+    today_news = st.session_state["daily_news"] or []
+    failed_days = set()
+
+    def day_news(day):
+        if day == start_day:
+            return today_news
+        if day == start_day + 1 and prefetched_next_news:
+            return prefetched_next_news
+        try:
+            with shared_metrics.span("fast_forward.news", day=day):
+                if generate_missing_news:
+                    return prefetch_generate_news(news_cache, cohort, day) or []
+                return news_cache.get(cohort, day, "news") or []
+        except Exception:
+            failed_days.add(day)
+            return []
+
+    def day_meanings(day, daily_news):
+        if not daily_news:
+            return {}
+        if day == start_day and prefetched_meanings:
+            return prefetched_meanings
+        try:
+            with shared_metrics.span("fast_forward.meanings", day=day):
+                if generate_missing_news:
+                    return prefetch_explain_meanings(news_cache, cohort, day, daily_news) or {}
+                return news_cache.get(cohort, day, meanings_kind(daily_news)) or {}
+        except Exception:
+            failed_days.add(day)
+            return {}
+
+    executor = get_fast_forward_executor()
+    daily_news_list = list(executor.map(day_news, day_numbers))
+    meanings_list = list(executor.map(day_meanings, day_numbers, daily_news_list))
+    # 반 시장을 한 번에 진행합니다. 학생들은 다음 실행 때 새 상태를 봅니다.
+    result = advance_cohort_market(start_day, daily_news_list, meanings_list, generate_news(start_day + days))
+    if not result:
+        return {"days": 0, "news_days": 0, "failed_days": len(failed_days)}
+    return {
+        "days": st.session_state["day_count"] - start_day,
+        "news_days": sum(1 for daily_news in daily_news_list if daily_news),
+        "failed_days": len(failed_days),
+    }
 
 
 def display_portfolio():
-    portfolio = st.session_state["portfolio"]
-    cash = portfolio["cash"]
-    total_value = cash
-    total_purchase_value = 0
-    for stock_name, stock_info in portfolio["stocks"].items():
-        quantity = stock_info["quantity"]
-        purchase_price = stock_info["purchase_price"]
-        current_price = 0
-        stock_sector = ""
-        for sector, stocks in st.session_state["stocks"].items():
-            if stock_name in stocks:
-                current_price = stocks[stock_name]["current_price"]
-                stock_sector = sector
-                break
-        if current_price != 0:
-            stock_value = current_price * quantity
-            total_value += stock_value
-            purchase_value = purchase_price * quantity
-            total_purchase_value += purchase_value
-
-    initial_cash = 10000000
-    total_profit_loss = total_value - initial_cash
-    total_profit_rate = (
-        (total_profit_loss / initial_cash) * 100 if initial_cash != 0 else 0
-    )
+    totals = get_account().valuation(get_market())
+    return totals["cash"], totals["total_value"], totals["total_profit_rate"]
 
-    return cash, total_value, total_profit_rate
 
+# --- 화면 캐시 ---
+# 캐시 열쇠는 표에 보이는 내용에서 만듭니다. 세션마다 따로 올리는 번호를 쓰면
+# 같은 계정을 연 두 세션이 서로 다른 주가를 같은 열쇠로 넣을 수 있기 때문입니다. (내용이 같으면 함께 써도 됩니다)
+def get_view_key():
+    # 주가 표 캐시 열쇠: 종목 구성과 최근 이틀 주가의 해시 (표에 보이는 현재 주가와 전일 대비가 여기서 나옵니다)
+    digest = hashlib.sha1(repr(get_ticker_index().membership).encode("utf-8"))
+    digest.update(st.session_state["price_history"].matrix()[:, -2:].tobytes())
+    return ("market", digest.hexdigest())
 
-def display_stock_prices():
+
+def get_portfolio_key(portfolio):
+    # 포트폴리오 표 캐시 열쇠: 포트폴리오 내용의 해시
+    data = json.dumps(portfolio, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+def get_market_view_key():
+    # 주가 표 캐시 열쇠. 반 모드에서는 반 시장 상태마다 한 번만 만들어 반 전체가 함께 씁니다.
+    if MARKET_MODE == "cohort":
+        return ("cohort", get_cohort(), st.session_state["cohort_state"].version)
+    return get_view_key()
+
+
+@st.cache_data(max_entries=VIEW_CACHE_ENTRIES, ttl=VIEW_CACHE_TTL, show_spinner=False)
+def build_stocks_table(view_key, _stocks, _price_history):
+    # _로 시작하는 인자는 캐시 열쇠에 쓰지 않습니다. (view_key가 내용을 대신합니다)
+    daily_change_rates = _price_history.daily_change_rates()  # 전 종목 등락률을 한 번에 계산
     stocks_data = []
-    for sector, sector_stocks in st.session_state["stocks"].items():
+    for sector, sector_stocks in _stocks.items():
         for stock_name, stock_info in sector_stocks.items():
-            price_history = stock_info["price_history"]
             daily_change_rate_str = " - " # 기본값
-            if len(price_history) >= 2:
-                previous_day_price = price_history[-2]
-                current_price = price_history[-1]
-                daily_change_rate = (current_price - previous_day_price) / previous_day_price * 100
-                daily_change_rate_str = f"{daily_change_rate:.2f}%"
+            slot = _price_history.index.get(stock_name)
+            if daily_change_rates is not None and slot is not None:
+                daily_change_rate_str = f"{daily_change_rates[slot]:.2f}%"
 
             stocks_data.append(
                 {
@@ -728,11 +871,16 @@ def display_stock_prices():
                     "섹터": sector,
                     "현재 주가": f"{stock_info['current_price']:,} 원",
                     "전일 대비": daily_change_rate_str, # 전일 대비 등락률 추가
-                    "price_history": stock_info["price_history"],
-                    "description": stock_info["description"],
                 }
             )
-    stocks_df = pd.DataFrame(stocks_data)
+    return pd.DataFrame(stocks_data)
+
+
+def display_stock_prices():
+    price_history = st.session_state["price_history"]
+    if price_history.offset:
+        st.caption(f"최근 {price_history.days}일 기록을 보여 주고 있습니다. 앞쪽 기록을 불러오는 중입니다.")
+    stocks_df = build_stocks_table(get_market_view_key(), st.session_state["stocks"], price_history)
     st.dataframe(stocks_df[["섹터", "종목", "현재 주가", "전일 대비"]], hide_index=True) # "전일 대비" 컬럼 추가
 
     selected_stock_all_info = st.selectbox(
@@ -747,101 +895,127 @@ def display_stock_prices():
         with col1_info:
             st.subheader("기업 정보")
             st.info(
-                f"**{selected_stock_all_info} ({selected_stock_sector})**\n\n{st.session_state['stocks'][selected_stock_sector][selected_stock_all_info]['description']}"
+                f"**{selected_stock_all_info} ({selected_stock_sector})**\n\n{catalog.description(selected_stock_all_info)}"
             )
 
         with col2_graph:
             st.subheader("주가 그래프")
-            price_history_df = pd.DataFrame(
-                {
-                    "날짜": range(
-                        1,
-                        len(
-                            st.session_state["stocks"][selected_stock_sector][
-                                selected_stock_all_info
-                            ]["price_history"]
-                        )
-                        + 1,
-                    ),
-                    "주가": st.session_state["stocks"][selected_stock_sector][
-                        selected_stock_all_info
-                    ]["price_history"],
-                }
-            )
-            fig = px.line(
-                price_history_df,
-                x="날짜",
-                y="주가",
-                title=f"{selected_stock_all_info} ({selected_stock_sector}) 주가 변동",
+            chart_type = st.radio(
+                "그래프 종류", ["종목 주가", "여러 종목 비교", "섹터 비교"], horizontal=True, key="chart_type"
             )
-            st.plotly_chart(fig)
+            # 그래프는 (종류, 종목, 기록 길이) 별로 보관해 두고, 긴 기록은 점 수를 줄여서 그립니다.
+            figure_cache = st.session_state["figure_cache"]
+            history_key = (len(price_history), st.session_state["market_version"])
+            fig = None
+            if chart_type == "여러 종목 비교":
+                compare_stock_names = st.multiselect(
+                    "비교할 종목", stocks_df["종목"].tolist(), default=[selected_stock_all_info], key="chart_compare"
+                )
+                if compare_stock_names:
+                    fig = figure_cache.get_or_build(
+                        ("compare", tuple(compare_stock_names)) + history_key,
+                        lambda: charts.compare_figure(price_history, compare_stock_names, "여러 종목 주가 비교"),
+                    )
+            elif chart_type == "섹터 비교":
+                sector_stock_names = list(st.session_state["stocks"][selected_stock_sector])
+                fig = figure_cache.get_or_build(
+                    ("sector", selected_stock_sector) + history_key,
+                    lambda: charts.sector_figure(price_history, sector_stock_names, selected_stock_sector),
+                )
+            else:
+                fig = figure_cache.get_or_build(
+                    ("price", selected_stock_all_info) + history_key,
+                    lambda: charts.price_figure(
+                        price_history,
+                        selected_stock_all_info,
+                        f"{selected_stock_all_info} ({selected_stock_sector}) 주가 변동",
+                    ),
+                )
+            if fig is not None:
+                st.plotly_chart(fig)
+            else:
+                st.info("비교할 종목을 골라주세요.")
     else:
         st.info("종목을 선택하여 기업 정보와 주가 그래프를 확인하세요.")
 
 
-def display_portfolio_table():
-    portfolio = st.session_state["portfolio"]
-    if portfolio["stocks"]:
-        portfolio_data = []
-        total_value = portfolio["cash"]
-        total_purchase_value = 0
-        total_profit_loss = 0
-        total_profit_rate = 0.0
-        for stock_name, stock_info in portfolio["stocks"].items():
-            quantity = stock_info["quantity"]
-            purchase_price = stock_info["purchase_price"]
-            current_price = 0
-            stock_sector = ""
-            for sector, stocks in st.session_state["stocks"].items():
-                if stock_name in stocks:
-                    current_price = stocks[stock_name]["current_price"]
-                    stock_sector = sector
-                    break
-
-            if current_price == 0:
-                continue
-
-            stock_value = current_price * quantity
-            purchase_value = purchase_price * quantity
-            profit_loss = stock_value - purchase_value
-            profit_rate = (
-                (profit_loss / purchase_value) * 100 if purchase_value != 0 else 0
-            )
-            total_value += stock_value
-            total_purchase_value += purchase_value
-            total_profit_loss += profit_loss
+@st.cache_data(max_entries=VIEW_CACHE_ENTRIES, ttl=VIEW_CACHE_TTL, show_spinner=False)
+def build_portfolio_table(view_key, portfolio_key, _portfolio, _stocks, _ticker_index):
+    # 포트폴리오 표와 합계를 만듭니다. 주가(view_key)나 포트폴리오(portfolio_key)가 바뀌면 다시 만듭니다.
+    portfolio = _portfolio
+    portfolio_data = []
+    total_value = portfolio["cash"]
+    total_purchase_value = 0
+    total_profit_loss = 0
+    total_profit_rate = 0.0
+    for stock_name, stock_info in portfolio["stocks"].items():
+        quantity = stock_info["quantity"]
+        purchase_price = stock_info["purchase_price"]
+        current_price = _ticker_index.price(_stocks, stock_name)
+        stock_sector = _ticker_index.sector_of(stock_name)
+
+        if current_price == 0:
+            continue
+
+        stock_value = current_price * quantity
+        purchase_value = purchase_price * quantity
+        profit_loss = stock_value - purchase_value
+        profit_rate = (
+            (profit_loss / purchase_value) * 100 if purchase_value != 0 else 0
+        )
+        total_value += stock_value
+        total_purchase_value += purchase_value
+        total_profit_loss += profit_loss
 
-            portfolio_data.append(
-                {
-                    "종목": stock_name,
-                    "섹터": stock_sector,
-                    "보유 수량": quantity,
-                    "매수 단가": f"{purchase_price:,.0f} 원",
-                    "현재가": f"{current_price:,.0f} 원",
-                    "평가액": f"{stock_value:,.0f} 원",
-                    "손익": f"{profit_loss:,.0f} 원",
-                    "수익률": f"{profit_rate:.2f}%",
-                }
-            )
         portfolio_data.append(
             {
-                "종목": "현금",
-                "섹터": "-",
-                "보유 수량": "-",
-                "매수 단가": "-",
-                "현재가": "-",
-                "평가액": f"{portfolio['cash']:,} 원",
-                "손익": "-",
-                "수익률": "-",
+                "종목": stock_name,
+                "섹터": stock_sector,
+                "보유 수량": quantity,
+                "매수 단가": f"{purchase_price:,.0f} 원",
+                "현재가": f"{current_price:,.0f} 원",
+                "평가액": f"{stock_value:,.0f} 원",
+                "손익": f"{profit_loss:,.0f} 원",
+                "수익률": f"{profit_rate:.2f}%",
             }
         )
-        portfolio_df = pd.DataFrame(portfolio_data)
+    portfolio_data.append(
+        {
+            "종목": "현금",
+            "섹터": "-",
+            "보유 수량": "-",
+            "매수 단가": "-",
+            "현재가": "-",
+            "평가액": f"{portfolio['cash']:,} 원",
+            "손익": "-",
+            "수익률": "-",
+        }
+    )
+    totals = {
+        "total_value": total_value,
+        "total_purchase_value": total_purchase_value,
+        "total_profit_loss": total_profit_loss,
+        "total_profit_rate": total_profit_rate,
+    }
+    return pd.DataFrame(portfolio_data), totals
+
+
+def display_portfolio_table():
+    portfolio = st.session_state["portfolio"]
+    if portfolio["stocks"]:
+        portfolio_df, totals = build_portfolio_table(
+            get_market_view_key(),
+            get_portfolio_key(portfolio),
+            portfolio,
+            st.session_state["stocks"],
+            get_ticker_index(),
+        )
         st.dataframe(portfolio_df, hide_index=True, height=350)
         st.markdown(
             f"""**현금 잔고:** {portfolio['cash']:,} 원
-    **📊 총 평가액:** {total_value:,.0f} 원
-    **🛒 총 매수 금액:** {total_purchase_value:,.0f} 원
-    **📈📉 총 손익:** {total_profit_loss:,.0f} 원  (🚀 수익률: {total_profit_rate:.2f}%)
+    **📊 총 평가액:** {totals['total_value']:,.0f} 원
+    **🛒 총 매수 금액:** {totals['total_purchase_value']:,.0f} 원
+    **📈📉 총 손익:** {totals['total_profit_loss']:,.0f} 원  (🚀 수익률: {totals['total_profit_rate']:.2f}%)
     """
         )
     else:
@@ -870,16 +1044,100 @@ def display_stock_glossary():
         st.markdown("---")
 
 
+# --- AI 요청 현황 ---
+def display_llm_usage():
+    # 요청 크기가 날짜와 상관없이 일정한지 확인할 수 있도록 기록 길이와 토큰 사용량을 보여줍니다.
+    prompt_session = st.session_state["prompt_session"]
+    usage = prompt_session.stats.as_dict()
+    background_usage = shared_usage.as_dict()
+    with st.sidebar.expander("🤖 AI 요청 현황", expanded=False):
+        st.markdown(f"**요청 방식:** {prompt_session.mode}")
+        st.markdown(f"**대화 기록 길이:** {prompt_session.history_length()}개")
+        st.markdown(f"**요청 수:** {usage['requests']}회")
+        st.markdown(f"**마지막 요청 토큰:** {usage['last_prompt_tokens']:,}")
+        st.markdown(f"**누적 토큰 (입력/출력):** {usage['prompt_tokens']:,} / {usage['output_tokens']:,}")
+        st.markdown(
+            f"**공용/백그라운드 요청:** {background_usage['requests']}회, "
+            f"토큰 {background_usage['prompt_tokens']:,} / {background_usage['output_tokens']:,}"
+        )
+        st.markdown("---")
+
+
+# --- 실행 시간 ---
+def record_run_time():
+    # 이번 실행에 걸린 시간을 기록합니다. 프로세스의 첫 실행(콜드 스타트)은 따로 남깁니다.
+    run_seconds = time.perf_counter() - _run_started
+    runtime_stats = get_runtime_stats()
+    if runtime_stats["first_run"] is None:
+        runtime_stats["first_run"] = run_seconds
+    runtime_stats["reruns"].append(run_seconds)
+    st.session_state["last_run_seconds"] = run_seconds
+
+
+def display_runtime_stats():
+    runtime_stats = get_runtime_stats()
+    reruns = list(runtime_stats["reruns"])
+    with st.sidebar.expander("⏱️ 실행 시간", expanded=False):
+        if runtime_stats["first_run"] is not None:
+            st.markdown(f"**첫 실행 (콜드 스타트):** {runtime_stats['first_run'] * 1000:,.0f} ms")
+        if "last_run_seconds" in st.session_state:
+            st.markdown(f"**지난 실행:** {st.session_state['last_run_seconds'] * 1000:,.0f} ms")
+        if reruns:
+            st.markdown(f"**최근 {len(reruns)}번 평균:** {sum(reruns) / len(reruns) * 1000:,.0f} ms")
+        for name, seconds in runtime_stats["resources"].items():
+            st.markdown(f"**{name} 생성:** {seconds * 1000:,.0f} ms (프로세스당 한 번)")
+        st.markdown("---")
+
+
+def display_metrics_panel():
+    # 단계별 걸린 시간 (프로세스 전체의 최근 기록). 느린 하루 지나기가 어느 단계 때문인지 확인합니다.
+    summary = shared_metrics.summary()
+    with st.sidebar.expander("📊 단계별 시간 (선생님용)", expanded=False):
+        if not summary:
+            st.markdown("아직 기록이 없습니다.")
+        else:
+            st.dataframe(
+                pd.DataFrame(
+                    [
+                        {
+                            "단계": name,
+                            "횟수": stats["count"],
+                            "실패": stats["errors"],
+                            "평균(ms)": round(stats["avg_ms"], 1),
+                            "중앙값(ms)": round(stats["p50_ms"], 1),
+                            "95%(ms)": round(stats["p95_ms"], 1),
+                            "최대(ms)": round(stats["max_ms"], 1),
+                        }
+                        for name, stats in summary.items()
+                    ]
+                ),
+                hide_index=True,
+            )
+            st.download_button(
+                "기록 내보내기 (JSON Lines)",
+                shared_metrics.export_jsonl(),
+                file_name="stocksim-metrics.jsonl",
+                mime="application/x-ndjson",
+                use_container_width=True,
+            )
+        # AI가 답한 섹터 이름 중 어느 섹터인지 맞추지 못해 영향도에서 빠진 것
+        unmatched = index_for(tuple(SECTOR_NAMES)).unmatched_counts()
+        if unmatched:
+            st.markdown("**맞추지 못한 섹터 이름:** " + ", ".join(f"{name} ({count}회)" for name, count in unmatched.items()))
+        st.markdown("---")
+
+
 # --- 메인 화면 ---
 def main():
+    hydrate_price_history()  # 앞쪽 주가 기록을 다 읽었으면 붙입니다. (기다리지 않습니다)
+    sync_cohort_market()  # 반 모드에서는 반 시장의 최신 상태를 가리킵니다.
     col_news, col_main_ui = st.columns([1, 2])
 
     with col_news:
         st.header(f"📰 Day {st.session_state['day_count']} 뉴스")
         if st.button("뉴스 생성", use_container_width=True, key="news_gen_button"):
             with st.spinner(f"Day {st.session_state['day_count']} 뉴스 생성 중..."):
-                current_daily_news = generate_news()
-                st.session_state["daily_news"] = current_daily_news
+                set_daily_news(generate_news())
                 # 뉴스 생성 후 session 데이터를 DB에 저장합니다.
                 save_session_data()
 
@@ -907,22 +1165,27 @@ def main():
         elif not st.session_state.get("daily_news"):
             st.info("뉴스 생성 버튼을 눌러 오늘의 뉴스를 받아보세요.")
 
+        # 학생이 뉴스를 읽는 동안 다음 날을 미리 준비합니다.
+        ensure_prefetch()
+
     with col_main_ui:
-        menu = st.tabs([
-            '현재 주가', '내 포트폴리오', '주식 매수', '주식 매도', '어제 뉴스 해설'
-        ])
+        # 선택한 화면만 그립니다. (탭은 보이지 않는 화면까지 매번 모두 그립니다)
+        menu = ['현재 주가', '내 포트폴리오', '주식 매수', '주식 매도', '어제 뉴스 해설']
+        selected_menu = st.radio(
+            "메뉴", menu, horizontal=True, key="main_menu", label_visibility="collapsed"
+        )
 
-        with menu[0]:
+        if selected_menu == menu[0]:
             st.subheader("📈 현재 주가 및 기업 정보")
             st.markdown("주식 시장의 현재 가격과 기업 정보를 확인하세요.")
             display_stock_prices()
 
-        with menu[1]:
+        elif selected_menu == menu[1]:
             st.subheader("📊 내 포트폴리오")
             st.markdown("현재 보유 중인 주식과 자산을 확인하세요.")
             display_portfolio_table()
 
-        with menu[2]:
+        elif selected_menu == menu[2]:
             st.subheader("💰 주식 매수")
             st.markdown("AI 예측과 뉴스 분석을 바탕으로 주식을 매수해보세요.")
             sector_names = list(st.session_state["stocks"].keys())
@@ -943,31 +1206,31 @@ def main():
             if not st.session_state['buy_confirm']:
                 if st.button("주식 매수", use_container_width=True, key='buy_button_confirm'):
                     st.session_state['buy_confirm'] = True
+                    # 확인 창마다 주문 번호를 하나 정합니다. 확인을 여러 번 눌러도 한 번만 체결됩니다.
+                    st.session_state['buy_order_id'] = uuid.uuid4().hex
             else:
                 st.warning("정말 매수하시겠습니까?")
                 col_confirm, col_cancel = st.columns([1, 1])
                 with col_confirm:
                     if st.button("✅ 매수 확인", use_container_width=True, key='buy_confirm_button'):
-                        buy_stock(selected_stock_buy, quantity_buy, selected_sector_buy)
-                        # 주식 매수 후 session 데이터를 DB에 저장합니다.
-                        save_session_data()
+                        buy_stock(
+                            selected_stock_buy, quantity_buy, selected_sector_buy, st.session_state.get('buy_order_id')
+                        )
 
                 with col_cancel:
                     if st.button("❌ 매수 취소", use_container_width=True, key='buy_cancel_button', type='secondary'):
                         st.session_state['buy_confirm'] = False
                         st.info("매수를 취소했습니다.")
 
-        with menu[3]:
+        elif selected_menu == menu[3]:
             st.subheader("📉 주식 매도")
             st.markdown("보유 중인 주식을 판매하고 수익을 실현해보세요.")
             if st.session_state["portfolio"]["stocks"]:
                 stock_names_sell = list(st.session_state["portfolio"]["stocks"].keys())
                 selected_stock_sell = st.selectbox("매도 종목 선택:", stock_names_sell)
-                stock_price_sell = 0
-                for sector, stocks in st.session_state["stocks"].items():
-                    if selected_stock_sell in stocks:
-                        stock_price_sell = stocks[selected_stock_sell]["current_price"]
-                        break
+                stock_price_sell = get_ticker_index().price(
+                    st.session_state["stocks"], selected_stock_sell
+                )
 
                 st.info(f"**{selected_stock_sell}** 현재 주가: {stock_price_sell:,.0f}원")
                 max_sell_quantity = st.session_state["portfolio"]["stocks"][
@@ -983,14 +1246,13 @@ def main():
                 if not st.session_state['sell_confirm']:
                     if st.button("주식 매도", use_container_width=True, key='sell_button_confirm'):
                         st.session_state['sell_confirm'] = True
+                        st.session_state['sell_order_id'] = uuid.uuid4().hex
                 else:
                     st.warning("정말 매도하시겠습니까?")
                     col_confirm, col_cancel = st.columns([1, 1])
                     with col_confirm:
                         if st.button("✅ 매도 확인", use_container_width=True, key='sell_confirm_button'):
-                            sell_stock(selected_stock_sell, quantity_sell)
-                            # 주식 매도 후 session 데이터를 DB에 저장합니다.
-                            save_session_data()
+                            sell_stock(selected_stock_sell, quantity_sell, st.session_state.get('sell_order_id'))
                     with col_cancel:
                         if st.button("❌ 매도 취소", use_container_width=True, key='sell_cancel_button', type='secondary'):
                             st.session_state['sell_confirm'] = False
@@ -998,7 +1260,8 @@ def main():
             else:
                 st.info("보유 주식이 없습니다. 포트폴리오 탭에서 확인하세요.")
 
-        with menu[4]:
+        elif selected_menu == menu[4]:
+            ensure_news_archive()
             if st.session_state["previous_daily_news"] and st.session_state[
                 "news_meanings"
             ]:
@@ -1038,25 +1301,69 @@ def main():
         st.markdown("---")
 
         if st.button("하루 지나기", use_container_width=True, key="day_pass_button"):
-            if st.session_state["daily_news"]:
-                with st.spinner(f"Day {st.session_state['day_count']} 주가 변동 및 이전 뉴스 분석..."):
+            if MARKET_MODE == "cohort" and "user_id" not in st.session_state:
+                st.warning("반 시장은 로그인한 뒤 진행할 수 있습니다.")
+            elif MARKET_MODE == "cohort" and st.session_state["daily_news"]:
+                with st.spinner(f"Day {st.session_state['day_count']} 반 시장 진행 중..."), \
+                        shared_metrics.span("day_pass", day=st.session_state["day_count"], mode="cohort"):
+                    pass_cohort_day()
+                    save_session_data(flush=True)
+                st.rerun()
+            elif st.session_state["daily_news"]:
+                with st.spinner(f"Day {st.session_state['day_count']} 주가 변동 및 이전 뉴스 분석..."), \
+                        shared_metrics.span("day_pass", day=st.session_state["day_count"]):
+                    # 미리 준비된 결과가 있으면 그대로 쓰고, 없으면 지금 만듭니다.
+                    meanings, next_daily_news = take_prefetch()
+                    replace_news_archive()
                     st.session_state["previous_daily_news"] = st.session_state["daily_news"]
-                    meanings = explain_daily_news_meanings(
-                        st.session_state["previous_daily_news"]
-                    )
+                    if meanings is None:
+                        meanings = explain_daily_news_meanings(
+                            st.session_state["previous_daily_news"]
+                        )
                     if meanings:
                         st.session_state["news_meanings"] = meanings
                     update_stock_prices()
-                    st.session_state["daily_news"] = generate_news()
+                    st.session_state["daily_news"] = next_daily_news or generate_news(st.session_state["day_count"] + 1)
                     st.session_state["day_count"] += 1
                     st.info("어제 뉴스 해설 탭에서 AI가 분석한 뉴스 해설을 확인해보세요.")
-                    save_session_data()  # 변경된 순서: 모든 작업 후 데이터 저장
-                    st.rerun()
+                    save_session_data(flush=True)  # 변경된 순서: 모든 작업 후 데이터 저장 (바로 저장)
+                st.rerun()
             else:
                 st.warning("오늘의 뉴스를 먼저 생성해주세요.")
+
+        if st.session_state.get("is_teacher") and MARKET_MODE != "cohort":
+            with st.expander("⏩ 빨리 감기 (선생님용)", expanded=False):
+                st.info("빨리 감기는 반 전체가 시장 하나를 함께 쓰는 반 모드(MARKET_MODE=cohort)에서만 쓸 수 있습니다.")
+        elif st.session_state.get("is_teacher"):
+            with st.expander("⏩ 빨리 감기 (선생님용)", expanded=False):
+                fast_forward_days = st.number_input(
+                    "진행할 날 수", min_value=1, max_value=FAST_FORWARD_MAX_DAYS, value=7, step=1
+                )
+                generate_missing_news = st.checkbox("미리 만든 뉴스가 없는 날은 새로 만들기", value=False)
+                if st.button("빨리 감기", use_container_width=True, key="fast_forward_button"):
+                    with st.spinner(f"{fast_forward_days}일 진행 중..."):
+                        result = fast_forward(int(fast_forward_days), generate_missing_news)
+                    st.session_state["messages"].append(
+                        {
+                            "type": "info",
+                            "text": f"{result['days']}일을 진행했습니다. (뉴스가 있었던 날: {result['news_days']}일)",
+                        }
+                    )
+                    if result["failed_days"]:
+                        st.session_state["messages"].append(
+                            {
+                                "type": "warning",
+                                "text": f"{result['failed_days']}일은 뉴스나 해설을 가져오지 못해 뉴스 없이 진행했습니다.",
+                            }
+                        )
+                    st.rerun()
         st.markdown("***")
 
         display_stock_glossary()
+        display_llm_usage()
+        display_runtime_stats()
+        if st.session_state.get("is_teacher") or METRICS_PANEL:
+            display_metrics_panel()
 
         with st.expander("🚀 앱 사용 가이드", expanded=False):
             st.markdown(
@@ -1105,16 +1412,126 @@ def main():
             )
 
 
-# supabase 클라이언트를 초기화합니다.
-SUPABASE_URL = os.environ.get("SUPABASE_URL")  # .env 파일에서 Supabase URL을 불러옵니다.
-SUPABASE_KEY = os.environ.get("SUPABASE_KEY")    # .env 파일에서 Supabase API KEY를 불러옵니다.
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# 저장하고 복원하는 session key 목록
+SAVED_KEYS = [
+    "stocks", "previous_daily_news", "news_meanings", "day_count", "portfolio", "daily_news", "market_seed", "ledger_version",
+    "ledger_pending",
+]
+
+
+def restore_session_state(saved_state):
+    # 반 모드에서는 포트폴리오만 복원합니다. (예전에 따로 진행하던 시장은 쓰지 않습니다)
+    user_keys = [key for part in USER_PARTS for key in PARTS[part]]
+    for key in SAVED_KEYS:
+        if key in saved_state and key in user_keys:
+            st.session_state[key] = saved_state[key]
+    if "portfolio" in saved_state:
+        # 순번이 없던 예전 포트폴리오는 주문 장부의 처음(0)부터입니다.
+        st.session_state["ledger_version"] = saved_state.get("ledger_version") or 0
+        st.session_state["ledger_pending"] = saved_state.get("ledger_pending") or []
+    if "market" not in USER_PARTS:
+        return
+    # 주가 기록 복원 (예전 데이터는 종목별 price_history 리스트에서 옮겨옵니다)
+    price_history = saved_state.get("price_history")
+    if isinstance(price_history, dict):
+        price_history = PriceHistory.from_dict(price_history)
+    elif price_history is None and "stocks" in saved_state:
+        price_history = PriceHistory.from_stocks(st.session_state["stocks"])
+    if price_history is not None:
+        st.session_state["price_history"] = price_history
+    # 예전 데이터에 들어 있던 주가 기록과 회사 설명은 사용자 상태에서 빼냅니다. (설명은 catalog에 있습니다)
+    for sector_stocks in st.session_state["stocks"].values():
+        for stock_info in sector_stocks.values():
+            stock_info.pop("price_history", None)
+            stock_info.pop("description", None)
+    # 복원된 종목 구성으로 색인을 다시 만듭니다.
+    st.session_state["ticker_index"] = TickerIndex(st.session_state["stocks"])
+    st.session_state["market_version"] += 1
+
+
+def find_user(account, pw):
+    # 로그인에 필요한 계정 정보만 읽습니다. (예전처럼 저장 데이터 전체가 든 users.data를 함께 읽지 않습니다)
+    # cohort, role 컬럼이 없는 예전 테이블이면 account만 읽습니다.
+    with shared_metrics.span("db.users_select"):
+        query = get_supabase().table("users")
+        try:
+            response = query.select(LOGIN_COLUMNS).eq("account", account).eq("pw", pw).limit(1).execute()
+        except supabase_api_errors() as e:
+            # 컬럼이 없는 경우만 다시 읽고, 연결 오류 등은 그대로 알립니다.
+            if getattr(e, "code", None) not in MISSING_COLUMN_CODES:
+                raise
+            response = query.select("account").eq("account", account).eq("pw", pw).limit(1).execute()
+    return response.data[0] if response.data else None
+
+
+def load_legacy_user_data(account):
+    # 조각별 테이블에 저장된 적이 없는 사용자만 예전 users.data를 읽습니다.
+    with shared_metrics.span("db.users_select", column="data"):
+        response = get_supabase().table("users").select("data").eq("account", account).limit(1).execute()
+    return response.data[0].get("data") if response.data else None
+
+
+def start_history_load(persistence):
+    price_history = st.session_state["price_history"]
+    if price_history.offset == 0:
+        return
+    st.session_state["history_job"] = get_prefetch_executor().submit(
+        persistence.load_history, price_history.offset
+    )
+
+
+def hydrate_price_history(wait=False):
+    # 백그라운드에서 읽은 앞쪽 주가 기록이 준비됐으면 붙입니다. wait이면 다 읽을 때까지 기다립니다.
+    job = st.session_state.get("history_job")
+    if job is None or not (wait or job.done()):
+        return
+    st.session_state.pop("history_job")
+    try:
+        older = job.result()
+    except Exception:
+        return  # 다음 로그인 때 다시 읽습니다. (최근 기록만으로도 저장과 진행은 됩니다)
+    if older is not None:
+        st.session_state["price_history"] = st.session_state["price_history"].with_older(older)
+        st.session_state["market_version"] += 1
+
+
+def ensure_news_archive():
+    # 지난 뉴스와 해설은 처음 볼 때 읽습니다.
+    persistence = st.session_state.get("persistence")
+    if persistence is None or "news_archive" not in persistence.unloaded_parts:
+        return
+    try:
+        archive = persistence.load_parts(("news_archive",))
+    except Exception as e:
+        st.error(f"지난 뉴스를 불러오는 중 오류가 발생했습니다: {str(e)}")
+        return
+    for key in PARTS["news_archive"]:
+        if key in archive:
+            st.session_state[key] = archive[key]
+
+
+def replace_news_archive():
+    # 지난 뉴스와 해설을 새로 정하기 전에 부릅니다. 아직 읽지 않은 예전 내용은 더 이상 필요 없습니다.
+    persistence = st.session_state.get("persistence")
+    if persistence is not None:
+        persistence.mark_loaded("news_archive")
+
 
 def login_sidebar():
     # 이미 로그인 되어 있다면, 로그인 버튼을 비활성화합니다.
     if 'user_settings' in st.session_state:
         st.sidebar.success("이미 로그인 되어 있습니다.")
+        if SAVE_MODE == "write_behind":
+            save_error = get_write_behind_queue().last_error(st.session_state["user_id"])
+            if save_error is not None:
+                st.sidebar.warning(f"데이터 저장이 늦어지고 있습니다. 자동으로 다시 저장합니다. ({save_error})")
         st.sidebar.button("로그인", disabled=True)
+        if st.sidebar.button("로그아웃"):
+            # 진행 중인 미리 준비 작업을 취소하고, 바로 저장한 뒤 세션을 비웁니다.
+            cancel_prefetch()
+            save_session_data(flush=True)
+            st.session_state.clear()
+            st.rerun()
         return
     # 사이드바에 로그인 폼을 생성하는 함수입니다.
     st.sidebar.header("로그인")
@@ -1123,56 +1540,115 @@ def login_sidebar():
 
     # 로그인 버튼 클릭 시
     if st.sidebar.button("로그인"):
-        # supabase의 users 테이블에서 account와 pw를 기준으로 사용자 조회
-        response = supabase.table("users").select("*").eq("account", account).eq("pw", pw).execute()
-        if response.data and len(response.data) > 0:
-            user_data = response.data[0]
-            # 조회된 user_data에 JSON 형식의 data 컬럼이 있는지 확인합니다.
-            if "data" in user_data and user_data["data"]:
-                try:
-                    user_settings = json.loads(user_data["data"])
-                    # 저장된 데이터를 session_state에 복원
-                    for key in ["stocks", "previous_daily_news", "news_meanings", "day_count", "portfolio", "daily_news"]:
-                        if key in user_settings:
-                            st.session_state[key] = user_settings[key]
-                except Exception as e:
-                    st.sidebar.error("데이터 JSON 파싱 중 오류 발생, 기본 설정을 사용합니다.")
-                    user_settings = {"default_setting": True}  # 기본 설정 예시
+        # supabase의 users 테이블에서 account와 pw를 기준으로 사용자 조회 (계정 정보 컬럼만 읽습니다)
+        user_data = find_user(account, pw)
+        if user_data is not None:
+            persistence = new_user_persistence(account)
+            try:
+                # 첫 화면에 필요한 조각과 최근 주가 기록만 먼저 읽습니다.
+                saved_state = persistence.load(parts=FIRST_LOAD_PARTS, history_days=RECENT_HISTORY_DAYS)
+            except Exception as e:
+                st.sidebar.error(f"저장된 데이터를 불러오는 중 오류가 발생했습니다: {str(e)}")
+                saved_state = None
+            user_settings = {"account": account}
+            if saved_state:
+                # 조각별로 저장된 데이터를 session_state에 복원
+                restore_session_state(saved_state)
+                user_settings["cohort"] = saved_state.get("cohort")
             else:
-                # 데이터가 없으면 기본 설정을 사용합니다.
-                user_settings = {"default_setting": True}
+                # 예전 방식으로 users.data에 JSON 하나로 저장된 데이터가 있는지 확인합니다.
+                # 다음 저장 때 조각별 테이블로 옮겨집니다.
+                legacy_data = load_legacy_user_data(account)
+                if legacy_data:
+                    try:
+                        legacy_settings = json.loads(legacy_data)
+                        # 저장된 데이터를 session_state에 복원
+                        restore_session_state(legacy_settings)
+                        user_settings["cohort"] = legacy_settings.get("cohort")
+                    except Exception as e:
+                        st.sidebar.error("데이터 JSON 파싱 중 오류 발생, 기본 설정을 사용합니다.")
+            st.session_state["persistence"] = persistence
+            # 최근 기록만 불러왔으면 앞쪽 주가 기록은 백그라운드에서 읽어 두었다가 붙입니다.
+            start_history_load(persistence)
+            # 로그인 전 상태로 준비하던 작업은 복원된 상태와 맞지 않으므로 취소합니다.
+            cancel_prefetch()
             st.sidebar.success("로그인 성공!")
             st.session_state["user_settings"] = user_settings
+            # 같은 반 학생들은 같은 날 같은 뉴스를 읽습니다. (users.cohort 컬럼 또는 저장된 설정)
+            st.session_state["cohort"] = user_data.get("cohort") or user_settings.get("cohort") or DEFAULT_COHORT
+            # 선생님 계정은 빨리 감기를 쓸 수 있습니다. (users.role 컬럼 또는 TEACHER_ACCOUNTS 환경 변수)
+            st.session_state["is_teacher"] = user_data.get("role") == "teacher" or account in TEACHER_ACCOUNTS
             # 사용자 id를 세션에 저장합니다. 'id' 또는 'user_id' 키 대신 'account' 필드를 사용합니다.
             st.session_state["user_id"] = account
+            # 마지막 중간 저장 뒤에 체결된 주문을 반영합니다.
+            get_order_ledger()
         else:
             st.sidebar.error("아이디 또는 비밀번호가 일치하지 않습니다.")
 
-# 새로 추가할 함수: session_state의 데이터를 JSON형식으로 저장하는 함수입니다.
-def save_session_data():
+def new_user_persistence(account):
+    # 사용자 조각, 주가 기록과 대기열에 넣은 주문을 저장합니다.
+    return DeltaPersistence(
+        get_supabase(),
+        account,
+        snapshot_format=SNAPSHOT_FORMAT,
+        parts=USER_PARTS,
+        order_store=SupabaseOrderStore(get_supabase(), account),
+    )
+
+
+def get_user_persistence():
+    persistence = st.session_state.get("persistence")
+    if persistence is None:
+        persistence = new_user_persistence(st.session_state["user_id"])
+        st.session_state["persistence"] = persistence
+    return persistence
+
+
+@st.cache_resource
+def get_write_behind_queue():
+    # 모든 세션이 함께 쓰는 저장 대기열입니다.
+    return WriteBehindQueue()
+
+
+# session_state의 데이터를 바뀐 부분만 데이터베이스에 저장하는 함수입니다.
+# write_behind 방식에서는 대기열에 넣기만 하고 바로 돌아옵니다. flush=True면 지금 바로 씁니다.
+def save_session_data(flush=False):
     # 사용자 id가 존재할 때에만 데이터 저장을 시도합니다.
     if "user_id" not in st.session_state:
         return
-    # 저장할 session key 목록
-    keys = ["stocks", "previous_daily_news", "news_meanings", "day_count", "portfolio", "daily_news"]
-    data_to_save = { key: st.session_state.get(key) for key in keys }
-    try:
-        json_data = json.dumps(data_to_save, ensure_ascii=False)  # 기존 코드는 json.dumps(data_to_save) 였습니다.
-    except Exception as e:
-        st.error("세션 데이터를 JSON으로 변환 실패했습니다: " + str(e))
+    # 조각별 JSON 만들기(save.prepare)와 Supabase 쓰기(db.*)는 persistence에서 따로 기록합니다.
+    with shared_metrics.span("save_session_data", mode=SAVE_MODE, flush=flush):
+        _save_session_data(flush)
+
+
+def _save_session_data(flush):
+    persistence = get_user_persistence()
+    data_to_save = { key: st.session_state.get(key) for key in SAVED_KEYS }
+
+    if SAVE_MODE == "write_behind":
+        # 바뀐 내용만 골라 문자열로 만든 뒤 대기열에 넣습니다. (데이터베이스 응답을 기다리지 않습니다)
+        queue = get_write_behind_queue()
+        queue.submit(persistence, persistence.prepare(data_to_save, st.session_state["price_history"]))
+        if flush and not queue.flush(persistence.account, retries=1):
+            st.warning(
+                f"데이터 저장이 늦어지고 있습니다. 자동으로 다시 저장합니다. ({queue.last_error(persistence.account)})"
+            )
         return
+
     try:
-        response = supabase.table("users").update({"data": json_data}).eq("account", st.session_state["user_id"]).execute()
-        if not response.data:
-            st.error("세션 데이터 업데이트 실패했습니다.")
-            return
-        st.info("세션 데이터를 데이터베이스에 저장했습니다.")
+        # 지난번 저장 이후 바뀐 조각과 새 날짜의 주가 기록만 씁니다.
+        stats = persistence.save(data_to_save, st.session_state["price_history"])
     except Exception as e:
         st.error(f"세션 데이터 업데이트 중 오류가 발생했습니다: {str(e)}")
         return
+    if stats["parts"] or stats["history_rows"]:
+        st.info("세션 데이터를 데이터베이스에 저장했습니다.")
 
 # main 함수 전에 sidebar 로그인을 호출합니다.
-login_sidebar()
-
-if __name__ == "__main__":
-    main()
\ No newline at end of file
+# st.rerun()은 예외로 실행을 끝내므로, 그렇게 끝난 실행의 시간도 남도록 finally에서 기록합니다.
+try:
+    login_sidebar()
+    if __name__ == "__main__":
+        main()
+finally:
+    record_run_time()
\ No newline at end of file
@@ -0,0 +1 @@
+# 하루 지나기 과정의 성능을 재는 벤치마크 (네트워크 없이 가짜 AI 모델과 메모리 Supabase를 씁니다)
@@ -0,0 +1,353 @@
+# --- 하루 지나기 벤치마크 ---
+# 하루 지나기 과정(뉴스 해설 -> 주가 변동 -> 다음 날 뉴스 -> 저장)을 단계별로 시간을 재고,
+# 저장하는 JSON 크기와 메모리 사용량을 함께 보여 줍니다. 날짜 수, 종목 수, 사용자 수를 바꿔 가며 비교합니다.
+# --market-mode cohort는 반 시장 하나를 하루에 한 번 진행하고 학생마다 포트폴리오만 저장하는 경우입니다.
+#
+#   python -m benchmarks.day_cycle
+#   python -m benchmarks.day_cycle --days 1 100 1000 --tickers 37 1000 --users 10 --llm-latency 0.5
+#   python -m benchmarks.day_cycle --days 100 --users 30 --market-mode personal cohort
+#
+# AI 모델과 Supabase는 benchmarks.fakes의 대역을 쓰므로 네트워크나 API 키가 필요 없습니다.
+import argparse
+import copy
+import json
+import random
+import statistics
+import time
+import tracemalloc
+from functools import partial
+
+import numpy as np
+
+from benchmarks.fakes import FakeModel, InMemorySupabase
+from stocksim import catalog, news_meanings, rng
+from stocksim.llm import PromptSession
+from stocksim.news import (
+    FORMATS as NEWS_FORMATS,
+    build_news_prompt,
+    generate_structured_news,
+    json_generation_config,
+    parse_news_articles,
+)
+from stocksim.orders import OrderLedger, SupabaseOrderStore
+from stocksim.persistence import DeltaPersistence
+from stocksim.snapshot import encode_value
+from stocksim.simulation import Account, Market
+
+STAGES = ("explain", "update_prices", "generate_news", "trade", "save", "save_legacy", "load")
+
+
+def make_stocks(ticker_count, seed):
+    # 종목 수가 회사 목록(37개)과 같으면 실제 목록을, 아니면 섹터마다 고르게 나눈 가짜 종목을 만듭니다.
+    # 처음 주가는 어느 쪽이든 seed의 처음 주가 흐름(stocksim.rng)에서 뽑으므로 같은 seed면 같은 시장입니다.
+    if ticker_count == len(catalog.COMPANIES):
+        return catalog.new_market_stocks(seed)
+    generator = rng.stream(seed, rng.STREAM_INITIAL_PRICES)
+    prices = generator.integers(1000, 500000, size=ticker_count, endpoint=True)
+    stocks = {sector: {} for sector in catalog.SECTOR_NAMES}
+    for i in range(ticker_count):
+        sector = catalog.SECTOR_NAMES[i % len(catalog.SECTOR_NAMES)]
+        stocks[sector][f"{sector} 종목{i + 1}"] = {"current_price": int(prices[i])}
+    return stocks
+
+
+def legacy_payload(state, market):
+    # 예전 저장 방식: 종목마다 주가 기록 목록을 붙인 상태 전체를 JSON 하나로 users.data에 덮어씁니다.
+    stocks = {
+        sector: {
+            stock_name: {**stock_info, "history": market.price_history.series(stock_name).tolist()}
+            for stock_name, stock_info in sector_stocks.items()
+        }
+        for sector, sector_stocks in market.stocks.items()
+    }
+    return json.dumps({**state, "stocks": stocks}, ensure_ascii=False)
+
+
+class UserRun:
+    # 사용자 한 명의 상태입니다. days일째까지 진행된 시장과 약간의 보유 주식으로 시작합니다.
+    def __init__(self, account, args, model, client, days, ticker_count, seed):
+        self.account = account
+        self.args = args
+        self.model = model
+        self.client = client
+        self.seed = seed
+        self.market = Market(make_stocks(ticker_count, seed), seed=seed)
+        self.initial_stocks = copy.deepcopy(self.market.stocks)
+        self.daily_sector_impacts = [{}] * (days - 1)  # 날짜별 영향도 (재현 확인용)
+        if days > 1:
+            self.market.advance(self.daily_sector_impacts)
+        self.trader = Account()
+        for stock_name in list(self.market.index().entries)[:5]:
+            self.trader.buy(self.market, stock_name, 1, self.market.index().sector_of(stock_name))
+        self.ledger = OrderLedger(self.trader, 0, SupabaseOrderStore(client, account))
+        self.session = PromptSession(model, args.prompt_mode)
+        self.next_meanings = None
+        self.generate_news()
+        self.news_meanings = {}
+        self.previous_daily_news = None
+        self.persistence = self.new_persistence()
+        self.client.table("users").insert({"account": self.account, "data": ""}).execute()
+
+    def new_persistence(self):
+        return DeltaPersistence(self.client, self.account)
+
+    def generate_news(self):
+        if self.args.news_format == "json":
+            self.daily_news, self.next_meanings = generate_structured_news(
+                partial(self.session.send, generation_config=json_generation_config(catalog.SECTOR_NAMES)),
+                self.market.day_count,
+                catalog.SECTOR_NAMES,
+            )
+        else:
+            self.daily_news = parse_news_articles(self.session.send(build_news_prompt(self.market.day_count)))
+
+    def state(self):
+        return {
+            "portfolio": self.trader.portfolio,
+            "ledger_version": self.ledger.version,
+            "day_count": self.market.day_count,
+            "stocks": self.market.stocks,
+            "daily_news": self.daily_news,
+            "previous_daily_news": self.previous_daily_news,
+            "news_meanings": self.news_meanings,
+        }
+
+    def first_save(self):
+        return self.persistence.save(self.state(), self.market.price_history)
+
+    def cycle(self):
+        timings = {}
+        sizes = {}
+
+        started = time.perf_counter()
+        if self.next_meanings is not None:
+            # JSON 형식 뉴스는 해설을 함께 받아 두었으므로 따로 요청하지 않습니다.
+            self.news_meanings = self.next_meanings
+        else:
+            self.news_meanings = news_meanings.explain(
+                self.daily_news,
+                self.session.send,
+                self.args.meaning_mode,
+                sector_names=catalog.SECTOR_NAMES,
+                parallel_send=lambda prompt: self.model.generate_content(prompt).text,
+            )
+        timings["explain"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        result = self.market.pass_day(self.daily_news, self.news_meanings)
+        self.daily_sector_impacts.append(result.data["sector_impacts"])
+        self.previous_daily_news = self.daily_news
+        timings["update_prices"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        self.generate_news()
+        timings["generate_news"] = time.perf_counter() - started
+
+        # 하루에 한 번 매수합니다. 주문 장부에 한 줄만 덧붙이고 포트폴리오 전체는 다시 쓰지 않습니다.
+        stock_name = list(self.market.index().entries)[self.ledger.version % 5]
+        written_before = self.client.written_bytes.get("user_orders", 0)
+        started = time.perf_counter()
+        self.ledger.execute(
+            self.market,
+            f"{self.account}-{self.market.day_count}",
+            "buy",
+            stock_name,
+            1,
+            self.market.index().sector_of(stock_name),
+            day=self.market.day_count,
+        )
+        timings["trade"] = time.perf_counter() - started
+        sizes["order_bytes"] = self.client.written_bytes.get("user_orders", 0) - written_before
+        sizes["portfolio_bytes"] = len(
+            encode_value({"portfolio": self.trader.portfolio, "ledger_version": self.ledger.version})
+        )
+
+        started = time.perf_counter()
+        written = self.persistence.save(self.state(), self.market.price_history)
+        timings["save"] = time.perf_counter() - started
+        sizes["save_bytes"] = written["bytes"]
+
+        started = time.perf_counter()
+        data = legacy_payload(self.state(), self.market)
+        self.client.table("users").update({"data": data}).eq("account", self.account).execute()
+        timings["save_legacy"] = time.perf_counter() - started
+        sizes["legacy_bytes"] = len(data.encode("utf-8"))
+
+        started = time.perf_counter()
+        self.new_persistence().load()
+        timings["load"] = time.perf_counter() - started
+
+        sizes["prompt_tokens"] = self.session.stats.last_prompt_tokens
+        return timings, sizes
+
+    def replay_matches(self):
+        # 씨앗과 날짜별 영향도만으로 처음부터 한 번에 다시 계산한 주가 기록이 하루씩 진행한 기록과 같은지 확인합니다.
+        replay = Market(copy.deepcopy(self.initial_stocks), seed=self.seed)
+        replay.advance(self.daily_sector_impacts)
+        return np.array_equal(replay.price_history.matrix(), self.market.price_history.matrix())
+
+
+class CohortRun(UserRun):
+    # 반 모드: 반 시장 하나를 하루에 한 번 진행해 cohort_* 테이블에 저장하고, 학생마다 포트폴리오만 저장합니다.
+    def __init__(self, args, model, client, days, ticker_count, seed):
+        super().__init__("class1", args, model, client, days, ticker_count, seed)
+        self.students = []
+        for i in range(args.users):
+            trader = Account()
+            for stock_name in list(self.market.index().entries)[i % 5 : i % 5 + 5]:
+                trader.buy(self.market, stock_name, 1, self.market.index().sector_of(stock_name))
+            self.students.append((trader, DeltaPersistence(client, f"user{i + 1}", parts=("portfolio",))))
+
+    def new_persistence(self):
+        return DeltaPersistence(
+            self.client,
+            self.account,
+            "cohort_state",
+            "cohort_price_history",
+            key_column="cohort",
+            parts=("market", "news", "news_archive"),
+        )
+
+    def save_students(self):
+        return sum(
+            persistence.save({"portfolio": trader.portfolio}, self.market.price_history)["bytes"]
+            for trader, persistence in self.students
+        )
+
+    def first_save(self):
+        return {"bytes": super().first_save()["bytes"] + self.save_students()}
+
+    def cycle(self):
+        timings, sizes = super().cycle()
+        started = time.perf_counter()
+        sizes["save_bytes"] += self.save_students()
+        timings["save"] += time.perf_counter() - started
+        sizes["legacy_bytes"] *= len(self.students)  # 예전 방식은 학생마다 시장 전체를 저장했습니다.
+        return timings, sizes
+
+
+def run_scenario(args, days, ticker_count, market_mode="personal"):
+    model = FakeModel(args.llm_latency, catalog.SECTOR_NAMES, seed=args.seed)
+    client = InMemorySupabase(args.db_latency)
+
+    tracemalloc.start()
+    if market_mode == "cohort":
+        runs = [CohortRun(args, model, client, days, ticker_count, args.seed)]
+    else:
+        runs = [
+            UserRun(f"user{i + 1}", args, model, client, days, ticker_count, args.seed + i)
+            for i in range(args.users)
+        ]
+    first_save_bytes = sum(run.first_save()["bytes"] for run in runs)
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+
+    timings = {stage: [] for stage in STAGES}
+    class_day_seconds = []  # 반 전체가 하루를 진행하는 데 걸린 시간 (해설, 주가, 뉴스, 저장)
+    for _ in range(args.cycles):
+        day_seconds = 0.0
+        sizes = {"save_bytes": 0, "legacy_bytes": 0}
+        for run in runs:
+            cycle_timings, cycle_sizes = run.cycle()
+            for stage, seconds in cycle_timings.items():
+                timings[stage].append(seconds)
+            day_seconds += sum(cycle_timings[stage] for stage in ("explain", "update_prices", "generate_news", "save"))
+            sizes["save_bytes"] += cycle_sizes["save_bytes"]
+            sizes["legacy_bytes"] += cycle_sizes["legacy_bytes"]
+            sizes["prompt_tokens"] = cycle_sizes["prompt_tokens"]
+            sizes["order_bytes"] = cycle_sizes["order_bytes"]
+            sizes["portfolio_bytes"] = cycle_sizes["portfolio_bytes"]
+        class_day_seconds.append(day_seconds)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "market_mode": market_mode,
+        "days": days,
+        "tickers": ticker_count,
+        "users": args.users,
+        "cycles": args.cycles,
+        "stages_ms": {
+            stage: {
+                "median": statistics.median(values) * 1000,
+                "max": max(values) * 1000,
+            }
+            for stage, values in timings.items()
+        },
+        "class_day_ms": statistics.median(class_day_seconds) * 1000,
+        "first_save_bytes": first_save_bytes,
+        "save_bytes": sizes["save_bytes"],
+        "legacy_bytes": sizes["legacy_bytes"],
+        "prompt_tokens": sizes["prompt_tokens"],
+        "order_bytes": sizes["order_bytes"],
+        "portfolio_bytes": sizes["portfolio_bytes"],
+        "replay_matches": all(run.replay_matches() for run in runs),
+        "history_bytes": sum(run.market.price_history.matrix().nbytes for run in runs),
+        "memory_kb": {"state": baseline / 1024, "cycle_peak": (peak - baseline) / 1024},
+        "llm_requests": model.requests,
+        "db_requests": client.requests,
+    }
+
+
+def print_result(result):
+    print(
+        f"\n[{result['market_mode']}, {result['days']}일, 종목 {result['tickers']}개, 사용자 {result['users']}명, "
+        f"{result['cycles']}회 반복]"
+    )
+    for stage, values in result["stages_ms"].items():
+        print(f"  {stage:<14} 중앙값 {values['median']:9.2f} ms   최대 {values['max']:9.2f} ms")
+    print(f"  반 하루 합계   {result['class_day_ms']:9.2f} ms")
+    print(f"  재현 확인      {'일치' if result['replay_matches'] else '다름'} (씨앗과 날짜별 영향도로 처음부터 다시 계산)")
+    print(
+        f"  저장 크기      처음 {result['first_save_bytes']:,} B / 반 하루 {result['save_bytes']:,} B "
+        f"(예전 방식 {result['legacy_bytes']:,} B)"
+    )
+    print(f"  주가 기록      {result['history_bytes']:,} B (메모리, 반 전체)")
+    print(
+        f"  거래 한 번     주문 장부 {result['order_bytes']:,} B "
+        f"(포트폴리오 전체를 다시 쓰면 {result['portfolio_bytes']:,} B)"
+    )
+    print(
+        f"  메모리         상태 {result['memory_kb']['state']:,.0f} KB / "
+        f"하루 진행 중 최대 추가 {result['memory_kb']['cycle_peak']:,.0f} KB"
+    )
+    print(
+        f"  요청 수        AI {result['llm_requests']} / DB {result['db_requests']}, "
+        f"마지막 프롬프트 {result['prompt_tokens']} 토큰"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="하루 지나기 과정의 단계별 시간, 저장 크기, 메모리를 잽니다.")
+    parser.add_argument("--days", type=int, nargs="+", default=[1, 100, 1000], help="시작할 때까지 진행된 날짜 수")
+    parser.add_argument("--tickers", type=int, nargs="+", default=[37, 1000], help="종목 수")
+    parser.add_argument("--users", type=int, default=1, help="사용자 수")
+    parser.add_argument("--cycles", type=int, default=3, help="사용자마다 하루 지나기를 반복할 횟수")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="AI 요청마다 기다리는 시간(초)")
+    parser.add_argument("--db-latency", type=float, default=0.0, help="DB 요청마다 기다리는 시간(초)")
+    parser.add_argument("--prompt-mode", default="stateless", choices=("stateless", "rolling", "chat"))
+    parser.add_argument("--news-format", default="json", choices=NEWS_FORMATS)
+    parser.add_argument("--meaning-mode", default="batch", choices=news_meanings.MODES)
+    parser.add_argument(
+        "--market-mode", nargs="+", default=["personal"], choices=("personal", "cohort"), help="시장 방식"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="결과를 JSON 파일로도 저장합니다.")
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    results = []
+    for ticker_count in args.tickers:
+        for days in args.days:
+            for market_mode in args.market_mode:
+                result = run_scenario(args, days, ticker_count, market_mode)
+                print_result(result)
+                results.append(result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+# --- 벤치마크용 가짜 AI 모델과 메모리 Supabase ---
+# 네트워크 없이 하루 지나기 과정을 재현하기 위한 대역입니다.
+# FakeModel은 google.generativeai 모델처럼 generate_content / start_chat을 제공하고,
+# 프롬프트 종류에 맞는 형식(뉴스, JSON 형식 뉴스, 해설 JSON, "해설: / 관련 섹터:")으로 답합니다.
+# InMemorySupabase는 앱이 쓰는 만큼의 supabase 질의(select/eq/gt/lte/in_/order/range/limit/upsert/update/delete)만 흉내 냅니다.
+import json
+import random
+import threading
+import time
+
+from stocksim.news import NEWS_COUNT
+
+
+class FakeUsage:
+    def __init__(self, prompt_token_count, candidates_token_count):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+
+
+class FakeResponse:
+    def __init__(self, prompt, text):
+        self.text = text
+        # 한글 기준으로 대략 두 글자에 토큰 하나로 셉니다.
+        self.usage_metadata = FakeUsage(len(prompt) // 2, len(text) // 2)
+
+
+class FakeChat:
+    def __init__(self, model):
+        self.model = model
+        self.history = []
+
+    def send_message(self, prompt, generation_config=None):
+        # 실제 chat 세션처럼 대화 기록 전체가 요청에 실려 갑니다.
+        conversation = "".join(self.history) + prompt
+        response = self.model._respond(prompt, conversation, generation_config)
+        self.history.extend([prompt, response.text])
+        return response
+
+
+class FakeModel:
+    def __init__(self, latency=0.0, sector_names=(), seed=0):
+        self.latency = latency  # 요청마다 기다리는 시간(초)
+        self.sector_names = list(sector_names)
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+
+    def start_chat(self, history=None):
+        return FakeChat(self)
+
+    def generate_content(self, contents, generation_config=None):
+        if isinstance(contents, str):
+            return self._respond(contents, contents, generation_config)
+        prompt = contents[-1]["parts"][0]
+        conversation = "".join(part for content in contents for part in content["parts"])
+        return self._respond(prompt, conversation, generation_config)
+
+    def _respond(self, prompt, conversation, generation_config=None):
+        with self._lock:
+            self.requests += 1
+            sectors = self._rng.sample(self.sector_names, min(2, len(self.sector_names)))
+        if self.latency:
+            time.sleep(self.latency)
+        if (generation_config or {}).get("response_mime_type") == "application/json":
+            # JSON 형식 뉴스: 기사와 해설, 관련 섹터, 분위기를 함께 답합니다.
+            text = json.dumps(
+                [
+                    {
+                        "article": "경제 상황이 조금씩 변하고 있습니다. 반도체 수출이 상승하고 있습니다. " * 6,
+                        "explanation": "경제 뉴스의 쉬운 해설입니다.",
+                        "sectors": sectors,
+                        "sentiment": "positive",
+                    }
+                    for _ in range(NEWS_COUNT)
+                ],
+                ensure_ascii=False,
+            )
+        elif "뉴스 기사" in prompt and "생성해주세요" in prompt:
+            text = "\n\n".join(
+                f"## 뉴스 {i + 1}\n" + "경제 상황이 조금씩 변하고 있습니다. 반도체 수출이 상승하고 있습니다. " * 6
+                for i in range(NEWS_COUNT)
+            )
+        elif "JSON 배열" in prompt:
+            text = json.dumps(
+                [
+                    {"news": i + 1, "explanation": "경제 뉴스의 쉬운 해설입니다.", "sectors": sectors}
+                    for i in range(NEWS_COUNT)
+                ],
+                ensure_ascii=False,
+            )
+        elif "관련 섹터" in prompt:
+            text = f"해설: 경제 뉴스의 쉬운 해설입니다.\n관련 섹터: {', '.join(sectors) or '없음'}"
+        else:
+            text = "지금까지 경제는 조금씩 성장하고 있습니다."
+        return FakeResponse(conversation, text)
+
+
+class FakeResult:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeQuery:
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.action = "select"
+        self.payload = None
+        self.conflict_keys = ()
+        self.filters = []
+        self.order_key = None
+        self.bounds = None
+        self.columns = None
+
+    def select(self, columns="*"):
+        self.action = "select"
+        if columns.strip() != "*":
+            self.columns = [column.strip() for column in columns.split(",")]
+        return self
+
+    def insert(self, rows):
+        self.action = "insert"
+        self.payload = rows
+        return self
+
+    def upsert(self, rows, on_conflict=""):
+        self.action = "upsert"
+        self.payload = rows
+        self.conflict_keys = tuple(key.strip() for key in on_conflict.split(",") if key.strip())
+        return self
+
+    def update(self, values):
+        self.action = "update"
+        self.payload = values
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def gt(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None and row[column] > value)
+        return self
+
+    def lte(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None and row[column] <= value)
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def limit(self, count):
+        self.bounds = (0, count - 1)
+        return self
+
+    def order(self, column, desc=False):
+        self.order_key = (column, desc)
+        return self
+
+    def range(self, start, end):
+        self.bounds = (start, end)
+        return self
+
+    def execute(self):
+        return self.db._execute(self)
+
+
+class FakeConflictError(Exception):
+    pass
+
+
+class InMemorySupabase:
+    # 테이블 이름 -> 줄 목록. 쓴 바이트 수(JSON 기준)와 요청 수를 테이블별로 셉니다.
+    # UNIQUE_KEYS에 있는 열 묶음이 겹치는 insert는 실제 데이터베이스처럼 오류를 냅니다.
+    UNIQUE_KEYS = {"user_orders": (("account", "seq"), ("account", "order_id"))}
+
+    def __init__(self, latency=0.0):
+        self.latency = latency  # 요청마다 기다리는 시간(초)
+        self.tables = {}
+        self.requests = 0
+        self.written_bytes = {}
+        self._indexes = {}  # 테이블 이름 -> {충돌 열 묶음: {값: 줄}} (upsert에서 같은 줄을 바로 찾습니다)
+        self._lock = threading.Lock()
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def _execute(self, query):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.requests += 1
+            rows = self.tables.setdefault(query.table, [])
+            if query.action in ("insert", "upsert", "update"):
+                self.written_bytes[query.table] = self.written_bytes.get(query.table, 0) + len(
+                    json.dumps(query.payload, ensure_ascii=False).encode("utf-8")
+                )
+            if query.action == "insert":
+                new_rows = query.payload if isinstance(query.payload, list) else [query.payload]
+                for columns in self.UNIQUE_KEYS.get(query.table, ()):
+                    index = self._conflict_index(query.table, columns)
+                    for new_row in new_rows:
+                        if tuple(new_row.get(column) for column in columns) in index:
+                            raise FakeConflictError(f"duplicate key value violates unique constraint {columns}")
+                rows.extend(dict(row) for row in new_rows)
+                self._indexes.pop(query.table, None)
+                return FakeResult(new_rows)
+            if query.action == "upsert":
+                new_rows = query.payload if isinstance(query.payload, list) else [query.payload]
+                index = self._conflict_index(query.table, query.conflict_keys)
+                for new_row in new_rows:
+                    key = tuple(new_row.get(column) for column in query.conflict_keys)
+                    if query.conflict_keys and key in index:
+                        index[key].update(new_row)
+                    else:
+                        row = dict(new_row)
+                        rows.append(row)
+                        index[key] = row
+                return FakeResult(new_rows)
+
+            matched = [row for row in rows if all(check(row) for check in query.filters)]
+            if query.action in ("update", "delete"):
+                self._indexes.pop(query.table, None)
+            if query.action == "update":
+                for row in matched:
+                    row.update(query.payload)
+                return FakeResult(matched)
+            if query.action == "delete":
+                deleted = {id(row) for row in matched}
+                self.tables[query.table] = [row for row in rows if id(row) not in deleted]
+                return FakeResult(matched)
+
+            if query.order_key:
+                column, desc = query.order_key
+                matched.sort(key=lambda row: row[column], reverse=desc)
+            if query.bounds:
+                matched = matched[query.bounds[0] : query.bounds[1] + 1]
+            if query.columns:
+                matched = [{column: row.get(column) for column in query.columns} for row in matched]
+            else:
+                matched = [dict(row) for row in matched]
+            return FakeResult(matched)
+
+    def _conflict_index(self, table, conflict_keys):
+        indexes = self._indexes.setdefault(table, {})
+        if conflict_keys not in indexes:
+            indexes[conflict_keys] = {
+                tuple(row.get(column) for column in conflict_keys): row for row in self.tables[table]
+            }
+        return indexes[conflict_keys]
+
+    def table_bytes(self, name):
+        # 테이블에 지금 들어 있는 내용의 크기(JSON 기준)입니다.
+        return len(json.dumps(self.tables.get(name, []), ensure_ascii=False).encode("utf-8"))
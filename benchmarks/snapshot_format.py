@@ -0,0 +1,104 @@
+# --- 저장 형식 비교 ---
+# 예전 JSON 문자열과 compact 형식(msgpack/JSON + zlib, 주가는 int32 배열)의 크기와 만들기/읽기 시간을 비교합니다.
+#
+#   python -m benchmarks.snapshot_format
+#   python -m benchmarks.snapshot_format --days 1000 --tickers 1000
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.day_cycle import make_stocks
+from benchmarks.fakes import FakeModel
+from stocksim import catalog, snapshot
+from stocksim.news import generate_structured_news, json_generation_config
+from stocksim.simulation import Account, Market
+
+
+def sample_values(days, ticker_count, seed):
+    # 저장하는 조각과 같은 모양의 값을 만듭니다. 뉴스는 가짜 모델 대신 길이가 비슷한 한글 기사를 씁니다.
+    rng = np.random.default_rng(seed)
+    market = Market(make_stocks(ticker_count, seed))
+    if days > 1:
+        market.advance([{}] * (days - 1), rng=rng)
+    account = Account()
+    for stock_name in list(market.index().entries)[:10]:
+        account.buy(market, stock_name, 3, market.index().sector_of(stock_name))
+    model = FakeModel(sector_names=catalog.SECTOR_NAMES, seed=seed)
+    daily_news, meanings = generate_structured_news(
+        lambda prompt: model.generate_content(prompt, json_generation_config(catalog.SECTOR_NAMES)).text,
+        days,
+        catalog.SECTOR_NAMES,
+    )
+    values = {
+        "portfolio": {"portfolio": account.portfolio},
+        "market": {"day_count": days, "stocks": market.stocks, "history_tickers": market.price_history.tickers},
+        "news": {"daily_news": daily_news},
+        "news_archive": {"previous_daily_news": daily_news, "news_meanings": meanings},
+    }
+    return values, market.price_history.matrix()
+
+
+def measure(encode, decode, items, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        encoded = [encode(item) for item in items]
+    encode_seconds = (time.perf_counter() - started) / repeat
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for data in encoded:
+            decode(data)
+    decode_seconds = (time.perf_counter() - started) / repeat
+    size = sum(len(data.encode("utf-8")) for data in encoded)
+    return size, encode_seconds, decode_seconds
+
+
+def run(days, ticker_count, repeat, seed=0):
+    values, matrix = sample_values(days, ticker_count, seed)
+    rows = [matrix[:, day] for day in range(matrix.shape[1])]
+    results = {}
+    for snapshot_format in snapshot.FORMATS:
+        results[snapshot_format] = {
+            "state": measure(
+                lambda value: snapshot.encode_value(value, snapshot_format),
+                snapshot.decode_value,
+                list(values.values()),
+                repeat,
+            ),
+            "history": measure(
+                lambda row: snapshot.encode_prices(row, snapshot_format),
+                snapshot.decode_prices,
+                rows,
+                repeat,
+            ),
+        }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="저장 형식별 크기와 만들기/읽기 시간을 비교합니다.")
+    parser.add_argument("--days", type=int, nargs="+", default=[1, 100, 1000])
+    parser.add_argument("--tickers", type=int, nargs="+", default=[37, 1000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"값 형식: s1{snapshot.VALUE_CODEC} ({'msgpack' if snapshot.VALUE_CODEC == 'm' else 'msgpack 없음, JSON'} + zlib)")
+    report = []
+    for ticker_count in args.tickers:
+        for days in args.days:
+            results = run(days, ticker_count, args.repeat)
+            print(f"\n[{days}일, 종목 {ticker_count}개]")
+            for kind in ("state", "history"):
+                old_size, old_encode, old_decode = results["json"][kind]
+                size, encode, decode = results["compact"][kind]
+                print(
+                    f"  {kind:<8} 크기 {old_size:>11,} B -> {size:>11,} B ({old_size / size:4.1f}배)   "
+                    f"만들기 {old_encode * 1000:8.2f} -> {encode * 1000:8.2f} ms   "
+                    f"읽기 {old_decode * 1000:8.2f} -> {decode * 1000:8.2f} ms"
+                )
+            report.append({"days": days, "tickers": ticker_count, "results": results})
+    return report
+
+
+if __name__ == "__main__":
+    main()
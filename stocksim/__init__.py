@@ -0,0 +1 @@
+# 초등학생 모의 주식 앱의 시뮬레이션 모듈 모음입니다.
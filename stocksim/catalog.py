@@ -0,0 +1,223 @@
+# --- 회사 목록 ---
+# 섹터별 회사 이름, 처음 주가 범위, 설명입니다. 모든 사용자가 똑같이 쓰는 고정 자료이므로
+# 프로세스에서 한 번만 읽고 함께 씁니다. 사용자별 상태(session_state["stocks"])에는 주가만 둡니다.
+from types import MappingProxyType
+
+import numpy as np
+
+from stocksim import rng
+
+_CATALOG = {  # 섹터별 종목 재구성 및 설명 확장
+    "기술(Tech)": {
+        "삼성전자": {
+            "initial_price_range": (50000, 80000),
+            "description": "대한민국을 대표하는 전자 제품 회사, 삼성전자! 텔레비전, 스마트폰, 냉장고, 세탁기, 컴퓨터 칩 등 우리 생활에 필요한 다양한 제품들을 만들고 있어요. 특히 갤럭시 스마트폰은 전 세계에서 아주 인기가 많고, 텔레비전은 최고 화질로 유명해요. 반도체 기술도 세계 최고 수준이라서, 컴퓨터나 스마트폰의 두뇌 역할을 하는 칩을 만들어 다른 회사들에게도 팔고 있답니다. 우리나라 경제 발전에 아주 큰 역할을 하는 회사예요.",
+        },
+        "SK하이닉스": {
+            "initial_price_range": (80000, 120000),
+            "description": "컴퓨터와 스마트폰의 기억력을 책임지는 SK하이닉스!  우리가 사용하는 컴퓨터나 스마트폰이 사진, 영상, 게임 같은 정보를 저장하고 빠르게 불러올 수 있는 건 SK하이닉스 덕분이에요.  이 회사는 'DRAM'과 'NAND 플래시'라는 아주 중요한 반도체를 만드는데, 이 반도체들은 컴퓨터, 스마트폰뿐만 아니라 인공지능, 빅데이터, 자율주행차 같은 미래 기술에도 꼭 필요하답니다.  세계적으로 손꼽히는 반도체 기술력을 가진 회사예요.",
+        },
+        "LG디스플레이": {
+            "initial_price_range": (20000, 40000),
+            "description": "화면을 더욱 선명하게, LG디스플레이!  우리가 매일 보는 텔레비전, 스마트폰, 노트북 화면을 만드는 회사예요.  LG디스플레이는 특히 'OLED'라는 특별한 기술로 화면을 만드는데, OLED는 색깔이 진짜처럼 선명하고, 얇고 가벼워서 미래 디스플레이 기술로 주목받고 있어요.  영화관처럼 생생한 화질의 텔레비전,  얇고 예쁜 스마트폰 화면,  자동차 계기판과 투명 디스플레이까지, LG디스플레이 기술은 우리 생활 곳곳에 사용되고 있답니다.",
+        },
+    },
+    "자동차(Auto)": {
+        "현대자동차": {
+            "initial_price_range": (150000, 250000),
+            "description": "대한민국 대표 자동차 회사, 현대자동차!  우리가 타고 다니는 자동차를 만드는 회사 중 가장 유명해요.  쏘나타, 아반떼, 팰리세이드, 아이오닉 등 멋진 이름의 자동차들을 디자인하고 만들어서 우리나라뿐 아니라 전 세계에 팔고 있어요.  최근에는 전기자동차와 수소자동차 같은 친환경 자동차를 개발해서 미래 자동차 시장을 이끌고 있답니다.  자동차를 좋아하는 친구라면 누구나 한 번쯤 들어봤을 이름일 거예요.",
+        },
+        "기아": {
+            "initial_price_range": (70000, 100000),
+            "description": "개성 넘치는 디자인, 기아자동차!  현대자동차와 함께 우리나라 자동차 산업을 이끌고 있어요.  K3, K5, 쏘렌토, 스포티지, EV6, EV9  등 이름만 들어도 멋진 자동차들을 만들고 있어요.  기아자동차는 특히 디자인이 예쁘기로 유명하고, 젊은 친구들에게 인기가 많아요.  최근에는 전기차 EV6와 EV9이 세계적으로 디자인 상을 많이 받아서 더욱 유명해졌답니다.  나만의 개성을 표현하고 싶은 친구들에게 딱 맞는 자동차 회사예요.",
+        },
+        "현대모비스": {
+            "initial_price_range": (200000, 250000),
+            "description": "자동차를 튼튼하게, 안전하게, 현대모비스!  자동차 회사는 아니지만, 자동차를 만드는 데 꼭 필요한 부품들을 전문적으로 만드는 회사예요.  자동차의 심장인 엔진 부품부터,  안전을 지켜주는 브레이크, 에어백,  운전을 편리하게 해주는 첨단 장치까지,  자동차 30000여 개 부품을 만들어요.  현대자동차, 기아뿐 아니라 전 세계 자동차 회사에 부품을 공급하는 아주 중요한 회사랍니다.  겉으로 잘 보이지 않지만, 자동차의 안전과 성능을 책임지는 숨은 영웅 같은 회사예요.",
+        },
+    },
+    "에너지(Energy)": {
+        "LG에너지솔루션": {
+            "initial_price_range": (300000, 500000),
+            "description": "미래 에너지를 만드는 LG에너지솔루션!  우리가 타고 다니는 전기자동차에 꼭 필요한 배터리를 만드는 회사 중 세계 1등이에요.  전기차 배터리뿐 아니라, 스마트폰, 노트북, 에너지 저장 장치(ESS) 등 다양한 곳에 사용되는 배터리를 만들어요.  태양광, 풍력 같은 친환경 에너지를 더욱 효율적으로 사용할 수 있도록 돕는 기술을 개발하고 있답니다.  지구를 깨끗하게 만드는 데 아주 중요한 역할을 하는 회사예요.",
+        },
+        "SK이노베이션": {
+            "initial_price_range": (100000, 150000),
+            "description": "에너지와 화학의 힘, SK이노베이션!  우리가 사용하는 휘발유, 경유 같은 기름을 만들고,  플라스틱, 옷, 타이어 같은 다양한 제품의 원료가 되는 화학 제품도 만들어요.  최근에는 전기차 배터리 사업을 키워서 미래 에너지 시대를 준비하고 있답니다.  오래전부터 우리나라 에너지 산업을 이끌어온 회사이고, 지금은 친환경 에너지 회사로 변신하고 있어요.",
+        },
+        "두산에너빌리티": {
+            "initial_price_range": (15000, 25000),
+            "description": "힘찬 에너지를 만드는 두산에너빌리티!  우리가 사용하는 전기를 만드는 발전소를 짓고, 발전소에 필요한 기계를 만드는 회사예요.  화력 발전소, 원자력 발전소, 수력 발전소, 풍력 발전소 등 다양한 발전소를 건설하고,  바닷물을 깨끗한 물로 바꾸는 해수담수화 설비도 만들어요.  최근에는 친환경 에너지 기술을 개발해서 지구를 위한 깨끗한 에너지를 만드는 데 힘쓰고 있답니다.  우리나라 전력 공급에 아주 중요한 역할을 하는 회사예요.",
+        },
+    },
+    "인터넷(Internet)": {
+        "네이버": {
+            "initial_price_range": (200000, 300000),
+            "description": "궁금한 건 뭐든지 물어봐, 네이버!  우리나라에서 가장 유명한 인터넷 검색 엔진 '네이버'를 만드는 회사예요.  검색뿐 아니라 뉴스, 쇼핑, 블로그, 카페, 웹툰, 지도, 번역 등 다양한 인터넷 서비스를 제공하고 있어요.  우리가 매일 사용하는 카카오톡처럼,  라인(LINE)이라는 메신저 앱을 만들어서 해외에서도 인기가 많답니다.  우리나라 인터넷 세상을 만들어가는 대표적인 회사예요.",
+        },
+        "카카오": {
+            "initial_price_range": (40000, 60000),
+            "description": "세상을 연결하는 즐거움, 카카오!  국민 메신저 '카카오톡'을 만든 회사예요.  카카오톡뿐 아니라 카카오택시, 카카오페이, 카카오게임, 카카오웹툰, 카카오뱅크, 카카오맵 등 우리 생활을 편리하고 즐겁게 만들어주는 다양한 서비스를 만들고 있어요.  귀여운 카카오프렌즈 캐릭터도 아주 인기가 많죠?  우리나라 사람들의 하루를 카카오 서비스로 시작해서 카카오 서비스로 끝난다고 할 정도로, 우리 생활에 아주 깊숙이 들어와 있는 회사예요.",
+        },
+        "카카오뱅크": {
+            "initial_price_range": (20000, 30000),
+            "description": "내 손안의 은행, 카카오뱅크!  카카오톡을 만든 카카오에서 만든 특별한 은행이에요.  은행에 직접 가지 않아도 스마트폰 앱으로 계좌를 만들고, 돈을 보내고, 대출도 받을 수 있어요.  복잡한 서류 없이 간편하게 이용할 수 있고,  24시간 언제든지 은행 업무를 볼 수 있다는 장점이 있어요.  은행을 딱딱하고 어렵게 생각하지 않고, 쉽고 재미있게 이용할 수 있도록 도와주는 은행이에요.",
+        },
+    },
+    "소비재(Consumer Goods)": {
+        "CJ제일제당": {
+            "initial_price_range": (300000, 400000),
+            "description": "맛있는 식탁을 책임지는 CJ제일제당!  우리가 먹는 맛있는 음식들을 만드는 회사예요.  햇반, 비비고, 고메, 백설, 다시다 등 유명한 식품 브랜드를 많이 가지고 있어요.  김치, 만두, 햇반 같은 간편 식품부터,  밀가루, 설탕, 식용유 같은 요리 재료까지,  우리의 식탁을 풍요롭게 만들어주는 다양한 식품들을 만들어요.  영화관에서 먹는 팝콘, 뚜레쥬르 빵, 투썸플레이스 케이크도 CJ제일제당에서 만들어요.",
+        },
+        "아모레퍼시픽": {
+            "initial_price_range": (130000, 170000),
+            "description": "예뻐지는 마법, 아모레퍼시픽!  우리나라 대표 화장품 회사예요.  설화수, 라네즈, 마몽드, 이니스프리, 에뛰드하우스 등 다양한 화장품 브랜드를 만들어서,  아름다움을 꿈꾸는 사람들을 도와주고 있어요.  화장품뿐 아니라 샴푸, 치약, 바디워시 같은 생활용품도 만들고,  녹차, 건강기능식품 사업도 하고 있답니다.  우리나라 여성들의 아름다움을 책임지는 회사라고 할 수 있어요.",
+        },
+        "LG생활건강": {
+            "initial_price_range": (600000, 800000),
+            "description": "깨끗하고 아름다운 생활, LG생활건강!  우리 생활에 필요한 다양한 제품들을 만드는 회사예요.  샴푸, 린스, 비누, 치약, 세제 같은 생활용품부터,  오휘, 숨37°, 빌리프, 더페이스샵 같은 화장품 브랜드까지,  우리 생활을 더욱 깨끗하고 아름답게 만들어주는 제품들을 만들어요.  코카콜라, 스프라이트, 환타 같은 음료수도 LG생활건강에서 판매하고 있답니다.  우리 생활 곳곳에서 만날 수 있는 친근한 회사예요.",
+        },
+    },
+    "금융(Finance)": {
+        "KB금융": {
+            "initial_price_range": (50000, 60000),
+            "description": "든든한 금융 파트너, KB금융!  우리나라 대표 금융 회사 중 하나예요.  KB국민은행, KB증권, KB손해보험, KB국민카드 등 다양한 금융 회사를 가지고 있어서,  은행, 증권, 보험, 카드 등 다양한 금융 서비스를 제공하고 있어요.  우리나라 사람들이 가장 많이 이용하는 은행 중 하나인 KB국민은행을 운영하고 있고,  집을 살 때 돈을 빌려주는 주택담보대출도 많이 해주는 회사예요.  우리나라 경제를 튼튼하게 만드는 데 중요한 역할을 하고 있어요.",
+        },
+        "신한지주": {
+            "initial_price_range": (30000, 40000),
+            "description": "금융을 새롭게, 신한지주!  KB금융과 함께 우리나라 대표 금융 회사로 손꼽혀요.  신한은행, 신한카드, 신한금융투자, 신한생명 등 다양한 금융 회사를 가지고 있어서,  은행, 카드, 증권, 보험 등 모든 금융 서비스를 제공하고 있어요.  특히 젊은 고객들을 위한 다양한 금융 상품과 서비스를 개발하고 있고,  해외 시장에도 적극적으로 진출하고 있답니다.  빠르게 변화하는 금융 시장을 이끌어가는 회사예요.",
+        },
+        "하나금융지주": {
+            "initial_price_range": (40000, 50000),
+            "description": "금융으로 더 나은 미래, 하나금융지주!  우리나라 대표 금융 회사 중 하나예요.  하나은행, 하나증권, 하나카드, 하나생명 등 금융 회사를 가지고 있어서,  은행, 증권, 카드, 보험 등 금융 서비스를 제공하고 있어요.  외국 돈을 사고파는 외환 거래를 오랫동안 해왔고,  해외 투자와 관련된 금융 서비스도 잘 제공하는 회사예요.  글로벌 금융 시장에서 활약하는 회사라고 할 수 있어요.",
+        },
+    },
+    "건설(Construction)": {
+        "삼성물산": {
+            "initial_price_range": (100000, 150000),
+            "description": "세계를 건설하는 힘, 삼성물산!  삼성 그룹의 뿌리이자, 건설, 상사, 패션, 리조트 등 다양한 사업을 하는 회사예요.  우리나라 랜드마크 건물인 부르즈 할리파,  페트로나스 트윈 타워 건설에 참여했고,  인천국제공항,  싱가포르 지하철 같은 큰 프로젝트들을 많이 했어요.  건설뿐 아니라 옷을 만들고 팔기도 하고 (빈폴, 갤럭시),  에버랜드, 호텔신라 같은 리조트도 운영하는 다재다능한 회사예요.",
+        },
+        "HD현대": {
+            "initial_price_range": (40000, 60000),
+            "description": "바다를 개척하는 HD현대!  배를 만들고, 건설 기계를 만드는 회사예요.  울산에 있는 큰 조선소에서 아주 큰 배들을 만들고,  굴착기, 지게차 같은 건설 현장에서 볼 수 있는 노란색 기계들도 만들어요.  최근에는 로봇, 인공지능 기술을 개발해서 건설 현장을 더욱 스마트하게 만드는 기술을 개발하고 있답니다.  우리나라 조선 산업과 건설 기계 산업을 이끌어가는 회사예요.",
+        },
+        "GS건설": {
+            "initial_price_range": (30000, 50000),
+            "description": "행복을 짓는 GS건설!  우리가 사는 아파트 '자이'를 만드는 회사예요.  자이 아파트는 살기 좋은 아파트로 유명하고,  우리나라 아파트 브랜드 중에서 인기가 많아요.  아파트뿐 아니라 다리, 도로, 터널 같은 사회 기반 시설도 건설하고,  해외에서도 다양한 건설 프로젝트를 하고 있답니다.  우리나라 주거 문화를 만들어가는 대표적인 건설 회사예요.",
+        },
+    },
+    "유통(Retail)": {
+        "롯데쇼핑": {
+            "initial_price_range": (150000, 250000),
+            "description": "쇼핑의 즐거움, 롯데쇼핑!  우리나라 대표 유통 회사예요.  롯데백화점, 롯데마트, 롯데슈퍼, 롯데아울렛, 롯데ON 등 다양한 쇼핑 공간을 운영하고 있어요.  옷, 화장품, 식품, 가전제품 등 없는 게 없는 백화점부터,  저렴하고 신선한 식재료를 살 수 있는 마트까지,  우리의 쇼핑 생활을 책임지고 있어요.  영화관 롯데시네마, 테마파크 롯데월드도 롯데쇼핑에서 운영해요.",
+        },
+        "이마트": {
+            "initial_price_range": (100000, 150000),
+            "description": "생활 필수품은 모두 다, 이마트!  우리나라 대표 대형 할인 마트예요.  집에서 사용하는 거의 모든 물건을 살 수 있다고 생각하면 돼요.  신선한 채소, 과일, 고기 같은 식품부터,  세제, 샴푸, 휴지 같은 생활용품,  옷, 장난감, 가전제품까지 정말 다양한 상품을 팔고 있어요.  이마트 자체 브랜드인 '노브랜드', '피코크' 제품들도 인기가 많고,  온라인 쇼핑몰 'SSG닷컴'도 운영하고 있답니다.  우리나라 사람들의 장보기 문화를 대표하는 곳이에요.",
+        },
+    },
+    "통신(Telecom)": {
+        "KT": {
+            "initial_price_range": (30000, 40000),
+            "description": "빠르고 편리한 통신, KT!  우리나라 대표 통신 회사예요.  집에서 사용하는 인터넷,  스마트폰으로 사용하는 이동통신,  텔레비전 방송(IPTV),  기업들이 사용하는 IT 솔루션 등 다양한 통신 서비스를 제공하고 있어요.  오래전부터 우리나라 통신 산업을 이끌어왔고,  지금도 5G, 인공지능 같은 새로운 기술을 개발해서 더욱 편리한 통신 세상을 만들고 있답니다.  우리나라 정보 통신 발전에 큰 역할을 하는 회사예요.",
+        },
+        "SK텔레콤": {
+            "initial_price_range": (50000, 70000),
+            "description": "무선 통신의 강자, SK텔레콤!  우리나라 대표 통신 회사이고, 특히 이동통신 서비스에서 1등이에요.  스마트폰으로 데이터를 빠르게 사용할 수 있도록 5G, LTE 같은 무선 통신 기술을 개발하고,  인공지능, 메타버스 같은 미래 기술에도 투자하고 있어요.  우리가 스마트폰으로 영상 통화를 하고, 게임을 하고, 유튜브를 볼 수 있는 건 SK텔레콤 덕분이라고 할 수 있어요.  우리나라 무선 통신 기술을 이끌어가는 회사예요.",
+        },
+    },
+    "제약/바이오(Pharma/Bio)": {
+        "삼성바이오로직스": {
+            "initial_price_range": (700000, 900000),
+            "description": "생명을  소중하게, 삼성바이오로직스!  약은 약인데, 그냥 약이 아니라 아주 특별한 '바이오 의약품'을 만드는 회사예요.  우리 몸속 세포를 이용해서 만드는 바이오 의약품은 병을 치료하는 힘이 아주 세다고 해요.  삼성바이오로직스는 다른 제약 회사들을 위해 바이오 의약품을 대신 만들어주는 일을 전문으로 하고 있어요.  공장을 아주 크게 지어서,  최첨단 설비로 최고 품질의 바이오 의약품을 만들고 있답니다.  아픈 사람들을 위한 희망을 만드는 회사라고 할 수 있어요.",
+        },
+        "셀트리온": {
+            "initial_price_range": (180000, 250000),
+            "description": "바이오 의약품으로 질병과 싸우는 셀트리온!  삼성바이오로직스처럼 바이오 의약품을 만드는 회사인데,  셀트리온은 직접 새로운 바이오 의약품을 개발하고, 만들어서 전 세계에 팔고 있어요.  관절염, 암, 자가면역질환 같은 무서운 병들을 치료하는 바이오 의약품을 만들고 있고,  저렴한 가격으로 바이오 의약품을 만들어서 더 많은 사람들이 치료받을 수 있도록 노력하고 있답니다.  바이오 의약품 분야에서 우리나라를 대표하는 회사예요.",
+        },
+    },
+    "화학(Chemical)": {
+        "LG화학": {
+            "initial_price_range": (600000, 800000),
+            "description": "생활 속 화학, LG화학!  우리가 매일 사용하는 플라스틱, 옷, 신발, 건전지, 자동차 배터리,  화장품 원료까지 정말 다양한 화학 제품을 만드는 회사예요.  눈에 보이지 않지만 우리 생활 곳곳에 LG화학 제품들이 사용되고 있답니다.  최근에는 친환경 플라스틱,  전기차 배터리 소재 같은 미래 기술 개발에도 힘쓰고 있어요.  우리나라 화학 산업을 이끌어가는 대표적인 회사예요.",
+        },
+        "금호석유화학": {
+            "initial_price_range": (120000, 180000),
+            "description": "산업의 기초 소재, 금호석유화학!  자동차 타이어,  건축 자재,  포장재,  장갑,  운동화 밑창 등 다양한 제품의 원료가 되는 합성고무를 만드는 회사예요.  합성고무는 천연고무보다 더 튼튼하고,  다양한 기능을 가질 수 있어서 산업 현장에서 아주 많이 사용된답니다.  우리나라 합성고무 산업을 처음 시작했고, 지금도 세계적인 기술력을 가지고 있어요.  산업 발전에 꼭 필요한 숨은 영웅 같은 회사예요.",
+        },
+    },
+    "철강(Steel)": {
+        "POSCO홀딩스": {
+            "initial_price_range": (300000, 400000),
+            "description": "철강으로 나라를 튼튼하게, POSCO홀딩스!  우리나라 대표 철강 회사이고,  세계적으로도 아주 큰 철강 회사예요.  자동차, 배, 건물, 다리, 기차,  가전제품 등 우리 생활 곳곳에 사용되는 철강 제품을 만들어요.  철강은 튼튼하고 튼튼해서 오랫동안 사용할 수 있고,  재활용도 잘 돼서 친환경적인 소재이기도 해요.  우리나라 산업 발전에 없어서는 안 될 중요한 회사예요.",
+        },
+        "현대제철": {
+            "initial_price_range": (50000, 70000),
+            "description": "자동차와 건설의 뼈대, 현대제철!  현대자동차 그룹의 철강 회사이고,  자동차와 건설에 사용되는 철강 제품을 전문적으로 만들어요.  자동차 차체를 튼튼하게 만드는 철판,  건물을 짓는 뼈대 역할을 하는 철근,  배를 만드는 데 사용하는 후판 등 다양한 철강 제품을 만들어요.  최근에는 친환경 철강 제조 기술을 개발해서 더욱 깨끗한 환경을 만드는 데 노력하고 있답니다.  현대자동차 그룹의 성장에 큰 힘이 되는 회사예요.",
+        },
+    },
+    "운송(Transportation)": {
+        "대한항공": {
+            "initial_price_range": (20000, 30000),
+            "description": "하늘을 나는 꿈, 대한항공!  우리나라 대표 항공사이고,  가장 많은 비행기를 가지고 있어요.  우리나라에서 다른 나라로 여행을 가거나,  다른 나라에서 우리나라로 여행을 올 때 대한항공 비행기를 많이 이용해요.  사람뿐 아니라 소중한 물건들을 안전하고 빠르게 전 세계로 운송하는 일도 하고 있답니다.  비행기 조종사, 승무원을 꿈꾸는 친구들이라면 누구나 가고 싶어 하는 회사일 거예요.",
+        },
+        "HMM": {
+            "initial_price_range": (20000, 30000),
+            "description": "바다를 누비는 HMM!  우리나라 대표 해운 회사이고,  아주 큰 배들을 많이 가지고 있어요.  우리가 사용하는 물건들은 대부분 배를 통해서 다른 나라에서 우리나라로, 우리나라에서 다른 나라로 이동한답니다.  HMM은 컨테이너선이라는 큰 배로 물건들을 실어 나르는 일을 전문으로 하고 있어요.  우리나라와 전 세계를 연결하는 중요한 역할을 하는 회사예요.",
+        },
+    },
+    "엔터테인먼트(Entertainment)": {
+        "CJ ENM": {
+            "initial_price_range": (80000, 120000),
+            "description": "즐거움을 디자인하는 CJ ENM!  텔레비전 방송, 영화, 음악, 공연 등 다양한 엔터테인먼트 사업을 하는 회사예요.  tvN, Mnet, OCN 같은 유명한 텔레비전 채널을 운영하고 있고,  '기생충', '부산행', '겨울왕국 2' 같은 유명한 영화들을 만들거나 투자했어요.  마마, KCON 같은 큰 음악 행사도 만들고,  뮤지컬, 연극 공연도 제작하는 등 우리 생활에 즐거움을 주는 다양한 문화 콘텐츠를 만들고 있어요.",
+        },
+        "하이브": {
+            "initial_price_range": (200000, 300000),
+            "description": "음악으로 세상을 감동시키는 하이브!  전 세계적으로 엄청난 인기를 누리고 있는 방탄소년단(BTS)을 키운 회사예요.  BTS뿐 아니라 투모로우바이투게더(TXT), 세븐틴, 르세라핌, 뉴진스 등 인기 아이돌 그룹들이 많이 소속되어 있어요.  음반 제작, 매니지먼트, 공연뿐 아니라 게임, 웹툰, 교육 사업까지 확장해서 다양한 분야에서 즐거움을 주고 있답니다.  우리나라 대중문화를 세계에 알리는 데 큰 역할을 하는 회사예요.",
+        },
+    },
+    "식품(Food)": {
+        "오리온": {
+            "initial_price_range": (120000, 180000),
+            "description": "맛있는 과자, 오리온!  우리나라 대표 과자 회사이고,  초코파이, 오!감자, 포카칩, 꼬북칩, 고래밥 등 맛있고 재미있는 과자들을 많이 만들어요.  어린이부터 어른까지 누구나 좋아하는 과자들을 만들어서,  우리나라뿐 아니라 중국, 러시아, 베트남 등 해외에서도 인기가 많답니다.  과자를 좋아하는 친구라면 오리온 과자를 한 번쯤 먹어봤을 거예요.",
+        },
+        "농심": {
+            "initial_price_range": (300000, 400000),
+            "description": "국민 라면, 농심!  우리나라 대표 라면 회사이고,  신라면, 안성탕면, 짜파게티, 너구리, 새우깡 등 오랜 시간 동안 사랑받는 라면과 스낵들을 많이 만들어요.  매콤한 신라면, 구수한 안성탕면,  달콤 짭짤한 짜파게티,  얼큰한 너구리,  고소한 새우깡 등 다양한 맛과 종류의 라면과 스낵을 만들어서,  우리나라 사람들의 입맛을 즐겁게 해주고 있어요.  라면을 좋아하는 친구라면 농심 라면을 꼭 먹어봤을 거예요.",
+        },
+    },
+}
+
+# 실수로 바꾸지 못하도록 읽기 전용으로 감쌉니다.
+CATALOG = MappingProxyType(
+    {
+        sector: MappingProxyType(
+            {stock_name: MappingProxyType(company) for stock_name, company in companies.items()}
+        )
+        for sector, companies in _CATALOG.items()
+    }
+)
+SECTOR_NAMES = tuple(CATALOG)
+# 종목 이름 -> 회사 정보
+COMPANIES = MappingProxyType(
+    {stock_name: company for companies in CATALOG.values() for stock_name, company in companies.items()}
+)
+del _CATALOG
+
+
+def new_market_stocks(seed=None):
+    # 처음 시작하는 시장 상태입니다. 종목마다 현재 주가만 담습니다.
+    # seed를 주면 처음 주가도 그 씨앗의 난수 흐름에서 뽑으므로 같은 씨앗이면 언제나 같은 주가로 시작합니다.
+    generator = rng.stream(seed, rng.STREAM_INITIAL_PRICES) if seed is not None else np.random.default_rng()
+    return {
+        sector: {
+            stock_name: {"current_price": int(generator.integers(*company["initial_price_range"], endpoint=True))}
+            for stock_name, company in companies.items()
+        }
+        for sector, companies in CATALOG.items()
+    }
+
+
+def description(stock_name):
+    company = COMPANIES.get(stock_name)
+    return company["description"] if company else ""
@@ -0,0 +1,139 @@
+# --- 주가 그래프 ---
+# 오래 진행한 시뮬레이션은 주가 기록이 수백 일이 되므로, 그래프에는 모양을 유지하는 점만 골라
+# 정해진 개수(MAX_POINTS) 이하로 줄여서 보냅니다. (LTTB: Largest-Triangle-Three-Buckets)
+# 만든 그래프는 (종류, 종목, 기록 길이) 별로 보관해 두고 다시 씁니다.
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+MAX_POINTS = 300  # 한 종목 그래프에 그리는 최대 점 수
+FIGURE_CACHE_ENTRIES = 32  # 세션마다 보관하는 그래프 수
+
+
+def lttb_indices(values, max_points):
+    # LTTB로 고른 점들의 위치(날짜 번호)를 돌려줍니다. 첫날과 마지막 날은 항상 포함합니다.
+    count = len(values)
+    if max_points >= count or max_points < 3:
+        return np.arange(count)
+    values = np.asarray(values, dtype=np.float64)
+    # 첫 점과 마지막 점 사이를 max_points - 2개 구간으로 나눕니다. (구간마다 점이 하나 이상 있습니다)
+    bucket_edges = np.append(np.linspace(1, count - 1, max_points - 1).astype(np.intp), count)
+    selected = np.empty(max_points, dtype=np.intp)
+    selected[0] = 0
+    selected[-1] = count - 1
+    previous = 0
+    for bucket in range(max_points - 2):
+        start, end = bucket_edges[bucket], bucket_edges[bucket + 1]
+        # 다음 구간의 평균 점 (마지막 구간 다음은 마지막 점)
+        next_start, next_end = end, bucket_edges[bucket + 2]
+        next_x = (next_start + next_end - 1) / 2
+        next_y = values[next_start:next_end].mean()
+        # 이전 선택 점, 후보 점, 다음 구간 평균 점이 만드는 삼각형이 가장 큰 후보를 고릅니다.
+        candidates = np.arange(start, end)
+        areas = np.abs(
+            (previous - next_x) * (values[candidates] - values[previous])
+            - (previous - candidates) * (next_y - values[previous])
+        )
+        previous = candidates[np.argmax(areas)]
+        selected[bucket + 1] = previous
+    return selected
+
+
+def minmax_indices(values, max_points):
+    # 구간마다 최저점과 최고점을 남깁니다. LTTB보다 빠르고 급등락을 놓치지 않습니다.
+    # 첫날과 마지막 날은 항상 포함하므로, 그 사이를 (max_points - 2) // 2개 구간으로 나눠 max_points를 넘지 않게 합니다.
+    count = len(values)
+    if max_points >= count or max_points < 4:
+        return np.arange(count)
+    buckets = np.array_split(np.arange(1, count - 1), (max_points - 2) // 2)
+    values = np.asarray(values)
+    picks = set()
+    for bucket in buckets:
+        picks.add(bucket[np.argmin(values[bucket])])
+        picks.add(bucket[np.argmax(values[bucket])])
+    picks.update((0, count - 1))
+    return np.array(sorted(picks), dtype=np.intp)
+
+
+DOWNSAMPLERS = {"lttb": lttb_indices, "minmax": minmax_indices}
+
+
+def history_frame(price_history, stock_names, normalize=False, max_points=MAX_POINTS, method="lttb"):
+    # 여러 종목의 주가 기록을 한 번에 꺼내 (날짜, 주가, 종목) 형태의 표 하나로 만듭니다.
+    slots = [price_history.index[stock_name] for stock_name in stock_names]
+    prices = price_history.matrix()[slots].astype(np.float64)  # (종목 수, 날짜 수)
+    if normalize and prices.shape[1]:
+        prices = prices / prices[:, :1] * 100  # 첫날을 100으로 맞춥니다.
+    downsample = DOWNSAMPLERS[method]
+    days, values, names = [], [], []
+    for stock_name, row in zip(stock_names, prices):
+        picked = downsample(row, max_points)
+        days.append(picked + 1 + price_history.offset)
+        values.append(row[picked])
+        names.append(np.full(len(picked), stock_name, dtype=object))
+    return pd.DataFrame(
+        {
+            "날짜": np.concatenate(days) if days else [],
+            "주가": np.concatenate(values) if values else [],
+            "종목": np.concatenate(names) if names else [],
+        }
+    )
+
+
+def price_figure(price_history, stock_name, title, max_points=MAX_POINTS):
+    import plotly.express as px  # 무거운 라이브러리라 그래프를 처음 그릴 때 불러옵니다.
+
+    frame = history_frame(price_history, [stock_name], max_points=max_points)
+    return px.line(frame, x="날짜", y="주가", title=title)
+
+
+def compare_figure(price_history, stock_names, title, max_points=MAX_POINTS):
+    # 주가 크기가 달라도 비교할 수 있도록 첫날을 100으로 맞춘 그래프입니다.
+    import plotly.express as px  # 무거운 라이브러리라 그래프를 처음 그릴 때 불러옵니다.
+
+    frame = history_frame(price_history, stock_names, normalize=True, max_points=max_points)
+    figure = px.line(frame, x="날짜", y="주가", color="종목", title=title)
+    figure.update_yaxes(title="첫날 = 100")
+    return figure
+
+
+def sector_figure(price_history, stock_names, sector, max_points=MAX_POINTS):
+    # 섹터 안의 종목들과 섹터 평균을 함께 그립니다.
+    import plotly.express as px  # 무거운 라이브러리라 그래프를 처음 그릴 때 불러옵니다.
+
+    frame = history_frame(price_history, stock_names, normalize=True, max_points=max_points)
+    slots = [price_history.index[stock_name] for stock_name in stock_names]
+    prices = price_history.matrix()[slots].astype(np.float64)
+    average = (prices / prices[:, :1] * 100).mean(axis=0)
+    picked = lttb_indices(average, max_points)
+    average_frame = pd.DataFrame(
+        {"날짜": picked + 1 + price_history.offset, "주가": average[picked], "종목": f"{sector} 평균"}
+    )
+    figure = px.line(
+        pd.concat([frame, average_frame], ignore_index=True),
+        x="날짜",
+        y="주가",
+        color="종목",
+        title=f"{sector} 섹터 주가 비교",
+    )
+    figure.update_traces(selector={"name": f"{sector} 평균"}, line={"width": 4, "dash": "dash"})
+    figure.update_yaxes(title="첫날 = 100")
+    return figure
+
+
+class FigureCache:
+    # 최근에 만든 그래프를 보관합니다. 가득 차면 가장 오래 쓰지 않은 그래프부터 지웁니다.
+    def __init__(self, max_entries=FIGURE_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._figures = OrderedDict()
+
+    def get_or_build(self, key, build):
+        if key in self._figures:
+            self._figures.move_to_end(key)
+            return self._figures[key]
+        figure = build()
+        self._figures[key] = figure
+        if len(self._figures) > self.max_entries:
+            self._figures.popitem(last=False)
+        return figure
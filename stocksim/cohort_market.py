@@ -0,0 +1,142 @@
+# --- 반 공용 시장 ---
+# 예전에는 학생마다 주가를 따로 만들고 따로 움직여서, 한 반 30명이면 시장 30개를 계산하고 저장했습니다.
+# 반 모드에서는 반마다 시장(주가, 주가 기록, 뉴스) 하나를 두고 하루에 한 번만 진행합니다.
+# 학생 세션은 공용 상태를 읽기만 하고, 학생마다 저장하는 것은 포트폴리오뿐입니다.
+# 진행할 때는 복사본을 움직여 새 상태로 한 번에 바꿔 끼우므로, 다른 세션이 반쯤 바뀐 상태를 읽는 일이 없습니다.
+import copy
+import threading
+
+from stocksim.impacts import compute_sector_impacts
+from stocksim.price_history import PriceHistory
+from stocksim.simulation import Event, Market, Result
+from stocksim.ticker_index import TickerIndex
+
+# 저장하는 반 상태 키 (persistence.PARTS의 market, news, news_archive 조각)
+SAVED_KEYS = ("day_count", "stocks", "market_seed", "daily_news", "previous_daily_news", "news_meanings")
+
+
+class CohortState:
+    # 한 반의 어느 시점 시장 상태입니다. 여러 세션이 그대로 참조하므로 만든 뒤에는 바꾸지 않습니다.
+    def __init__(
+        self,
+        stocks,
+        price_history=None,
+        day_count=1,
+        daily_news=None,
+        previous_daily_news=None,
+        news_meanings=None,
+        sector_news_impact=None,
+        version=0,
+        market_seed=None,
+    ):
+        self.stocks = stocks
+        self.market_seed = market_seed  # 반 시장의 난수 씨앗 (stocksim.rng)
+        self.price_history = price_history if price_history is not None else PriceHistory.from_stocks(stocks)
+        self.ticker_index = TickerIndex(stocks)
+        self.day_count = day_count
+        self.daily_news = daily_news
+        self.previous_daily_news = previous_daily_news
+        self.news_meanings = news_meanings or {}
+        self.sector_news_impact = sector_news_impact or {}
+        self.version = version  # 상태가 바뀔 때마다 올라갑니다. (화면 캐시 열쇠)
+
+    def replace(self, **changes):
+        values = {key: getattr(self, key) for key in SAVED_KEYS}
+        values.update(
+            price_history=self.price_history, sector_news_impact=self.sector_news_impact, version=self.version + 1
+        )
+        values.update(changes)
+        return CohortState(**values)
+
+    def session_values(self):
+        # 세션에 넣을 {session_state 키: 값} 입니다. 복사하지 않습니다.
+        values = {key: getattr(self, key) for key in SAVED_KEYS}
+        values.update(
+            price_history=self.price_history,
+            ticker_index=self.ticker_index,
+            sector_news_impact=self.sector_news_impact,
+        )
+        return values
+
+    def saved_values(self):
+        return {key: getattr(self, key) for key in SAVED_KEYS}
+
+
+class CohortMarket:
+    # on_change(cohort_market)는 상태가 바뀔 때마다 잠금 안에서 불립니다. (저장 순서가 뒤바뀌지 않습니다)
+    def __init__(self, cohort, state, on_change=None):
+        self.cohort = cohort
+        self.state = state
+        self.on_change = on_change
+        self._lock = threading.Lock()
+
+    def set_daily_news(self, day_count, daily_news):
+        # 오늘 뉴스가 아직 없을 때만 넣습니다. 이미 있으면 먼저 들어온 뉴스를 그대로 씁니다.
+        with self._lock:
+            state = self.state
+            if state.day_count == day_count and not state.daily_news and daily_news:
+                self._replace(state.replace(daily_news=daily_news))
+            return self.state
+
+    def advance(self, from_day, daily_news_list, meanings_list, next_daily_news=None, use_llm_sentiment=True, rng=None):
+        # from_day부터 뉴스 목록 길이만큼 진행합니다. 다른 학생이 먼저 진행해서 날짜가 달라졌으면 그대로 둡니다.
+        # (같은 날 여러 학생이 동시에 눌러도 한 번만 진행합니다)
+        with self._lock:
+            state = self.state
+            if state.day_count != from_day:
+                return Result(
+                    False, [Event("info", f"이미 Day {state.day_count}(으)로 진행되었습니다.")], state=state
+                )
+            market = Market(
+                copy.deepcopy(state.stocks),
+                PriceHistory(state.price_history.tickers, state.price_history.matrix(), state.price_history.offset),
+                day_count=from_day,
+                seed=state.market_seed,
+            )
+            daily_sector_impacts = [
+                compute_sector_impacts(daily_news, meanings, market.stocks, use_llm_sentiment)
+                for daily_news, meanings in zip(daily_news_list, meanings_list)
+            ]
+            market.advance(daily_sector_impacts, rng=rng)
+            self._replace(
+                state.replace(
+                    stocks=market.stocks,
+                    price_history=market.price_history,
+                    day_count=market.day_count,
+                    daily_news=next_daily_news or None,
+                    previous_daily_news=daily_news_list[-1] or None,
+                    news_meanings=meanings_list[-1] or {},
+                    sector_news_impact=daily_sector_impacts[-1],
+                )
+            )
+            return Result(
+                True,
+                [Event("info", "주가가 변동되었습니다.")],
+                state=self.state,
+                sector_impacts=daily_sector_impacts[-1],
+            )
+
+    def _replace(self, state):
+        self.state = state
+        if self.on_change is not None:
+            self.on_change(self)
+
+
+class CohortMarkets:
+    # 반 이름 -> CohortMarket. 처음 찾을 때 load(cohort)로 저장된 CohortState를 읽고, 없으면 create()로 만듭니다.
+    def __init__(self, load, create, on_change=None):
+        self.load = load
+        self.create = create
+        self.on_change = on_change
+        self._markets = {}
+        self._lock = threading.Lock()
+
+    def get(self, cohort):
+        market = self._markets.get(cohort)
+        if market is not None:
+            return market
+        with self._lock:
+            if cohort not in self._markets:
+                state = self.load(cohort) or self.create()
+                self._markets[cohort] = CohortMarket(cohort, state, self.on_change)
+            return self._markets[cohort]
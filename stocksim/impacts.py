@@ -0,0 +1,89 @@
+# --- 뉴스가 주가에 주는 영향 ---
+# 뉴스 기사의 분위기(긍정/부정)와 AI가 고른 관련 섹터로 섹터별 영향도를 계산합니다.
+# 하루 지나기와 빨리 감기가 같은 계산을 쓰도록 Streamlit 상태와 분리해 두었습니다.
+#
+# 분위기 점수는 단어마다 가중치를 두고, 기사를 정규식 하나로 한 번만 훑어 나온 단어의 가중치를 모두 더합니다.
+# (예전에는 긍정 단어가 하나라도 있으면 부정 단어가 있어도 무조건 긍정이었습니다)
+# 합계는 -1 ~ 1 사이 점수로 줄이고, 영향도는 점수에 비례합니다. 같은 기사는 해시로 한 번만 계산합니다.
+# JSON 형식 뉴스처럼 AI가 고른 분위기가 있으면 그 방향을 따르고, 크기는 단어 점수가 AI와 맞을수록 커집니다.
+# (맞으면 LLM_SENTIMENT_SCORE 이상, 단어가 없으면 그 절반, 반대면 그보다 작습니다)
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+from stocksim.sectors import index_for
+
+SENTIMENT_WEIGHTS = {
+    "호황": 1.5,
+    "상승": 1.0,
+    "성장": 1.0,
+    "유망": 0.8,
+    "긍정적": 0.8,
+    "침체": -1.5,
+    "위기": -1.5,
+    "하락": -1.0,
+    "감소": -0.8,
+    "부정적": -0.8,
+    "어려움": -0.6,
+}
+SCORE_SATURATION = 3.0  # 가중치 합이 이만큼이면 점수가 최대(±1)가 됩니다.
+LLM_SENTIMENT_SCORE = 0.6  # AI 분위기를 따를 때의 기준 점수 크기 (단어 점수와 방향이 같으면 최소 이만큼)
+NEWS_IMPACT = 0.05  # 점수가 ±1인 뉴스 하나가 관련 섹터 주가에 주는 최대 변동률
+SCORE_CACHE_SIZE = 4096  # 기사별 점수를 기억하는 최대 개수
+
+SENTIMENT_VALUES = {"positive": 1, "negative": -1, "neutral": 0}  # JSON 형식 뉴스에서 AI가 고른 분위기
+
+# 긴 단어부터 맞추도록 정렬해서 하나의 정규식으로 묶습니다.
+_SENTIMENT_PATTERN = re.compile(
+    "|".join(re.escape(word) for word in sorted(SENTIMENT_WEIGHTS, key=len, reverse=True))
+)
+_score_cache = OrderedDict()
+_score_cache_lock = threading.Lock()
+
+
+def _score_text(news_article):
+    total = sum(SENTIMENT_WEIGHTS[match] for match in _SENTIMENT_PATTERN.findall(news_article))
+    return max(-1.0, min(1.0, total / SCORE_SATURATION))
+
+
+def sentiment_score(news_article):
+    # -1(매우 부정) ~ 1(매우 긍정) 사이 점수입니다. 단어가 없으면 0입니다.
+    key = hashlib.sha1(news_article.encode("utf-8")).digest()
+    with _score_cache_lock:
+        if key in _score_cache:
+            _score_cache.move_to_end(key)
+            return _score_cache[key]
+    score = _score_text(news_article)
+    with _score_cache_lock:
+        _score_cache[key] = score
+        if len(_score_cache) > SCORE_CACHE_SIZE:
+            _score_cache.popitem(last=False)
+    return score
+
+
+def news_score(news_article, news_meaning, use_llm_sentiment=True):
+    score = sentiment_score(news_article)
+    direction = SENTIMENT_VALUES.get(news_meaning.get("sentiment")) if use_llm_sentiment else None
+    if direction is None:
+        return score
+    if direction == 0:
+        return 0.0
+    if score * direction > 0:
+        return direction * max(abs(score), LLM_SENTIMENT_SCORE)
+    # 단어가 없거나 AI와 반대면 두 점수의 평균이라 같은 방향일 때보다 항상 작고, 방향은 뒤집지 않습니다.
+    return direction * max(0.0, (LLM_SENTIMENT_SCORE - abs(score)) / 2)
+
+
+def compute_sector_impacts(daily_news, news_meanings, sector_names, use_llm_sentiment=True):
+    sector_impacts = {sector: 0 for sector in sector_names}
+    # AI가 쓴 섹터 이름이 조금 달라도("기술", "Tech") 같은 섹터로 맞춥니다.
+    sector_index = index_for(tuple(sector_impacts))
+    for i, news_article in enumerate(daily_news or []):
+        news_meaning = (news_meanings or {}).get(str(i + 1))
+        if not news_meaning:
+            continue
+        impact = news_score(news_article, news_meaning, use_llm_sentiment) * NEWS_IMPACT
+        for sector in sector_index.resolve_all(news_meaning.get("sectors")):
+            sector_impacts[sector] += impact
+    return sector_impacts
@@ -0,0 +1,128 @@
+# --- AI 요청 세션 ---
+# 예전에는 모든 요청을 하나의 chat 세션으로 보내서, 하루가 지날 때마다 대화 기록이 길어지고
+# 요청 크기(토큰 수)와 응답 시간이 계속 늘어났습니다. 요청 방식을 골라 쓸 수 있게 합니다.
+#   - "stateless": 대화 기록 없이 매번 프롬프트 하나만 보냅니다. (요청 크기 일정)
+#   - "rolling": 최근 window개의 주고받은 내용과, 그보다 오래된 내용의 요약만 함께 보냅니다.
+#   - "chat": 예전처럼 대화 기록 전체를 계속 쌓아 보냅니다.
+import threading
+
+MODES = ("stateless", "rolling", "chat")
+ROLLING_WINDOW = 3  # rolling 방식에서 그대로 보내는 최근 주고받기 수
+
+SUMMARY_PROMPT = """
+아래는 초등학생 모의 주식 앱에서 지금까지 AI와 주고받은 내용입니다.
+다음 뉴스를 만들 때 이어서 참고할 수 있도록, 경제 상황의 흐름만 5문장 이내로 요약해주세요.
+
+{conversation}
+"""
+
+
+class UsageStats:
+    # 요청 수와 토큰 사용량을 모읍니다. 여러 스레드에서 함께 기록해도 됩니다.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.last_prompt_tokens = 0
+
+    def record(self, response):
+        usage = getattr(response, "usage_metadata", None)
+        prompt_tokens = getattr(usage, "prompt_token_count", 0) or 0
+        output_tokens = getattr(usage, "candidates_token_count", 0) or 0
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += prompt_tokens
+            self.output_tokens += output_tokens
+            self.last_prompt_tokens = prompt_tokens
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "prompt_tokens": self.prompt_tokens,
+                "output_tokens": self.output_tokens,
+                "last_prompt_tokens": self.last_prompt_tokens,
+            }
+
+
+# 세션에 묶이지 않은 요청(백그라운드 준비, 반 공용 뉴스)의 사용량입니다. 프로세스 전체에서 하나입니다.
+shared_usage = UsageStats()
+
+
+class PromptSession:
+    # model에는 모델 대신 모델을 돌려주는 함수를 줄 수 있습니다. 그러면 처음 요청을 보낼 때 불러서,
+    # 세션을 만들기만 할 때는 무거운 AI 라이브러리를 불러오지 않습니다.
+    def __init__(self, model, mode="stateless", window=ROLLING_WINDOW):
+        if mode not in MODES:
+            raise ValueError(f"알 수 없는 요청 방식입니다: {mode}")
+        if callable(model) and not hasattr(model, "generate_content"):
+            self._model, self._model_factory = None, model
+        else:
+            self._model, self._model_factory = model, None
+        self.mode = mode
+        self.window = window
+        self.history = []  # rolling 방식에서 보관하는 최근 주고받은 내용 [(질문, 답)]
+        self.summary = ""  # rolling 방식에서 오래된 내용을 줄인 요약
+        self._chat = None  # chat 방식의 대화 (처음 보낼 때 만듭니다)
+        self.stats = UsageStats()
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = self._model_factory()
+        return self._model
+
+    @property
+    def chat(self):
+        if self._chat is None and self.mode == "chat":
+            self._chat = self.model.start_chat(history=[])
+        return self._chat
+
+    def send(self, prompt, generation_config=None):
+        # 프롬프트를 보내고 응답 문자열을 돌려줍니다. generation_config로 이번 요청의 응답 형식(JSON 등)을 바꿀 수 있습니다.
+        options = {"generation_config": generation_config} if generation_config else {}
+        if self.mode == "chat":
+            response = self.chat.send_message(prompt, **options)
+        elif self.mode == "rolling":
+            response = self.model.generate_content(self._rolling_contents(prompt), **options)
+        else:
+            response = self.model.generate_content(prompt, **options)
+        self.stats.record(response)
+        text = response.text
+        if self.mode == "rolling":
+            self.history.append((prompt, text))
+            if len(self.history) > self.window:
+                self._fold_history()
+        return text
+
+    def history_length(self):
+        # 다음 요청에 함께 실려 가는 이전 메시지 수입니다.
+        if self.mode == "chat":
+            return len(self._chat.history) if self._chat is not None else 0
+        if self.mode == "rolling":
+            return len(self.history) * 2 + (2 if self.summary else 0)
+        return 0
+
+    def _rolling_contents(self, prompt):
+        contents = []
+        if self.summary:
+            contents.append({"role": "user", "parts": [f"지금까지의 요약:\n{self.summary}"]})
+            contents.append({"role": "model", "parts": ["네, 요약 내용을 참고하겠습니다."]})
+        for past_prompt, past_text in self.history:
+            contents.append({"role": "user", "parts": [past_prompt]})
+            contents.append({"role": "model", "parts": [past_text]})
+        contents.append({"role": "user", "parts": [prompt]})
+        return contents
+
+    def _fold_history(self):
+        # 창 밖으로 밀려난 오래된 내용을 기존 요약과 합쳐 짧은 요약 하나로 바꿉니다.
+        overflow = self.history[: len(self.history) - self.window]
+        self.history = self.history[len(overflow) :]
+        conversation = "\n\n".join(
+            [f"[이전 요약]\n{self.summary}"] * bool(self.summary)
+            + [f"[질문]\n{past_prompt}\n[답]\n{past_text}" for past_prompt, past_text in overflow]
+        )
+        response = self.model.generate_content(SUMMARY_PROMPT.format(conversation=conversation))
+        self.stats.record(response)
+        self.summary = response.text.strip()
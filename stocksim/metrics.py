@@ -0,0 +1,96 @@
+# --- 단계별 시간 기록 ---
+# 하루 지나기가 느릴 때 AI 요청, 재시도 대기, JSON 만들기, Supabase 중 어디서 시간이 걸렸는지 알 수 있도록
+# 단계마다 걸린 시간(span)을 기록합니다. 최근 기록만 프로세스 안에 보관하고(오래된 것부터 버립니다),
+# 선생님용 화면과 JSON Lines 내보내기에서 씁니다. 여러 스레드(백그라운드 준비, 저장 대기열)에서 함께 기록해도 됩니다.
+# METRICS_LOG=1 이면 기록할 때마다 "stocksim.metrics" 로거로 JSON 한 줄씩 남깁니다.
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+MAX_SPANS = 5000  # 보관하는 최근 기록 수
+
+logger = logging.getLogger("stocksim.metrics")
+
+
+def _percentile(sorted_values, rate):
+    index = min(len(sorted_values) - 1, int(round(rate * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class MetricsStore:
+    def __init__(self, max_spans=MAX_SPANS, log=False):
+        self._lock = threading.Lock()
+        self._spans = deque(maxlen=max_spans)
+        self.log = log
+
+    @contextmanager
+    def span(self, name, **fields):
+        # with metrics.span("generate_news", day=3): ... 처럼 씁니다. 예외가 나도 기록하고 다시 올립니다.
+        started = time.perf_counter()
+        ok = True
+        try:
+            yield fields
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            self.record(name, time.perf_counter() - started, ok, **fields)
+
+    def timed(self, name, func, **fields):
+        # 함수를 부를 때마다 시간을 기록하는 함수로 감쌉니다. (send 함수를 넘길 때 씁니다)
+        def timed_func(*args, **kwargs):
+            with self.span(name, **fields):
+                return func(*args, **kwargs)
+
+        return timed_func
+
+    def record(self, name, seconds, ok=True, **fields):
+        span = {"name": name, "at": time.time(), "ms": round(seconds * 1000, 3), "ok": ok, **fields}
+        with self._lock:
+            self._spans.append(span)
+        if self.log:
+            logger.info(json.dumps(span, ensure_ascii=False, default=str))
+
+    def spans(self, name=None, limit=None):
+        with self._lock:
+            spans = [span for span in self._spans if name is None or span["name"] == name]
+        return spans[-limit:] if limit else spans
+
+    def summary(self):
+        # 단계 이름 -> 횟수, 실패 수, 평균/중앙값/95%/최대(ms)
+        by_name = {}
+        for span in self.spans():
+            by_name.setdefault(span["name"], []).append(span)
+        summary = {}
+        for name, spans in sorted(by_name.items()):
+            durations = sorted(span["ms"] for span in spans)
+            summary[name] = {
+                "count": len(spans),
+                "errors": sum(1 for span in spans if not span["ok"]),
+                "avg_ms": sum(durations) / len(durations),
+                "p50_ms": _percentile(durations, 0.5),
+                "p95_ms": _percentile(durations, 0.95),
+                "max_ms": durations[-1],
+            }
+        return summary
+
+    def export_jsonl(self):
+        return "\n".join(json.dumps(span, ensure_ascii=False, default=str) for span in self.spans())
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+
+# 프로세스 전체에서 하나인 기록 저장소입니다.
+shared_metrics = MetricsStore(log=os.environ.get("METRICS_LOG", "0") == "1")
+if shared_metrics.log and not logger.handlers:
+    # 로그 설정이 따로 없으면 표준 오류로 한 줄씩 내보냅니다.
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
@@ -0,0 +1,168 @@
+# --- 뉴스 기사 프롬프트와 파싱 ---
+# Streamlit 상태를 쓰지 않으므로 백그라운드 작업에서도 그대로 부를 수 있습니다.
+# 두 가지 형식이 있습니다.
+#   - "text": 자유 문장으로 받아 "## 뉴스 " 로 나눕니다. 해설은 하루가 지날 때 따로 요청합니다.
+#   - "json": JSON 스키마로 기사, 해설, 관련 섹터, 분위기를 한 번에 받고 검사합니다.
+#     형식이 틀리면 무엇이 틀렸는지 알려 주고 한 번만 다시 요청합니다.
+import hashlib
+import json
+
+from stocksim.sectors import index_for
+
+NEWS_COUNT = 5  # 하루에 만드는 뉴스 기사 수
+FORMATS = ("json", "text")
+SENTIMENTS = ("positive", "negative", "neutral")
+
+
+def build_news_prompt(day_count):
+    return f"""
+지시:
+초등학생 6학년 수준에 맞춰서, 주식 시장과 경제에 관련된 뉴스 기사 {NEWS_COUNT}개를 생성해주세요.
+각 기사는 12~15문장 정도로 자세하게 작성하고, 특정 회사 이름이나 주식 종목을 직접적으로 언급하지 마세요.
+학생들이 뉴스를 읽고 어떤 회사가 유망할지 또는 쇠락할지 스스로 추론할 수 있도록 일반적인 경제 상황이나 산업 동향에 대한 뉴스를 만들어주세요.
+긍정적 뉴스, 부정적 뉴스, 중립적 뉴스 다양하게 생성하세요.(긍정, 부정, 중립 이라는 말은 표시하지 마세요.)
+뉴스에 따라 주식이 상승하기도 하고 하락하기도 할 수 있습니다.
+각 뉴스 기사는 "## 뉴스 [번호]" 로 시작해주세요. (예: ## 뉴스 1, ## 뉴스 2 ...)
+
+**생성된 뉴스 기사:**
+"""
+
+
+def parse_news_articles(news_text):
+    news_text = news_text.strip()
+    news_articles = []
+    if news_text:
+        news_articles = [
+            article.strip() for article in news_text.split("## 뉴스 ") if article.strip()
+        ]
+    return news_articles[:NEWS_COUNT]
+
+
+def news_key(daily_news):
+    # 뉴스 묶음을 구별하는 짧은 해시값입니다.
+    digest = hashlib.sha1()
+    for news_article in daily_news or []:
+        digest.update(news_article.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def news_schema(sector_names):
+    # Gemini response_schema 로 넘기는 JSON 스키마입니다. 섹터는 주어진 이름 중에서만 고르게 합니다.
+    return {
+        "type": "array",
+        "items": {
+            "type": "object",
+            "properties": {
+                "article": {"type": "string"},
+                "explanation": {"type": "string"},
+                "sectors": {"type": "array", "items": {"type": "string", "enum": list(sector_names)}},
+                "sentiment": {"type": "string", "enum": list(SENTIMENTS)},
+            },
+            "required": ["article", "explanation", "sectors", "sentiment"],
+        },
+    }
+
+
+def json_generation_config(sector_names):
+    return {"response_mime_type": "application/json", "response_schema": news_schema(sector_names)}
+
+
+def build_structured_news_prompt(day_count, sector_names):
+    return f"""
+지시:
+초등학생 6학년 수준에 맞춰서, 주식 시장과 경제에 관련된 뉴스 기사 {NEWS_COUNT}개를 생성해주세요.
+각 기사는 12~15문장 정도로 자세하게 작성하고, 특정 회사 이름이나 주식 종목을 직접적으로 언급하지 마세요.
+학생들이 뉴스를 읽고 어떤 회사가 유망할지 또는 쇠락할지 스스로 추론할 수 있도록 일반적인 경제 상황이나 산업 동향에 대한 뉴스를 만들어주세요.
+긍정적 뉴스, 부정적 뉴스, 중립적 뉴스 다양하게 생성하세요.(기사 본문에 긍정, 부정, 중립 이라는 말은 표시하지 마세요.)
+
+각 기사마다 아래 항목을 함께 알려주세요.
+- "article": 기사 본문
+- "explanation": 기사의 핵심 의미를 초등학생 6학년이 이해하기 쉽게 3문장 이내로 요약한 해설
+- "sectors": 관련된 주식 섹터 0~2개. 다음 이름 중에서 그대로 골라주세요: {', '.join(sector_names)}
+- "sentiment": 관련 섹터 주가에 좋은 뉴스면 "positive", 나쁜 뉴스면 "negative", 둘 다 아니면 "neutral"
+
+Day {day_count}의 뉴스 {NEWS_COUNT}개를 JSON 배열로만 답해주세요.
+"""
+
+
+def build_repair_prompt(response_text, errors):
+    problems = "\n".join(f"- {error}" for error in errors)
+    return f"""
+아래 JSON 응답에 다음 문제가 있습니다.
+{problems}
+
+문제만 고쳐서, 같은 형식의 JSON 배열 전체를 다시 답해주세요. 다른 설명은 붙이지 마세요.
+
+{response_text}
+"""
+
+
+def parse_structured_news(response_text, sector_names):
+    # JSON 응답을 (기사 목록, {"1": 해설, ...}, 문제 목록) 으로 바꿉니다.
+    # 기사 본문이 없는 항목은 버리고, 모르는 섹터와 잘못된 분위기 값은 빼고 씁니다. (문제 목록에는 남깁니다)
+    try:
+        items = json.loads(response_text)
+    except (TypeError, json.JSONDecodeError) as e:
+        return [], {}, [f"JSON으로 읽을 수 없습니다: {e}"]
+    if isinstance(items, dict):
+        items = items.get("news") or items.get("articles") or []
+    if not isinstance(items, list):
+        return [], {}, ["최상위 값이 배열이 아닙니다."]
+
+    sector_index = index_for(tuple(sector_names))
+    articles, meanings, errors = [], {}, []
+    for position, item in enumerate(items[:NEWS_COUNT]):
+        label = f"{position + 1}번 항목"
+        if not isinstance(item, dict):
+            errors.append(f"{label}이 객체가 아닙니다.")
+            continue
+        article = item.get("article")
+        if not isinstance(article, str) or not article.strip():
+            errors.append(f'{label}에 "article"(기사 본문)이 없습니다.')
+            continue
+
+        sectors = item.get("sectors")
+        if not isinstance(sectors, list):
+            errors.append(f'{label}의 "sectors"가 배열이 아닙니다.')
+            sectors = []
+        resolved, unknown = [], []
+        for sector in sectors:
+            canonical = sector_index.resolve(sector)
+            if canonical is None:
+                unknown.append(sector)
+            elif canonical not in resolved:
+                resolved.append(canonical)
+        if unknown:
+            errors.append(f'{label}의 "sectors"에 없는 섹터 이름이 있습니다: {unknown}')
+        sentiment = item.get("sentiment")
+        if sentiment not in SENTIMENTS:
+            errors.append(f'{label}의 "sentiment"는 {list(SENTIMENTS)} 중 하나여야 합니다.')
+            sentiment = "neutral"
+        explanation = item.get("explanation")
+        if not isinstance(explanation, str) or not explanation.strip():
+            errors.append(f'{label}에 "explanation"(해설)이 없습니다.')
+            explanation = ""
+
+        articles.append(article.strip())
+        meanings[str(len(articles))] = {
+            "explanation": explanation.strip(),
+            "sectors": resolved,
+            "sentiment": sentiment,
+        }
+    if len(articles) < NEWS_COUNT:
+        errors.append(f"기사가 {NEWS_COUNT}개여야 하는데 {len(articles)}개입니다.")
+    return articles, meanings, errors
+
+
+def generate_structured_news(send, day_count, sector_names):
+    # send는 JSON 응답 설정으로 보내는 함수입니다. (기사 목록, 해설) 을 돌려주고, 기사가 하나도 없으면 ([], {}) 입니다.
+    response_text = send(build_structured_news_prompt(day_count, sector_names))
+    articles, meanings, errors = parse_structured_news(response_text, sector_names)
+    if errors:
+        retry_text = send(build_repair_prompt(response_text, errors))
+        retry_articles, retry_meanings, retry_errors = parse_structured_news(retry_text, sector_names)
+        # 다시 받은 결과가 더 나을 때만 바꿉니다.
+        if (len(retry_articles), -len(retry_errors)) > (len(articles), -len(errors)):
+            articles, meanings = retry_articles, retry_meanings
+    return articles, meanings
@@ -0,0 +1,123 @@
+# --- 반 전체가 함께 쓰는 뉴스 저장소 ---
+# (반, 날짜, 종류) 마다 뉴스와 해설을 한 번만 만들고 모든 학생이 같이 읽습니다.
+# 같은 항목을 여러 학생이 동시에 처음 요청해도 AI 요청은 한 번만 보냅니다. (single-flight)
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from stocksim.snapshot import decode_value, encode_value
+
+LOCAL_CACHE_SIZE = 2048  # 프로세스에 기억해 두는 최대 항목 수 (오래 안 쓴 것부터 지우고, 지운 것은 저장소에서 다시 읽습니다)
+
+
+class InMemoryNewsStore:
+    # 프로세스 메모리에만 보관하는 저장소입니다. 로컬 실행과 테스트에 씁니다.
+    def __init__(self):
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def get(self, cohort, day, kind):
+        with self._lock:
+            return self._items.get((cohort, day, kind))
+
+    def put(self, cohort, day, kind, value):
+        with self._lock:
+            self._items[(cohort, day, kind)] = value
+
+
+class SupabaseNewsStore:
+    # Supabase의 class_news 테이블 (cohort, day, kind, data) 에 보관하는 저장소입니다.
+    def __init__(self, client, table="class_news"):
+        self.client = client
+        self.table = table
+
+    def get(self, cohort, day, kind):
+        response = (
+            self.client.table(self.table)
+            .select("data")
+            .eq("cohort", cohort)
+            .eq("day", day)
+            .eq("kind", kind)
+            .limit(1)
+            .execute()
+        )
+        if not response.data:
+            return None
+        return decode_value(response.data[0]["data"])
+
+    def put(self, cohort, day, kind, value):
+        self.client.table(self.table).upsert(
+            {"cohort": cohort, "day": day, "kind": kind, "data": encode_value(value)},
+            on_conflict="cohort,day,kind",
+        ).execute()
+
+
+class SharedNewsCache:
+    def __init__(self, store, local_cache_size=LOCAL_CACHE_SIZE):
+        self.store = store
+        self.local_cache_size = local_cache_size
+        self._local = OrderedDict()  # 이 프로세스에서 이미 읽은 항목 (최근에 쓴 것이 뒤)
+        self._inflight = {}  # 만드는 중인 항목 -> Future
+        self._lock = threading.Lock()
+
+    def get(self, cohort, day, kind):
+        key = (cohort, day, kind)
+        value = self._recall(key)
+        if value is not None:
+            return value
+        value = self.store.get(cohort, day, kind)
+        if value is not None:
+            self._remember(key, value)
+        return value
+
+    def put(self, cohort, day, kind, value):
+        # 함께 만들어진 항목(예: 뉴스와 같이 받은 해설)을 바로 저장합니다.
+        self.store.put(cohort, day, kind, value)
+        self._remember((cohort, day, kind), value)
+
+    def get_or_create(self, cohort, day, kind, create):
+        # 저장된 항목이 있으면 돌려주고, 없으면 create()로 한 번만 만들어 저장합니다.
+        # 만드는 중에 들어온 다른 요청은 같은 결과를 기다립니다.
+        key = (cohort, day, kind)
+        value = self._recall(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+        if not owner:
+            return future.result()
+
+        try:
+            value = self.get(cohort, day, kind)
+            if value is None:
+                value = create()
+                if value:  # 빈 결과는 저장하지 않아 다음 요청이 다시 만들 수 있게 합니다.
+                    self.store.put(cohort, day, kind, value)
+                    self._remember(key, value)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _recall(self, key):
+        with self._lock:
+            value = self._local.get(key)
+            if value is not None:
+                self._local.move_to_end(key)
+            return value
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._local[key] = value
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_cache_size:
+                self._local.popitem(last=False)
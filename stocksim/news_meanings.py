@@ -0,0 +1,172 @@
+# --- 뉴스 의미 해설 ---
+# 뉴스 기사들의 해설과 관련 섹터를 AI에게 물어봅니다.
+# send는 프롬프트 문자열을 받아 응답 문자열을 돌려주는 함수입니다.
+#   - "batch": 기사 전체를 JSON 배열로 한 번에 요청 (빠진 기사만 따로 다시 요청)
+#   - "concurrent": 기사마다 작업자 풀에서 동시에 요청, 할당량 초과 시 점점 길게 기다렸다가 재시도
+#   - "sequential": 예전처럼 기사마다 차례로 요청
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from stocksim.metrics import shared_metrics
+from stocksim.sectors import index_for
+
+MODES = ("batch", "concurrent", "sequential")
+MAX_WORKERS = 5  # 동시에 보내는 요청 수
+MAX_RETRIES = 4  # 할당량 초과 시 재시도 횟수
+BACKOFF_BASE = 1.0  # 첫 재시도 대기 시간(초), 재시도마다 두 배
+
+
+def build_meaning_prompt(news_article):
+    return f"""
+    **신문 기사:**
+    {news_article}
+
+    **지시:**
+    위 신문 기사의 핵심 의미를 초등학생 6학년이 이해하기 쉽게 3문장 이내로 요약해서 "해설: " 다음에 설명해주세요.
+    그리고 이 뉴스와 관련된 주식 섹터 1~2개를 쉼표로 구분해서 "관련 섹터: " 다음에 알려주세요. 관련 섹터가 없다면 "관련 섹터: 없음" 이라고 해주세요.
+
+    뉴스 의미 해설:
+    """
+
+
+def build_batch_prompt(daily_news, sector_names=None):
+    articles = "\n\n".join(
+        f"## 뉴스 {i + 1}\n{news_article}" for i, news_article in enumerate(daily_news)
+    )
+    sector_hint = ""
+    if sector_names:
+        sector_hint = f"\n    관련 섹터는 다음 이름 중에서 그대로 골라주세요: {', '.join(sector_names)}"
+    return f"""
+    **신문 기사들:**
+    {articles}
+
+    **지시:**
+    위 신문 기사 {len(daily_news)}개 각각의 핵심 의미를 초등학생 6학년이 이해하기 쉽게 3문장 이내로 요약해주세요.
+    그리고 각 뉴스와 관련된 주식 섹터 1~2개를 알려주세요. 관련 섹터가 없다면 빈 목록으로 해주세요.{sector_hint}
+    다른 설명 없이 아래 형식의 JSON 배열로만 답해주세요.
+    [{{"news": 1, "explanation": "해설", "sectors": ["섹터"]}}]
+    """
+
+
+def parse_meaning(meaning_text):
+    # "해설: ... 관련 섹터: ..." 형식의 응답을 해설 딕셔너리로 바꿉니다.
+    explanation = ""
+    related_sectors = []
+
+    if "해설:" in meaning_text:
+        explanation_start_index = meaning_text.find("해설:") + len("해설:")
+        explanation_end_index = meaning_text.find("관련 섹터:")
+        if explanation_end_index != -1:
+            explanation = meaning_text[explanation_start_index:explanation_end_index].strip()
+        else:
+            explanation = meaning_text[explanation_start_index:].strip()
+
+    if "관련 섹터:" in meaning_text:
+        related_sectors_str = meaning_text.split("관련 섹터:")[1].strip()
+        if related_sectors_str.lower() != "없음":
+            related_sectors = [sector.strip() for sector in related_sectors_str.split(',')]
+        else:
+            related_sectors = [] # "없음" explicitly means empty list
+
+    return {"explanation": explanation, "sectors": related_sectors}
+
+
+def parse_batch_meanings(response_text, count):
+    # JSON 배열 응답을 {"1": {...}, "2": {...}} 형태로 바꿉니다. 형식이 틀린 항목은 건너뜁니다.
+    text = response_text.strip()
+    start, end = text.find("["), text.rfind("]")
+    if start == -1 or end == -1:
+        return {}
+    try:
+        items = json.loads(text[start : end + 1])
+    except json.JSONDecodeError:
+        return {}
+
+    meanings = {}
+    for position, item in enumerate(items):
+        if not isinstance(item, dict):
+            continue
+        try:
+            news_no = int(item.get("news", position + 1))
+        except (TypeError, ValueError):
+            continue
+        if not 1 <= news_no <= count:
+            continue
+        sectors = item.get("sectors") or []
+        if isinstance(sectors, str):
+            sectors = [] if sectors.strip() == "없음" else sectors.split(",")
+        meanings[str(news_no)] = {
+            "explanation": str(item.get("explanation", "")).strip(),
+            "sectors": [str(sector).strip() for sector in sectors if str(sector).strip()],
+        }
+    return meanings
+
+
+def send_with_backoff(send, prompt, retry_on=(), max_retries=MAX_RETRIES, sleep=time.sleep):
+    # 할당량 초과(retry_on) 오류가 나면 지수적으로 늘어나는 시간만큼 기다렸다가 다시 보냅니다.
+    for attempt in range(max_retries + 1):
+        try:
+            return send(prompt)
+        except retry_on:
+            if attempt == max_retries:
+                raise
+            delay = BACKOFF_BASE * (2 ** attempt) * random.uniform(0.5, 1.5)
+            sleep(delay)
+            shared_metrics.record("llm.backoff_sleep", delay, attempt=attempt + 1)
+
+
+def explain_sequential(daily_news, send, retry_on=()):
+    meanings = {}
+    for i, news_article in enumerate(daily_news):
+        meaning_text = send_with_backoff(send, build_meaning_prompt(news_article), retry_on)
+        meanings[str(i + 1)] = parse_meaning(meaning_text.strip())
+    return meanings
+
+
+def explain_concurrent(daily_news, send, retry_on=(), max_workers=MAX_WORKERS, only=None):
+    # only에 기사 번호 목록을 주면 그 기사들만 요청합니다.
+    numbers = only if only is not None else [i + 1 for i in range(len(daily_news))]
+    if not numbers:
+        return {}
+
+    def explain_one(news_no):
+        prompt = build_meaning_prompt(daily_news[news_no - 1])
+        return parse_meaning(send_with_backoff(send, prompt, retry_on).strip())
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(numbers))) as executor:
+        results = list(executor.map(explain_one, numbers))
+    return {str(news_no): meaning for news_no, meaning in zip(numbers, results)}
+
+
+def explain_batch(daily_news, send, retry_on=(), sector_names=None, fallback_send=None):
+    # 한 번의 요청으로 전체 기사를 분석하고, 응답에서 빠진 기사만 기사별로 다시 요청합니다.
+    response_text = send_with_backoff(send, build_batch_prompt(daily_news, sector_names), retry_on)
+    meanings = parse_batch_meanings(response_text, len(daily_news))
+    missing = [i + 1 for i in range(len(daily_news)) if str(i + 1) not in meanings]
+    if missing and fallback_send is not None:
+        meanings.update(explain_concurrent(daily_news, fallback_send, retry_on, only=missing))
+    else:
+        for news_no in missing:
+            meaning_text = send_with_backoff(send, build_meaning_prompt(daily_news[news_no - 1]), retry_on)
+            meanings[str(news_no)] = parse_meaning(meaning_text.strip())
+    return {str(i + 1): meanings[str(i + 1)] for i in range(len(daily_news))}
+
+
+def explain(daily_news, send, mode="batch", retry_on=(), sector_names=None, parallel_send=None):
+    # parallel_send는 여러 스레드에서 동시에 불러도 되는 send 함수입니다. (없으면 send를 씁니다)
+    # sector_names를 주면 AI가 쓴 섹터 이름("기술", "Tech" 등)을 그 목록의 이름으로 맞춰 둡니다.
+    if not daily_news:
+        return {}
+    if mode == "concurrent":
+        meanings = explain_concurrent(daily_news, parallel_send or send, retry_on)
+    elif mode == "sequential":
+        meanings = explain_sequential(daily_news, send, retry_on)
+    else:
+        meanings = explain_batch(daily_news, send, retry_on, sector_names, parallel_send)
+    if sector_names:
+        sector_index = index_for(tuple(sector_names))
+        for meaning in meanings.values():
+            meaning["sectors"] = sector_index.resolve_all(meaning["sectors"])
+    return meanings
@@ -0,0 +1,184 @@
+# --- 주문 장부 ---
+# 예전에는 거래할 때 포트폴리오를 그 자리에서 바꾸고 포트폴리오 전체를 다시 저장했습니다.
+# 그래서 "매수 확인"을 두 번 누르거나 화면이 다시 실행되면 같은 거래가 두 번 들어갈 수 있었고,
+# 같은 계정을 연 두 탭은 서로의 저장을 덮어썼습니다. (나중에 저장한 쪽만 남음)
+#
+# 이제 체결된 거래는 user_orders 테이블에 (계정, 순번) 한 줄로 덧붙이기만 합니다.
+#   - 주문마다 주문 번호(order_id)를 두어, 같은 주문은 몇 번 보내도 한 번만 체결합니다.
+#   - 순번은 포트폴리오의 버전입니다. 다음 순번으로 쓰기에 실패하면 다른 탭이 먼저 거래한 것이므로,
+#     그 거래들을 읽어 반영한 뒤 새 포트폴리오로 다시 검사하고 다시 씁니다. (낙관적 동시성)
+# 저장하는 portfolio 조각은 어느 순번까지 반영했는지(ledger_version)를 함께 담은 중간 저장본이고,
+# 불러올 때는 중간 저장본 뒤의 주문을 다시 반영합니다.
+#
+# write-behind 방식에서는 거래할 때 데이터베이스를 기다리지 않도록, 주문을 이 장부에서 바로 체결하고 저장 대기열에 넘깁니다.
+#   - 순번은 대기열이 쓸 때 마지막 순번 뒤로 정하고, 이미 쓴 주문 번호는 건너뛰므로 다시 보내도 한 번만 들어갑니다.
+#   - 아직 장부에서 순번을 확인하지 못한 주문 번호(pending)를 중간 저장본에 함께 두어, 다시 반영할 때 두 번 넣지 않습니다.
+#   - 대신 다른 탭과 같은 돈이나 주식을 쓰는지는 쓸 때 검사하지 않습니다. (검사하려면 sync 방식으로 저장합니다)
+import copy
+
+from stocksim.metrics import shared_metrics
+from stocksim.simulation import Account, Event, Result
+from stocksim.snapshot import decode_value, encode_value
+
+MAX_RETRIES = 3  # 다른 탭과 부딪혔을 때 다시 시도하는 횟수
+
+
+class SupabaseOrderStore:
+    # user_orders (account, seq, order_id, data) 테이블입니다. (account, seq)와 (account, order_id)는 겹칠 수 없습니다.
+    def __init__(self, client, account, table="user_orders"):
+        self.client = client
+        self.account = account
+        self.table = table
+
+    def append(self, seq, order):
+        # 같은 순번이나 같은 주문 번호가 이미 있으면 데이터베이스가 오류를 냅니다.
+        with shared_metrics.span("db.orders_insert", account=self.account):
+            self.client.table(self.table).insert(
+                {"account": self.account, "seq": seq, "order_id": order["order_id"], "data": encode_value(order)}
+            ).execute()
+
+    def append_all(self, orders, max_retries=MAX_RETRIES):
+        # 대기열에 모아 둔 주문을 차례로 덧붙입니다. 순번은 지금 마지막 순번 뒤로 정합니다.
+        for attempt in range(max_retries + 1):
+            written = self.written_ids([order["order_id"] for order in orders])
+            orders = [order for order in orders if order["order_id"] not in written]
+            if not orders:
+                return
+            seq = self.last_seq()
+            try:
+                with shared_metrics.span("db.orders_insert", account=self.account, rows=len(orders)):
+                    self.client.table(self.table).insert(
+                        [
+                            {
+                                "account": self.account,
+                                "seq": seq + offset,
+                                "order_id": order["order_id"],
+                                "data": encode_value(order),
+                            }
+                            for offset, order in enumerate(orders, start=1)
+                        ]
+                    ).execute()
+                return
+            except Exception:
+                # 그 사이 다른 탭이 같은 순번을 썼으면, 쓴 것을 다시 확인하고 그 뒤로 씁니다.
+                if attempt == max_retries:
+                    raise
+
+    def written_ids(self, order_ids):
+        with shared_metrics.span("db.orders_select", account=self.account):
+            response = (
+                self.client.table(self.table)
+                .select("order_id")
+                .eq("account", self.account)
+                .in_("order_id", order_ids)
+                .execute()
+            )
+        return {row["order_id"] for row in response.data or []}
+
+    def last_seq(self):
+        with shared_metrics.span("db.orders_select", account=self.account):
+            response = (
+                self.client.table(self.table)
+                .select("seq")
+                .eq("account", self.account)
+                .order("seq", desc=True)
+                .limit(1)
+                .execute()
+            )
+        return response.data[0]["seq"] if response.data else 0
+
+    def since(self, seq):
+        # seq보다 뒤의 주문을 순번 순서로 돌려줍니다.
+        with shared_metrics.span("db.orders_select", account=self.account):
+            response = (
+                self.client.table(self.table)
+                .select("seq, data")
+                .eq("account", self.account)
+                .gt("seq", seq)
+                .order("seq")
+                .execute()
+            )
+        return [(row["seq"], decode_value(row["data"])) for row in response.data or []]
+
+
+class OrderLedger:
+    # account(simulation.Account)의 포트폴리오를 주문 장부로만 바꿉니다. store가 없으면(로그인 전) 메모리에서만 체결합니다.
+    # submit이 있으면(write-behind) 체결한 주문을 store에 바로 쓰지 않고 submit(order)로 넘깁니다.
+    def __init__(self, account, version=0, store=None, max_retries=MAX_RETRIES, submit=None, pending=()):
+        self.account = account
+        self.version = version  # 포트폴리오에 반영한 마지막 순번
+        self.store = store
+        self.max_retries = max_retries
+        self.submit = submit
+        self.order_ids = set(pending)  # 이 장부에서 체결하거나 반영한 주문 번호
+        self.pending = set(pending)  # 포트폴리오에는 반영했지만 아직 장부에서 순번을 확인하지 못한 주문 번호
+
+    def catch_up(self):
+        # 다른 곳(다른 탭, 중간 저장 뒤)에서 체결된 주문을 반영하고, 반영한 개수를 돌려줍니다.
+        if self.store is None:
+            return 0
+        newer = self.store.since(self.version)
+        for seq, order in newer:
+            if order["order_id"] in self.pending:
+                # 이 장부에서 미리 반영하고 넘긴 주문입니다. 순번만 따라갑니다.
+                self.pending.discard(order["order_id"])
+                self.version = seq
+            else:
+                self._apply(seq, order)
+        return len(newer)
+
+    def execute(self, market, order_id, kind, stock_name, quantity, sector=None, day=None):
+        # 주문을 한 번만 체결합니다. 이미 체결된 주문 번호면 아무것도 바꾸지 않습니다.
+        if order_id in self.order_ids:
+            return _duplicate()
+        refreshed = False
+        for _ in range(self.max_retries + 1):
+            # 복사본으로 먼저 검사해서, 쓰기에 실패하면 포트폴리오는 그대로 둡니다.
+            trial = Account(copy.deepcopy(self.account.portfolio), self.account.initial_cash)
+            if kind == "buy":
+                result = trial.buy(market, stock_name, quantity, sector)
+            else:
+                result = trial.sell(market, stock_name, quantity)
+            if not result:
+                # 다른 탭에서 산 주식을 팔거나 번 돈으로 사는 경우일 수 있으니, 한 번은 새 주문을 반영하고 다시 검사합니다.
+                if not refreshed and self._try_catch_up():
+                    refreshed = True
+                    continue
+                return result
+            order = dict(result.data["order"], order_id=order_id, day=day)
+            if self.submit is not None:
+                self.submit(order)
+                self.account.apply_order(order)
+                self.order_ids.add(order_id)
+                self.pending.add(order_id)
+                return result
+            if self.store is not None:
+                try:
+                    self.store.append(self.version + 1, order)
+                except Exception as e:
+                    # 다른 탭이 먼저 쓴 주문이 있으면 반영하고 다시 검사합니다. 없으면 저장 오류입니다.
+                    if not self._try_catch_up():
+                        return Result.error(f"주문을 저장하지 못했습니다. 다시 시도해주세요. ({e})")
+                    if order_id in self.order_ids:
+                        return _duplicate()
+                    continue
+            self._apply(self.version + 1, order)
+            return result
+        return Result.error("다른 곳에서 같은 계정으로 거래하고 있어 주문을 처리하지 못했습니다. 다시 시도해주세요.")
+
+    def _try_catch_up(self):
+        if self.store is None:
+            return 0
+        try:
+            return self.catch_up()
+        except Exception:
+            return 0
+
+    def _apply(self, seq, order):
+        self.account.apply_order(order)
+        self.order_ids.add(order["order_id"])
+        self.version = seq
+
+
+def _duplicate():
+    return Result(False, [Event("info", "이미 처리된 주문입니다.")], duplicate=True)
@@ -0,0 +1,307 @@
+# --- 바뀐 부분만 저장하기 ---
+# 예전에는 저장할 때마다 모든 상태를 JSON 하나로 묶어 users.data 전체를 덮어썼습니다.
+# 이제 상태를 몇 개의 조각(part)으로 나누어 user_state 테이블에 따로 두고,
+# 주가 기록은 user_price_history 테이블에 하루 한 줄씩 덧붙입니다.
+# 저장할 때는 지난번 저장 이후 바뀐 조각과 새로 생긴 날짜의 주가만 씁니다.
+# 반 공용 시장은 같은 방식으로 cohort_state, cohort_price_history 테이블에 반 이름(cohort)을 열쇠로 저장합니다.
+import hashlib
+
+import numpy as np
+
+from stocksim.metrics import shared_metrics
+from stocksim.price_history import PriceHistory
+from stocksim.snapshot import decode_prices, decode_value, encode_prices, encode_value
+
+# 조각 이름 -> 그 조각에 담기는 session_state 키
+# portfolio 조각은 주문 장부(stocksim.orders)의 중간 저장본이라 어느 순번까지 반영했는지(ledger_version)와
+# 반영했지만 아직 순번을 확인하지 못한 주문 번호(ledger_pending)를 함께 둡니다.
+# 지난 뉴스와 해설(news_archive)은 첫 화면에 필요 없으므로 따로 두고 필요할 때 불러옵니다.
+# (예전 "news" 조각에 세 키가 함께 들어 있어도 그대로 읽습니다)
+# market 조각의 stocks에는 current_price를 빼고 종목 구성만 담습니다. 현재 주가는 불러올 때 주가 기록의 마지막 날에서 채웁니다.
+# (예전처럼 stocks에 current_price가 들어 있어도 그대로 읽습니다)
+PARTS = {
+    "portfolio": ("portfolio", "ledger_version", "ledger_pending"),
+    "market": ("day_count", "stocks", "market_seed"),
+    "news": ("daily_news",),
+    "news_archive": ("previous_daily_news", "news_meanings"),
+}
+PAGE_SIZE = 1000  # Supabase에서 한 번에 읽는 최대 줄 수
+
+
+def _fingerprint(data):
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+def _membership(stocks):
+    # 저장용 종목 구성입니다. 주가는 주가 기록에 날마다 따로 저장하므로 빼서, 날짜가 바뀌어도 조각이 바뀌지 않습니다.
+    if stocks is None:
+        return None
+    return {
+        sector: {
+            stock_name: {key: value for key, value in stock_info.items() if key != "current_price"}
+            for stock_name, stock_info in sector_stocks.items()
+        }
+        for sector, sector_stocks in stocks.items()
+    }
+
+
+def _priced_stocks(stocks, price_history):
+    # 불러온 종목 구성에 주가 기록의 마지막 날 주가를 채웁니다. 주가를 알 수 없는 종목이 있으면 None입니다.
+    missing = [
+        (sector, stock_name)
+        for sector, sector_stocks in stocks.items()
+        for stock_name, stock_info in sector_stocks.items()
+        if "current_price" not in stock_info
+    ]
+    if not missing:
+        return stocks  # 예전 형식
+    if price_history is None or not len(price_history):
+        return None
+    latest = price_history.latest()
+    for sector, stock_name in missing:
+        slot = price_history.index.get(stock_name)
+        if slot is None:
+            return None
+        stocks[sector][stock_name]["current_price"] = int(latest[slot])
+    return stocks
+
+
+class PendingWrite:
+    # 아직 데이터베이스에 쓰지 않은 변경 내용입니다. 직렬화가 끝난 문자열만 담고 있어서
+    # 다른 스레드에서 써도 session_state와 부딪히지 않습니다.
+    def __init__(self, parts=None, history_rows=None, truncate_after=None, orders=None):
+        self.parts = parts or {}  # 조각 이름 -> 저장할 문자열 (snapshot 형식)
+        self.orders = orders or []  # 주문 장부에 덧붙일 주문 (체결한 순서대로)
+        self.history_rows = history_rows or {}  # 날짜 -> 그날 주가 문자열 (snapshot 형식)
+        self.truncate_after = truncate_after  # 이 날짜보다 뒤의 주가 기록은 지웁니다.
+
+    def __bool__(self):
+        return bool(self.parts or self.history_rows or self.orders or self.truncate_after is not None)
+
+    def merge(self, newer):
+        # 더 나중의 변경 내용을 합칩니다. 같은 조각, 같은 날짜는 나중 것이 이깁니다.
+        if newer.truncate_after is not None:
+            self.history_rows = {
+                day: prices for day, prices in self.history_rows.items() if day <= newer.truncate_after
+            }
+            if self.truncate_after is None or newer.truncate_after < self.truncate_after:
+                self.truncate_after = newer.truncate_after
+        self.parts.update(newer.parts)
+        self.history_rows.update(newer.history_rows)
+        self.orders.extend(newer.orders)
+        return self
+
+    def size(self):
+        return sum(len(data.encode("utf-8")) for data in self.parts.values()) + sum(
+            len(prices) for prices in self.history_rows.values()
+        )
+
+
+class DeltaPersistence:
+    def __init__(
+        self,
+        client,
+        account,
+        state_table="user_state",
+        history_table="user_price_history",
+        snapshot_format="compact",
+        key_column="account",
+        parts=None,
+        order_store=None,
+    ):
+        self.client = client
+        self.account = account  # key_column에 들어가는 값 (사용자 계정 또는 반 이름)
+        self.key_column = key_column
+        # 저장하고 읽는 조각. market 조각이 없으면 주가 기록도 저장하지 않습니다. (반 모드의 학생은 portfolio만)
+        self.parts = tuple(parts) if parts else tuple(PARTS)
+        self.has_history = "market" in self.parts
+        self.snapshot_format = snapshot_format  # 새로 쓸 때의 형식. 읽을 때는 어느 형식이든 읽습니다.
+        self.state_table = state_table
+        self.history_table = history_table
+        self.order_store = order_store  # 대기열에 넣은 주문을 쓰는 곳 (stocksim.orders.SupabaseOrderStore)
+        self._fingerprints = {}  # 조각 이름 -> 마지막으로 저장한 내용의 해시
+        self._saved_days = 0  # 저장된 주가 기록 날짜 수
+        self._saved_tickers = None  # 저장된 주가 기록의 종목 순서
+        self.unloaded_parts = set()  # 아직 불러오지 않은 조각. 저장할 때 건너뛰어 저장된 내용을 덮어쓰지 않습니다.
+
+    def prepare(self, state, price_history):
+        # 지난번 저장 이후 바뀐 조각과 새 주가 기록을 골라 PendingWrite로 만듭니다. (네트워크를 쓰지 않습니다)
+        # 돌려준 내용은 저장된 것으로 보고 기억하므로, 쓰기에 실패하면 invalidate()를 불러야 합니다.
+        with shared_metrics.span("save.prepare", account=self.account) as span:
+            pending = self._prepare(state, price_history)
+            span.update(parts=len(pending.parts), history_rows=len(pending.history_rows), bytes=pending.size())
+        return pending
+
+    def _prepare(self, state, price_history):
+        pending = PendingWrite()
+        if self.has_history:
+            self._prepare_history(pending, price_history)
+
+        for part in self.parts:
+            if part in self.unloaded_parts:
+                continue
+            value = {key: state.get(key) for key in PARTS[part]}
+            if part == "market":
+                value["stocks"] = _membership(value["stocks"])
+                value["history_tickers"] = price_history.tickers
+            data = encode_value(value, self.snapshot_format)
+            fingerprint = _fingerprint(data)
+            if self._fingerprints.get(part) != fingerprint:
+                pending.parts[part] = data
+                self._fingerprints[part] = fingerprint
+        return pending
+
+    def _prepare_history(self, pending, price_history):
+        # 종목 구성이 바뀌었으면 주가 기록을 처음부터 다시 씁니다.
+        # 앞쪽 기록을 아직 불러오지 않았으면(offset) 불러온 부분부터만 다시 쓸 수 있습니다.
+        if self._saved_tickers is not None and self._saved_tickers != price_history.tickers:
+            self._saved_days = price_history.offset
+        end_day = price_history.end_day()
+        if end_day < self._saved_days:
+            pending.truncate_after = end_day
+            self._saved_days = end_day
+        if end_day > self._saved_days:
+            first_new_day = max(self._saved_days, price_history.offset)
+            new_days = price_history.matrix()[:, first_new_day - price_history.offset :]
+            for offset in range(new_days.shape[1]):
+                pending.history_rows[first_new_day + offset + 1] = encode_prices(
+                    new_days[:, offset], self.snapshot_format
+                )
+            self._saved_days = end_day
+        self._saved_tickers = list(price_history.tickers)
+
+    def write(self, pending):
+        # PendingWrite를 데이터베이스에 씁니다. 다른 스레드에서 불러도 됩니다.
+        # 주문을 가장 먼저 써서, 그 주문을 반영한 중간 저장본(portfolio 조각)이 주문보다 먼저 저장되지 않게 합니다.
+        if pending.orders:
+            self.order_store.append_all(pending.orders)
+        if pending.truncate_after is not None:
+            with shared_metrics.span("db.history_delete", account=self.account):
+                self.client.table(self.history_table).delete().eq(self.key_column, self.account).gt(
+                    "day", pending.truncate_after
+                ).execute()
+        if pending.history_rows:
+            with shared_metrics.span("db.history_upsert", account=self.account, rows=len(pending.history_rows)):
+                self.client.table(self.history_table).upsert(
+                    [
+                        {self.key_column: self.account, "day": day, "prices": prices}
+                        for day, prices in sorted(pending.history_rows.items())
+                    ],
+                    on_conflict=f"{self.key_column},day",
+                ).execute()
+        # 주가 기록을 먼저 쓴 뒤에 조각을 써서, 저장된 날짜가 기록보다 앞서지 않게 합니다.
+        if pending.parts:
+            with shared_metrics.span("db.state_upsert", account=self.account, parts=len(pending.parts)):
+                self.client.table(self.state_table).upsert(
+                    [
+                        {self.key_column: self.account, "part": part, "data": data}
+                        for part, data in pending.parts.items()
+                    ],
+                    on_conflict=f"{self.key_column},part",
+                ).execute()
+
+    def invalidate(self):
+        # 저장에 실패했을 때 부릅니다. 다음 저장에서 모든 조각과 주가 기록을 다시 씁니다.
+        self._fingerprints = {}
+        self._saved_days = 0
+
+    def save(self, state, price_history):
+        # 바뀐 조각과 새 주가 기록만 바로 저장하고, 쓴 양을 돌려줍니다.
+        pending = self.prepare(state, price_history)
+        if pending:
+            try:
+                self.write(pending)
+            except Exception:
+                self.invalidate()
+                raise
+        return {"parts": list(pending.parts), "history_rows": len(pending.history_rows), "bytes": pending.size()}
+
+    def load(self, parts=None, history_days=None):
+        # 저장된 상태를 {session_state 키: 값} 으로 돌려줍니다. 아직 저장된 적이 없으면 None입니다.
+        # parts를 주면 그 조각만 읽고 나머지는 load_parts()로 나중에 읽습니다.
+        # history_days를 주면 주가 기록은 최근 그 날짜 수만 읽습니다. (앞쪽은 load_history()로 나중에 읽습니다)
+        parts = [part for part in parts if part in self.parts] if parts else list(self.parts)
+        state = self._load_parts(parts)
+        if state is None:
+            return None
+        self.unloaded_parts = set(self.parts) - set(parts)
+        if any(key in state for key in PARTS["news_archive"]):
+            self.unloaded_parts.discard("news_archive")  # 예전 "news" 조각에 함께 들어 있던 경우
+        history_tickers = state.pop("history_tickers", None)
+
+        if not history_tickers:
+            rows = []  # 주가 기록을 저장하지 않는 경우 (반 모드의 학생)
+        elif history_days:
+            rows = self._load_recent_history_rows(history_days)
+        else:
+            rows = self._load_history_rows()
+        if history_tickers and rows:
+            prices = np.array([decode_prices(row["prices"]) for row in rows], dtype=np.int32).T
+            state["price_history"] = PriceHistory(history_tickers, prices, offset=rows[0]["day"] - 1)
+            self._saved_days = rows[-1]["day"]
+            self._saved_tickers = list(history_tickers)
+        if state.get("stocks") is not None:
+            stocks = _priced_stocks(state["stocks"], state.get("price_history"))
+            if stocks is None:
+                # 주가 기록이 없어 주가를 알 수 없으면 새 시장으로 시작합니다.
+                # 씨앗도 함께 버려야 새 종목·주가와 예전 씨앗의 날짜별 변동이 섞이지 않습니다.
+                state.pop("stocks")
+                state.pop("market_seed", None)
+            else:
+                state["stocks"] = stocks
+        return state
+
+    def load_parts(self, parts):
+        # 나중에 필요해진 조각을 읽습니다. 저장된 적이 없는 조각은 빈 딕셔너리입니다.
+        state = self._load_parts(parts) or {}
+        self.unloaded_parts -= set(parts)
+        return state
+
+    def mark_loaded(self, part):
+        # 불러오지 않은 조각의 내용을 새로 정했을 때 부릅니다. 다음 저장부터 그 조각도 씁니다.
+        self.unloaded_parts.discard(part)
+
+    def load_history(self, last_day):
+        # 1일째부터 last_day까지의 주가 기록을 읽습니다. 다른 스레드에서 불러도 됩니다. (이 객체를 바꾸지 않습니다)
+        rows = self._load_history_rows(last_day)
+        if not rows or self._saved_tickers is None:
+            return None
+        prices = np.array([decode_prices(row["prices"]) for row in rows], dtype=np.int32).T
+        return PriceHistory(self._saved_tickers, prices)
+
+    def _load_parts(self, parts):
+        with shared_metrics.span("db.state_select", account=self.account):
+            query = self.client.table(self.state_table).select("part, data").eq(self.key_column, self.account)
+            response = query.in_("part", list(parts)).execute()
+        if not response.data:
+            return None
+
+        state = {}
+        for row in response.data:
+            self._fingerprints[row["part"]] = _fingerprint(row["data"])
+            state.update(decode_value(row["data"]))
+        return state
+
+    def _load_recent_history_rows(self, history_days):
+        with shared_metrics.span("db.history_select", account=self.account, recent=history_days):
+            response = (
+                self.client.table(self.history_table)
+                .select("day, prices")
+                .eq(self.key_column, self.account)
+                .order("day", desc=True)
+                .limit(history_days)
+                .execute()
+            )
+        return list(reversed(response.data or []))
+
+    def _load_history_rows(self, last_day=None):
+        rows = []
+        while True:
+            with shared_metrics.span("db.history_select", account=self.account):
+                query = self.client.table(self.history_table).select("day, prices").eq(self.key_column, self.account)
+                if last_day is not None:
+                    query = query.lte("day", last_day)
+                response = query.order("day").range(len(rows), len(rows) + PAGE_SIZE - 1).execute()
+            rows.extend(response.data or [])
+            if len(response.data or []) < PAGE_SIZE:
+                return rows
@@ -0,0 +1,41 @@
+# --- 다음 날 미리 준비하기 ---
+# 학생이 오늘 뉴스를 읽고 거래하는 동안, 백그라운드에서
+# 오늘 뉴스의 해설과 다음 날 뉴스를 미리 만들어 둡니다.
+# '하루 지나기'를 누르면 준비된 결과를 가져다 쓰기만 합니다.
+from concurrent.futures import CancelledError, TimeoutError
+
+from stocksim.news import news_key
+
+
+class PrefetchJob:
+    def __init__(self, executor, day_count, daily_news, explain_meanings, generate_next_news):
+        self.day_count = day_count
+        self.news_key = news_key(daily_news)
+        self.meanings = executor.submit(explain_meanings, list(daily_news))
+        self.next_news = executor.submit(generate_next_news, day_count + 1)
+
+    def matches(self, day_count, daily_news):
+        # 준비를 시작한 뒤 날짜나 뉴스가 바뀌었다면 결과를 쓸 수 없습니다.
+        return self.day_count == day_count and self.news_key == news_key(daily_news)
+
+    def done(self):
+        return self.meanings.done() and self.next_news.done()
+
+    def cancel(self):
+        # 아직 시작하지 않은 작업은 취소하고, 실행 중인 작업의 결과는 버립니다.
+        self.meanings.cancel()
+        self.next_news.cancel()
+
+    def results(self, timeout=None):
+        # (뉴스 해설, 다음 날 뉴스)를 돌려줍니다. 실패하거나 시간이 지나면 그 항목은 None입니다.
+        return _result_or_none(self.meanings, timeout), _result_or_none(self.next_news, timeout)
+
+
+def _result_or_none(future, timeout):
+    try:
+        return future.result(timeout=timeout)
+    except (CancelledError, TimeoutError):
+        future.cancel()
+        return None
+    except Exception:
+        return None
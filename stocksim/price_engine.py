@@ -0,0 +1,72 @@
+# --- 주가 엔진 ---
+# 모든 종목의 주가를 하나의 연속된 배열로 들고 있고,
+# 섹터별 뉴스 영향도는 섹터 인덱스 벡터를 통해 한 번에 적용합니다.
+import numpy as np
+
+from stocksim.price_history import MAX_PRICE
+from stocksim.rng import daily_noise
+
+DAILY_NOISE = 0.02  # 하루 무작위 변동 폭 (±2%)
+MAX_CHANGE_RATE = 0.3  # 하루 최대 변동률 (±30%)
+# 주가 상한은 주가 기록(int32)에 담을 수 있는 최댓값(price_history.MAX_PRICE)입니다. 넘으면 상한에 머뭅니다.
+
+_default_rng = np.random.default_rng()
+
+
+class PriceEngine:
+    def __init__(self, sectors, tickers, sector_index, prices):
+        self.sectors = list(sectors)  # 섹터 이름 목록
+        self.tickers = list(tickers)  # 종목 이름 목록 (배열 순서)
+        self.sector_index = np.asarray(sector_index, dtype=np.intp)  # 종목별 섹터 번호
+        self.prices = np.asarray(prices, dtype=np.int64)  # 종목별 현재 주가
+
+    @classmethod
+    def from_stocks(cls, stocks):
+        # session_state["stocks"] 형태(섹터 -> 종목 -> 정보)에서 엔진을 만듭니다.
+        sectors, tickers, sector_index, prices = [], [], [], []
+        for sector_no, (sector, sector_stocks) in enumerate(stocks.items()):
+            sectors.append(sector)
+            for stock_name, stock_info in sector_stocks.items():
+                tickers.append(stock_name)
+                sector_index.append(sector_no)
+                prices.append(stock_info["current_price"])
+        return cls(sectors, tickers, sector_index, prices)
+
+    def ticker_sectors(self):
+        # 종목 순서대로 섹터 이름을 돌려줍니다.
+        return [self.sectors[i] for i in self.sector_index.tolist()]
+
+    def impact_vector(self, sector_impacts):
+        # {섹터: 영향도} 딕셔너리를 종목별 영향도 벡터로 펼칩니다.
+        sector_values = np.array(
+            [sector_impacts.get(sector, 0) for sector in self.sectors], dtype=np.float64
+        )
+        return sector_values[self.sector_index]
+
+    def advance(self, sector_impacts=None, days=1, rng=None, seed=None, first_day=1):
+        # 주가를 days일 만큼 진행하고 (days, 종목 수) 크기의 일별 주가를 돌려줍니다.
+        # sector_impacts는 모든 날에 같은 딕셔너리 하나를 쓰거나, 날짜별 딕셔너리 목록을 줄 수 있습니다.
+        # seed를 주면 무작위 변동은 first_day부터 날짜별 난수 흐름(stocksim.rng)에서 뽑습니다.
+        if sector_impacts is None or isinstance(sector_impacts, dict):
+            impacts = np.broadcast_to(
+                self.impact_vector(sector_impacts or {}), (days, len(self.tickers))
+            )
+        else:
+            if len(sector_impacts) != days:
+                raise ValueError("날짜별 섹터 영향도 개수가 진행할 날짜 수와 다릅니다.")
+            impacts = np.stack([self.impact_vector(day_impacts) for day_impacts in sector_impacts])
+
+        if seed is not None and rng is None:
+            noise = daily_noise(seed, first_day, days, len(self.tickers), DAILY_NOISE)
+        else:
+            noise = (rng or _default_rng).uniform(-DAILY_NOISE, DAILY_NOISE, size=(days, len(self.tickers)))
+        change_rates = np.clip(noise + impacts, -MAX_CHANGE_RATE, MAX_CHANGE_RATE)
+
+        path = np.empty((days, len(self.tickers)), dtype=np.int64)
+        prices = self.prices
+        for day in range(days):
+            # 기존과 같이 매일 정수로 내림하고, 최소 1원과 최대 MAX_PRICE를 유지합니다.
+            prices = np.clip(np.floor(prices * (1 + change_rates[day])), 1, MAX_PRICE).astype(np.int64)
+            path[day] = prices
+        self.prices = prices
+        return path
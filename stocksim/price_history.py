@@ -0,0 +1,129 @@
+# --- 주가 기록 저장소 ---
+# 종목 x 날짜 크기의 int32 2차원 배열 하나에 모든 종목의 주가 기록을 모아 둡니다.
+# 하루치 기록을 추가할 때는 여유 공간을 두 배씩 늘려서 평균 O(1)로 추가합니다.
+import base64
+
+import numpy as np
+
+INITIAL_CAPACITY = 32  # 처음 확보하는 날짜 칸 수
+MAX_PRICE = np.iinfo(np.int32).max  # 기록할 수 있는 가장 높은 주가
+
+
+def _as_prices(prices):
+    # int32로 바꾸면 범위를 넘는 주가가 조용히 음수로 바뀌므로, 바꾸기 전에 범위를 확인합니다.
+    prices = np.asarray(prices)
+    if prices.size and (prices.max() > MAX_PRICE or prices.min() < 0):
+        raise OverflowError(f"주가 기록은 0 ~ {MAX_PRICE:,}원 사이만 저장할 수 있습니다.")
+    return prices.astype(np.int32, copy=False)
+
+
+class PriceHistory:
+    # offset은 이 기록 앞에 있는(아직 불러오지 않은) 날짜 수입니다. 로그인할 때 최근 기록만 먼저 불러오면 0보다 큽니다.
+    def __init__(self, tickers, prices=None, offset=0):
+        self.tickers = list(tickers)
+        self.offset = offset
+        self.index = {stock_name: slot for slot, stock_name in enumerate(self.tickers)}
+        if prices is None:
+            prices = np.empty((len(self.tickers), 0), dtype=np.int32)
+        prices = np.asarray(prices, dtype=np.int32).reshape(len(self.tickers), -1)
+        self.days = prices.shape[1]
+        self._data = np.zeros((len(self.tickers), max(INITIAL_CAPACITY, self.days)), dtype=np.int32)
+        self._data[:, : self.days] = prices
+
+    @classmethod
+    def from_stocks(cls, stocks):
+        # session_state["stocks"]에서 기록을 만듭니다.
+        # 예전 형식처럼 종목마다 price_history 리스트가 있으면 그대로 옮기고, 없으면 현재 주가로 첫날을 채웁니다.
+        tickers, histories = [], []
+        for sector_stocks in stocks.values():
+            for stock_name, stock_info in sector_stocks.items():
+                tickers.append(stock_name)
+                histories.append(stock_info.get("price_history") or [stock_info["current_price"]])
+        days = max((len(history) for history in histories), default=0)
+        prices = np.empty((len(tickers), days), dtype=np.int32)
+        for slot, history in enumerate(histories):
+            # 기록 길이가 다른 종목은 첫 주가로 앞쪽을 채워 날짜를 맞춥니다.
+            prices[slot, : days - len(history)] = history[0]
+            prices[slot, days - len(history) :] = history
+        return cls(tickers, prices)
+
+    def __len__(self):
+        return self.days
+
+    def end_day(self):
+        # 마지막으로 기록된 날짜 번호입니다. (앞쪽을 불러오지 않았어도 전체 기준)
+        return self.offset + self.days
+
+    def with_older(self, older):
+        # 나중에 불러온 앞쪽 기록(older, 1일째부터)을 붙인 전체 기록을 돌려줍니다. 맞지 않으면 그대로 돌려줍니다.
+        if self.offset == 0 or older.tickers != self.tickers or older.days < self.offset:
+            return self
+        return PriceHistory(self.tickers, np.hstack([older.matrix()[:, : self.offset], self.matrix()]))
+
+    def append_day(self, prices, tickers=None):
+        # 하루치 주가를 추가합니다. tickers를 주면 그 순서에 맞춰 다시 정렬합니다.
+        prices = _as_prices(prices)
+        if tickers is not None and list(tickers) != self.tickers:
+            ordered = np.empty(len(self.tickers), dtype=np.int32)
+            ordered[[self.index[stock_name] for stock_name in tickers]] = prices
+            prices = ordered
+        if self.days == self._data.shape[1]:
+            grown = np.zeros((len(self.tickers), self._data.shape[1] * 2), dtype=np.int32)
+            grown[:, : self.days] = self._data[:, : self.days]
+            self._data = grown
+        self._data[:, self.days] = prices
+        self.days += 1
+
+    def extend_days(self, prices, tickers=None):
+        # 여러 날의 주가 (날짜 수, 종목 수)를 한 번에 추가합니다.
+        prices = _as_prices(prices)
+        if tickers is not None and list(tickers) != self.tickers:
+            ordered = np.empty((len(prices), len(self.tickers)), dtype=np.int32)
+            ordered[:, [self.index[stock_name] for stock_name in tickers]] = prices
+            prices = ordered
+        needed = self.days + len(prices)
+        if needed > self._data.shape[1]:
+            capacity = self._data.shape[1]
+            while capacity < needed:
+                capacity *= 2
+            grown = np.zeros((len(self.tickers), capacity), dtype=np.int32)
+            grown[:, : self.days] = self._data[:, : self.days]
+            self._data = grown
+        self._data[:, self.days : needed] = prices.T
+        self.days = needed
+
+    def matrix(self):
+        # 전체 기록 (종목 x 날짜) 뷰입니다. 복사하지 않습니다.
+        return self._data[:, : self.days]
+
+    def series(self, stock_name):
+        # 한 종목의 날짜별 주가 뷰입니다. 복사하지 않습니다.
+        return self._data[self.index[stock_name], : self.days]
+
+    def latest(self):
+        return self._data[:, self.days - 1]
+
+    def daily_change_rates(self):
+        # 종목별 전일 대비 등락률(%)입니다. 기록이 이틀 미만이면 None을 돌려줍니다.
+        if self.days < 2:
+            return None
+        previous = self._data[:, self.days - 2].astype(np.float64)
+        return (self._data[:, self.days - 1] - previous) / previous * 100
+
+    def to_dict(self):
+        # 저장용 형식: 종목 목록 + 리틀 엔디언 int32 배열을 base64로 담습니다.
+        raw = np.ascontiguousarray(self.matrix(), dtype="<i4").tobytes()
+        data = {
+            "tickers": self.tickers,
+            "days": self.days,
+            "prices": base64.b64encode(raw).decode("ascii"),
+        }
+        if self.offset:
+            data["offset"] = self.offset
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        raw = base64.b64decode(data["prices"])
+        prices = np.frombuffer(raw, dtype="<i4").reshape(len(data["tickers"]), data["days"])
+        return cls(data["tickers"], prices, data.get("offset", 0))
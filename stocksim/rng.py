@@ -0,0 +1,29 @@
+# --- 재현할 수 있는 난수 흐름 ---
+# 예전에는 처음 주가(random.randint)와 하루 변동(random.uniform)을 전역 random에서 뽑아서,
+# 같은 시장을 다시 만들거나, 미리 계산하거나, 세션끼리 나눠 쓸 수 없었습니다.
+# 이제 시장마다 씨앗(seed)을 하나 두고, 처음 주가와 날짜별 변동은 (씨앗, 용도, 날짜)마다 따로 만든 난수 흐름에서 뽑습니다.
+# 그래서 어느 날의 주가든 씨앗과 뉴스 영향도만으로 다시 계산할 수 있고, 며칠을 한 번에 계산해도 하루씩 계산한 것과 같습니다.
+import secrets
+
+import numpy as np
+
+STREAM_INITIAL_PRICES = 0
+STREAM_DAILY_NOISE = 1
+
+
+def new_seed():
+    # 새 시장의 씨앗입니다. (msgpack과 JSON에 그대로 저장되도록 63비트 정수)
+    return secrets.randbits(63)
+
+
+def stream(seed, purpose, day=0):
+    # (씨앗, 용도, 날짜)마다 서로 겹치지 않는 난수 생성기입니다.
+    return np.random.Generator(np.random.PCG64(np.random.SeedSequence(seed, spawn_key=(purpose, day))))
+
+
+def daily_noise(seed, first_day, days, ticker_count, scale):
+    # first_day부터 days일 동안의 종목별 무작위 변동률 (날짜 수, 종목 수) 입니다. 각 값은 -scale ~ scale 사이입니다.
+    noise = np.empty((days, ticker_count), dtype=np.float64)
+    for offset in range(days):
+        noise[offset] = stream(seed, STREAM_DAILY_NOISE, first_day + offset).uniform(-scale, scale, ticker_count)
+    return noise
@@ -0,0 +1,123 @@
+# --- 섹터 이름 맞추기 ---
+# AI가 돌려준 섹터 이름이 "기술(Tech)"처럼 정확히 같지 않으면 ("기술", "Tech", "IT 업종", "제약" 등)
+# 예전에는 영향도에서 그냥 빠졌습니다. 섹터마다 한글 이름, 영어 이름, 나눠 쓴 이름, 비슷한 말을 정규화해서
+# 미리 색인으로 만들어 두고 한 번에 찾습니다. 색인에 없으면 색인의 한글 이름이 들어 있는지("가전제품" 안의 "가전"),
+# 그다음 비슷한 이름(오타 등)인지 찾아 최근 것만 기억해 두고,
+# 끝내 못 맞춘 이름은 횟수를 세어 선생님용 화면에서 볼 수 있게 합니다. (자주 나온 것만 남깁니다)
+import difflib
+import re
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+from functools import lru_cache
+
+# 정규화한 이름 -> 섹터 이름 앞부분(괄호 앞 한글 이름)
+SECTOR_SYNONYMS = {
+    "기술": ("it", "ai", "정보기술", "테크", "반도체", "전자", "디스플레이", "인공지능", "소프트웨어", "클라우드", "technology"),
+    "자동차": ("자동차부품", "완성차", "전기차", "모빌리티", "automobile", "automotive", "car", "cars"),
+    "에너지": ("2차전지", "이차전지", "배터리", "전력", "정유", "신재생에너지", "battery"),
+    "인터넷": ("플랫폼", "포털", "온라인", "게임", "online", "platform"),
+    "소비재": ("생활용품", "화장품", "가전", "의류", "패션", "consumer", "consumerstaples"),
+    "금융": ("은행", "증권", "보험", "카드", "핀테크", "bank", "banking", "financial"),
+    "건설": ("부동산", "건설업", "인프라", "realestate", "infrastructure"),
+    "유통": ("소매", "백화점", "마트", "쇼핑", "이커머스", "전자상거래", "편의점", "retailer"),
+    "통신": ("통신서비스", "이동통신", "5g", "telecommunication", "telecommunications"),
+    "제약/바이오": ("제약바이오", "바이오", "제약", "의약", "의약품", "헬스케어", "healthcare", "pharmaceutical"),
+    "화학": ("석유화학", "정밀화학", "chemicals"),
+    "철강": ("금속", "철강금속", "소재", "steelmaking"),
+    "운송": ("물류", "해운", "항공", "택배", "조선", "logistics", "shipping", "shipbuilding", "airline"),
+    "엔터테인먼트": ("엔터", "연예", "미디어", "콘텐츠", "k팝", "media", "entertainments"),
+    "식품": ("음식료", "식음료", "식료품", "음료", "농업", "foods", "beverage"),
+}
+FUZZY_CUTOFF = 0.75  # 비슷한 이름으로 인정하는 최소 유사도 (0~1)
+FUZZY_CACHE_SIZE = 1024  # 색인 밖 이름을 찾은 결과를 기억하는 최대 개수 (오래 안 쓴 것부터 지웁니다)
+UNMATCHED_LIMIT = 200  # 못 맞춘 이름을 세어 두는 최대 개수 (가득 차면 가장 적게 나온 것부터 지웁니다)
+
+_HANGUL = re.compile("[가-힣]")
+
+_SUFFIXES = ("관련주", "섹터", "산업", "업종", "분야", "industry", "sector")
+
+
+def normalize(mention):
+    # 대소문자, 전각/반각, 띄어쓰기, 문장 부호, "섹터/산업/업종" 같은 꼬리를 없앤 비교용 이름입니다.
+    text = unicodedata.normalize("NFKC", str(mention)).lower()
+    text = re.sub(r"[\s\"'`.,·:;!?()\[\]{}<>_\-]+", "", text)
+    for suffix in _SUFFIXES:
+        if text.endswith(suffix) and len(text) > len(suffix):
+            text = text[: -len(suffix)]
+    return text
+
+
+class SectorIndex:
+    def __init__(self, sector_names, synonyms=SECTOR_SYNONYMS):
+        self.sector_names = tuple(sector_names)
+        self.aliases = {}  # 정규화한 이름 -> 섹터 이름
+        for sector in self.sector_names:
+            korean, _, english = sector.partition("(")
+            english = english.rstrip(")")
+            forms = [sector, korean, english, korean.replace("/", ""), english.replace("/", "")]
+            forms += korean.split("/") + english.split("/")
+            forms += synonyms.get(korean.strip(), ())
+            for form in forms:
+                alias = normalize(form)
+                if alias:
+                    self.aliases.setdefault(alias, sector)
+        # 이름 안에 들어 있는지 볼 한글 이름 (긴 것부터 맞춰서 "전자상거래"가 "전자"보다 먼저입니다)
+        self._partial_aliases = sorted(
+            (alias for alias in self.aliases if len(alias) >= 2 and _HANGUL.search(alias)), key=len, reverse=True
+        )
+        self._fuzzy = OrderedDict()  # 색인 밖 이름으로 찾은 결과 (못 찾은 것은 None, 최근에 쓴 것이 뒤)
+        self._unmatched = Counter()
+        self._lock = threading.Lock()
+
+    def resolve(self, mention):
+        # 섹터 이름을 돌려줍니다. 맞출 수 없으면 None이고 횟수를 셉니다.
+        alias = normalize(mention)
+        if not alias or alias in ("없음", "none", "n/a"):
+            return None
+        sector = self.aliases.get(alias)
+        if sector is not None:
+            return sector
+        with self._lock:
+            if alias in self._fuzzy:
+                self._fuzzy.move_to_end(alias)
+            else:
+                self._fuzzy[alias] = self._match_outside_index(alias)
+                if len(self._fuzzy) > FUZZY_CACHE_SIZE:
+                    self._fuzzy.popitem(last=False)
+            sector = self._fuzzy[alias]
+            if sector is None:
+                self._count_unmatched(str(mention).strip())
+        return sector
+
+    def _match_outside_index(self, alias):
+        for known in self._partial_aliases:
+            if known in alias:
+                return self.aliases[known]
+        close = difflib.get_close_matches(alias, self.aliases, n=1, cutoff=FUZZY_CUTOFF)
+        return self.aliases[close[0]] if close else None
+
+    def _count_unmatched(self, mention):
+        if mention not in self._unmatched and len(self._unmatched) >= UNMATCHED_LIMIT:
+            rarest = min(self._unmatched, key=self._unmatched.get)
+            del self._unmatched[rarest]
+        self._unmatched[mention] += 1
+
+    def resolve_all(self, mentions):
+        # 여러 이름을 섹터 이름 목록으로 바꿉니다. 못 맞춘 것은 빼고, 같은 섹터는 한 번만 넣습니다.
+        sectors = []
+        for mention in mentions or []:
+            sector = self.resolve(mention)
+            if sector is not None and sector not in sectors:
+                sectors.append(sector)
+        return sectors
+
+    def unmatched_counts(self):
+        with self._lock:
+            return dict(self._unmatched.most_common())
+
+
+@lru_cache(maxsize=16)
+def index_for(sector_names):
+    # 같은 섹터 목록에는 같은 색인을 씁니다. (못 맞춘 횟수도 함께 모입니다) sector_names는 튜플이어야 합니다.
+    return SectorIndex(sector_names)
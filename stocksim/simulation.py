@@ -0,0 +1,181 @@
+# --- 시뮬레이션 핵심 (Streamlit 없이 동작) ---
+# 시장(주가, 주가 기록, 날짜)과 계좌(현금, 보유 주식)를 상태 객체로 두고,
+# 거래와 주가 변동은 화면에 직접 쓰지 않고 결과(Result)와 알림(Event)을 돌려줍니다.
+# 앱은 결과를 화면에 보여 주기만 하고, 벤치마크나 재현 실행은 브라우저 없이 이 모듈만 씁니다.
+
+from collections import namedtuple
+
+from stocksim.impacts import compute_sector_impacts
+from stocksim.price_engine import PriceEngine
+from stocksim.price_history import PriceHistory
+from stocksim.ticker_index import TickerIndex
+
+INITIAL_CASH = 10000000  # 처음 주는 현금
+
+# 화면에 보여 줄 알림. kind는 "success", "error", "info" 중 하나입니다.
+Event = namedtuple("Event", ["kind", "text"])
+
+
+class Result:
+    def __init__(self, ok, events=None, **data):
+        self.ok = ok
+        self.events = list(events or [])
+        self.data = data
+
+    def __bool__(self):
+        return self.ok
+
+    @classmethod
+    def success(cls, text, **data):
+        return cls(True, [Event("success", text)], **data)
+
+    @classmethod
+    def error(cls, text, **data):
+        return cls(False, [Event("error", text)], **data)
+
+
+def new_portfolio(cash=INITIAL_CASH):
+    return {"cash": cash, "stocks": {}}
+
+
+class Market:
+    # stocks는 {섹터: {종목: {"current_price": 주가}}} 딕셔너리를 그대로 쓰고 바꿉니다.
+    # seed가 있으면 날짜별 무작위 변동을 (seed, 날짜) 난수 흐름에서 뽑으므로, 주가는 seed와 뉴스 영향도만으로 정해집니다.
+    def __init__(self, stocks, price_history=None, ticker_index=None, day_count=1, seed=None):
+        self.stocks = stocks
+        self.seed = seed
+        self.price_history = price_history if price_history is not None else PriceHistory.from_stocks(stocks)
+        self.ticker_index = ticker_index if ticker_index is not None else TickerIndex(stocks)
+        self.day_count = day_count
+
+    def index(self):
+        # 종목 구성이 바뀌었으면 색인을 다시 만듭니다.
+        if not self.ticker_index.matches(self.stocks):
+            self.ticker_index = TickerIndex(self.stocks)
+        return self.ticker_index
+
+    def price(self, stock_name):
+        return self.index().price(self.stocks, stock_name)
+
+    def advance(self, daily_sector_impacts, rng=None):
+        # 날짜별 섹터 영향도 목록만큼 주가를 한 번에 진행하고, 주가 기록에 모두 덧붙입니다.
+        # rng를 주면 seed 대신 그 생성기에서 뽑습니다.
+        engine = PriceEngine.from_stocks(self.stocks)
+        path = engine.advance(
+            daily_sector_impacts,
+            days=len(daily_sector_impacts),
+            rng=rng,
+            seed=self.seed,
+            first_day=self.day_count + 1,
+        )
+        for stock_name, sector, price in zip(engine.tickers, engine.ticker_sectors(), path[-1].tolist()):
+            self.stocks[sector][stock_name]["current_price"] = price
+        self.price_history.extend_days(path, engine.tickers)
+        self.day_count += len(daily_sector_impacts)
+        return path
+
+    def pass_day(self, daily_news, news_meanings, rng=None, use_llm_sentiment=True):
+        # 오늘 뉴스와 해설로 하루를 진행합니다. 뉴스가 없으면 진행하지 않습니다.
+        if not daily_news:
+            return Result(False, [Event("error", "오늘의 뉴스를 먼저 생성해주세요.")])
+        sector_impacts = compute_sector_impacts(daily_news, news_meanings, self.stocks, use_llm_sentiment)
+        self.advance([sector_impacts], rng=rng)
+        return Result(True, [Event("info", "주가가 변동되었습니다.")], sector_impacts=sector_impacts)
+
+
+class Account:
+    # portfolio는 {"cash": 현금, "stocks": {종목: {"quantity", "purchase_price"}}} 딕셔너리를 그대로 쓰고 바꿉니다.
+    def __init__(self, portfolio=None, initial_cash=INITIAL_CASH):
+        self.portfolio = portfolio if portfolio is not None else new_portfolio(initial_cash)
+        self.initial_cash = initial_cash
+
+    def buy(self, market, stock_name, quantity, sector):
+        if sector not in market.stocks or stock_name not in market.stocks[sector]:
+            return Result.error("존재하지 않는 주식 종목입니다.")
+        if quantity <= 0:
+            return Result.error("매수 수량은 1주 이상이어야 합니다.")
+
+        stock_price = market.stocks[sector][stock_name]["current_price"]
+        max_quantity = self.portfolio["cash"] // stock_price
+        if quantity > max_quantity:
+            return Result.error(
+                f"매수 가능 수량을 초과했습니다. (최대 {max_quantity}주까지 매수 가능)",
+                max_quantity=max_quantity,
+            )
+
+        order = {"kind": "buy", "stock_name": stock_name, "sector": sector, "quantity": quantity, "price": stock_price}
+        total_price = self.apply_order(order)
+        return Result.success(
+            f"{stock_name} {quantity}주 매수 완료. 총 {total_price:,.0f}원 소요.",
+            total_price=total_price,
+            order=order,
+        )
+
+    def sell(self, market, stock_name, quantity):
+        portfolio_stocks = self.portfolio["stocks"]
+        if stock_name not in portfolio_stocks:
+            return Result.error("보유하고 있지 않은 주식입니다.")
+        if portfolio_stocks[stock_name]["quantity"] < quantity:
+            return Result.error("매도 수량이 보유 주식 수를 초과했습니다.")
+        if quantity <= 0:
+            return Result.error("잘못된 매도 수량입니다.")
+
+        stock_price = market.price(stock_name)
+        if stock_price == 0:
+            return Result.error("주식 정보를 찾을 수 없습니다.")
+
+        order = {"kind": "sell", "stock_name": stock_name, "quantity": quantity, "price": stock_price}
+        sell_price = self.apply_order(order)
+        return Result.success(
+            f"{stock_name} {quantity}주 매도 완료. 총 {sell_price:,.0f}원 획득.",
+            sell_price=sell_price,
+            order=order,
+        )
+
+    def apply_order(self, order):
+        # 체결된 주문을 포트폴리오에 반영하고 거래 금액을 돌려줍니다. 검사는 buy/sell에서 미리 합니다.
+        # 주문 장부(stocksim.orders)를 다시 반영할 때도 씁니다.
+        stock_name, quantity = order["stock_name"], order["quantity"]
+        total_price = order["price"] * quantity
+        portfolio_stocks = self.portfolio["stocks"]
+        if order["kind"] == "sell":
+            self.portfolio["cash"] += total_price
+            portfolio_stocks[stock_name]["quantity"] -= quantity
+            if portfolio_stocks[stock_name]["quantity"] == 0:
+                del portfolio_stocks[stock_name]
+            return total_price
+
+        self.portfolio["cash"] -= total_price
+        if stock_name in portfolio_stocks:
+            holding = portfolio_stocks[stock_name]
+            holding["quantity"] += quantity
+            holding["purchase_price"] = (
+                holding["purchase_price"] * (holding["quantity"] - quantity) + total_price
+            ) / holding["quantity"]
+        else:
+            portfolio_stocks[stock_name] = {
+                "quantity": quantity,
+                "purchase_price": total_price / quantity,
+            }
+        return total_price
+
+    def valuation(self, market):
+        # 현금 + 보유 주식 평가액과 처음 현금 대비 수익률입니다. 주가를 찾을 수 없는 종목은 빼고 계산합니다.
+        cash = self.portfolio["cash"]
+        total_value = cash
+        total_purchase_value = 0
+        for stock_name, stock_info in self.portfolio["stocks"].items():
+            current_price = market.price(stock_name)
+            if current_price == 0:
+                continue
+            total_value += current_price * stock_info["quantity"]
+            total_purchase_value += stock_info["purchase_price"] * stock_info["quantity"]
+        total_profit_loss = total_value - self.initial_cash
+        total_profit_rate = (total_profit_loss / self.initial_cash) * 100 if self.initial_cash != 0 else 0
+        return {
+            "cash": cash,
+            "total_value": total_value,
+            "total_purchase_value": total_purchase_value,
+            "total_profit_loss": total_profit_loss,
+            "total_profit_rate": total_profit_rate,
+        }
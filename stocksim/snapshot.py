@@ -0,0 +1,83 @@
+# --- 저장 형식 (스냅샷) ---
+# 예전에는 모든 값을 json.dumps(ensure_ascii=False) 문자열로 저장해서, 주가는 숫자마다 십진수 글자로,
+# 한글 기사는 글자 그대로 들어가고 로그인할 때마다 다시 파싱했습니다.
+# 이제 값은 msgpack(설치되어 있으면, 없으면 JSON)으로 만든 뒤 zlib로 압축하고,
+# 주가 기록 한 줄은 int32 배열 그대로 압축합니다. text 컬럼에 그대로 넣을 수 있도록 base64로 감쌉니다.
+#
+# 저장된 문자열 앞머리로 형식과 버전을 구별합니다.
+#   "s1m:" msgpack + zlib   "s1j:" JSON + zlib
+#   "s1a:" int32(리틀 엔디언) 배열 + zlib   "s1b:" int32 배열 (종목이 적어 압축하지 않은 것)
+# 앞머리가 없으면 예전 JSON 문자열로 읽으므로, 예전에 저장한 데이터도 그대로 읽습니다.
+# 압축하기엔 작은 값은 어느 방식이든 앞머리 없는 짧은 JSON으로 둡니다.
+import base64
+import json
+import zlib
+
+import numpy as np
+
+try:
+    import msgpack  # 선택 사항입니다. 없으면 JSON으로 만듭니다.
+except ImportError:
+    msgpack = None
+
+# compact 형식에서 값을 만드는 방식입니다. 앞머리("s1m:"/"s1j:")에 그대로 남으므로 저장된 줄만 보고도 알 수 있습니다.
+VALUE_CODEC = "m" if msgpack is not None else "j"
+FORMATS = ("compact", "json")
+COMPRESS_LEVEL = 1  # 빠른 압축. 6으로 올려도 크기는 거의 같고 시간은 몇 배 걸립니다.
+MIN_COMPRESS_BYTES = 256  # 이보다 작은 값은 압축하지 않고 짧은 JSON 그대로 둡니다.
+VERSION = "s1"
+
+
+def _wrap(tag, payload):
+    return f"{VERSION}{tag}:" + base64.b64encode(zlib.compress(payload, COMPRESS_LEVEL)).decode("ascii")
+
+
+def _unwrap(data):
+    return zlib.decompress(base64.b64decode(data[4:]))
+
+
+def _short_json(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def encode_value(value, snapshot_format="compact"):
+    # 값(딕셔너리, 목록 등)을 저장할 문자열로 만듭니다. 작은 값은 압축해도 줄지 않으므로 짧은 JSON 그대로 둡니다.
+    if snapshot_format == "json":
+        return json.dumps(value, ensure_ascii=False)
+    if VALUE_CODEC == "m":
+        text = None
+        payload = msgpack.packb(value, use_bin_type=True)
+    else:
+        text = _short_json(value)
+        payload = text.encode("utf-8")
+    if len(payload) < MIN_COMPRESS_BYTES:
+        return text if text is not None else _short_json(value)
+    return _wrap(VALUE_CODEC, payload)
+
+
+def decode_value(data):
+    if data.startswith(f"{VERSION}m:"):
+        if msgpack is None:
+            raise RuntimeError("msgpack 형식으로 저장된 데이터입니다. msgpack을 설치해주세요.")
+        return msgpack.unpackb(_unwrap(data), raw=False, strict_map_key=False)
+    if data.startswith(f"{VERSION}j:"):
+        return json.loads(_unwrap(data))
+    return json.loads(data)
+
+
+def encode_prices(prices, snapshot_format="compact"):
+    # 하루치 전 종목 주가를 저장할 문자열로 만듭니다.
+    if snapshot_format == "json":
+        return json.dumps(np.asarray(prices).tolist())
+    payload = np.ascontiguousarray(prices, dtype="<i4").tobytes()
+    if len(payload) < MIN_COMPRESS_BYTES:
+        return f"{VERSION}b:" + base64.b64encode(payload).decode("ascii")
+    return _wrap("a", payload)
+
+
+def decode_prices(data):
+    if data.startswith(f"{VERSION}a:"):
+        return np.frombuffer(_unwrap(data), dtype="<i4")
+    if data.startswith(f"{VERSION}b:"):
+        return np.frombuffer(base64.b64decode(data[4:]), dtype="<i4")
+    return np.asarray(json.loads(data), dtype=np.int32)
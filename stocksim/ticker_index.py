@@ -0,0 +1,43 @@
+# --- 종목 색인 ---
+# 종목 이름 -> (섹터, 배열 위치) 를 미리 만들어 두어
+# 보유 종목마다 섹터를 하나씩 훑지 않고 바로 주가를 찾습니다.
+
+
+def _membership(stocks):
+    # (섹터, 종목 이름들) 목록입니다. 종목 이름이나 섹터, 순서가 바뀌면 달라집니다.
+    return tuple((sector, tuple(sector_stocks)) for sector, sector_stocks in stocks.items())
+
+
+class TickerIndex:
+    def __init__(self, stocks):
+        self.membership = _membership(stocks)
+        self.entries = {}
+        slot = 0
+        for sector, sector_stocks in stocks.items():
+            for stock_name in sector_stocks:
+                self.entries[stock_name] = (sector, slot)
+                slot += 1
+
+    def __contains__(self, stock_name):
+        return stock_name in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def sector_of(self, stock_name):
+        entry = self.entries.get(stock_name)
+        return entry[0] if entry else ""
+
+    def slot_of(self, stock_name):
+        return self.entries[stock_name][1]
+
+    def price(self, stocks, stock_name):
+        # 종목의 현재 주가입니다. 없는 종목이면 0을 돌려줍니다.
+        entry = self.entries.get(stock_name)
+        if entry is None:
+            return 0
+        return stocks[entry[0]][stock_name]["current_price"]
+
+    def matches(self, stocks):
+        # 종목 구성(이름, 섹터, 순서)이 색인을 만들 때와 같은지 확인합니다.
+        return self.membership == _membership(stocks)
@@ -0,0 +1,93 @@
+# --- 나중에 모아서 저장하기 (write-behind) ---
+# 거래할 때마다 데이터베이스 응답을 기다리지 않도록, 저장할 내용을 사용자별 대기열에 넣고
+# 백그라운드 작업자가 주기적으로 모아서 씁니다. 같은 사용자의 변경 내용은 하나로 합쳐집니다.
+# 하루 지나기, 로그아웃, 프로세스 종료 때는 바로 씁니다. 쓰기에 실패한 내용은 버리지 않고
+# 대기열에 다시 넣어 다음 주기에 재시도합니다.
+import atexit
+import threading
+import time
+
+FLUSH_INTERVAL = 3.0  # 백그라운드 저장 주기(초)
+MAX_RETRIES = 3  # 한 번 저장할 때 재시도 횟수
+BACKOFF_BASE = 0.5  # 첫 재시도 대기 시간(초), 재시도마다 두 배
+
+
+class WriteBehindQueue:
+    def __init__(self, flush_interval=FLUSH_INTERVAL, max_retries=MAX_RETRIES):
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self._pending = {}  # 계정 -> (DeltaPersistence, PendingWrite)
+        self._errors = {}  # 계정 -> 마지막 저장 오류
+        self._account_locks = {}  # 같은 계정을 두 스레드가 동시에 쓰지 않도록 막습니다.
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, persistence, pending):
+        # 저장할 내용을 대기열에 넣습니다. 이미 기다리는 내용이 있으면 합칩니다.
+        if not pending:
+            return
+        with self._lock:
+            entry = self._pending.get(persistence.account)
+            if entry is not None:
+                pending = entry[1].merge(pending)
+            self._pending[persistence.account] = (persistence, pending)
+
+    def has_pending(self, account):
+        with self._lock:
+            return account in self._pending
+
+    def last_error(self, account):
+        return self._errors.get(account)
+
+    def flush(self, account, retries=0):
+        # 계정의 대기 중인 내용을 지금 씁니다. 성공하면(또는 쓸 내용이 없으면) True입니다.
+        with self._account_lock(account):
+            with self._lock:
+                entry = self._pending.pop(account, None)
+            if entry is None:
+                return account not in self._errors
+            return self._write(account, *entry, retries=retries)
+
+    def flush_all(self, retries=0):
+        with self._lock:
+            accounts = list(self._pending)
+        return all([self.flush(account, retries) for account in accounts])
+
+    def close(self):
+        # 프로세스가 끝날 때 남은 내용을 모두 씁니다.
+        self._stopped = True
+        self._wake.set()
+        self.flush_all(self.max_retries)
+
+    def _account_lock(self, account):
+        with self._lock:
+            return self._account_locks.setdefault(account, threading.Lock())
+
+    def _write(self, account, persistence, pending, retries):
+        for attempt in range(retries + 1):
+            try:
+                persistence.write(pending)
+                self._errors.pop(account, None)
+                return True
+            except Exception as e:
+                self._errors[account] = e
+                if attempt < retries:
+                    time.sleep(BACKOFF_BASE * (2 ** attempt))
+        # 실패한 내용은 그 사이 들어온 새 내용과 합쳐 다시 기다립니다.
+        with self._lock:
+            newer = self._pending.get(account)
+            if newer is not None:
+                pending = pending.merge(newer[1])
+            self._pending[account] = (persistence, pending)
+        return False
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if not self._stopped:
+                self.flush_all(self.max_retries)
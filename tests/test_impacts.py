@@ -0,0 +1,24 @@
+from stocksim.impacts import LLM_SENTIMENT_SCORE, news_score
+
+
+def test_agreeing_words_move_prices_more_than_disagreeing_words():
+    positive = {"sentiment": "positive"}
+    agree = news_score("반도체 성장", positive)
+    no_words = news_score("반도체 소식", positive)
+    disagree = news_score("반도체 하락", positive)
+    assert agree >= LLM_SENTIMENT_SCORE
+    assert agree > no_words > disagree > 0
+
+
+def test_negative_sentiment_is_symmetric():
+    negative = {"sentiment": "negative"}
+    assert news_score("반도체 하락", negative) < news_score("반도체 소식", negative) < news_score("반도체 성장", negative) < 0
+
+
+def test_neutral_or_ignored_llm_sentiment():
+    assert news_score("반도체 성장", {"sentiment": "neutral"}) == 0.0
+    assert news_score("반도체 성장", {"sentiment": "negative"}, use_llm_sentiment=False) > 0
+
+
+def test_strongly_contradicting_words_do_not_flip_the_llm_direction():
+    assert news_score("호황 성장 상승 호황", {"sentiment": "negative"}) == 0.0